@@ -1,13 +1,247 @@
 # Import standard library modules
 import os
+import codecs
+import mmap
+import hashlib
+import json
+import pickle
 import requests
 import re
+import io
+import struct
+import zipfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy.sparse import csr_matrix, coo_matrix, diags, vstack
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import TfidfTransformer
+from sklearn.preprocessing import normalize
 
 # Import local program scripts
 import ui_helpers
 
+# Number of characters read at a time by tally_words_streaming
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Number of worker processes used by tally_corpus and tally_words_parallel (None uses every available CPU core)
+TALLY_WORKERS = None
+
+# Smallest byte range worth handing to its own worker in tally_words_parallel
+PARALLEL_MIN_RANGE_SIZE = 16 * 1024 * 1024
+
+# Version of the tokenizing rules; bump whenever WORD_PATTERN or the Tokenizer filters change so TallyCache entries are invalidated
+TOKENIZER_VERSION = 1
+
+# Largest total size (in bytes) of the TallyCache subdirectory before least recently used entries are deleted
+TALLY_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Name of the file in the TallyCache subdirectory which remembers the content hash of each Textfile
+TALLY_CACHE_INDEX = 'file_hashes.json'
+
+# Suffix of the IncrementalTally state files kept in the TallyCache subdirectory
+INCREMENTAL_STATE_SUFFIX = '.state'
+
+# Number of bytes before the last tallied offset which IncrementalTally checks to make sure a file was only appended to
+INCREMENTAL_CHECK_BYTES = 4096
+
+# Memory budget (in bytes) for n-gram counting before NGramCounter switches from exact counts to a Count-Min Sketch
+NGRAM_MEMORY_CAP = 64 * 1024 * 1024
+
+# Number of most frequent n-grams kept by NGramCounter once it is in bounded-memory mode
+NGRAM_TOP_K = 5000
+
+# Counters kept per requested result by StreamingTopK (more counters give tighter error bounds)
+TOP_K_COUNTERS_PER_RESULT = 10
+
+# Approximate memory (in bytes) used by one n-gram:count dictionary entry, used to enforce NGRAM_MEMORY_CAP
+NGRAM_BYTES_PER_ENTRY = 200
+
+# Number of hash columns used by hashing_tf_idf_analysis (out-of-core TF-IDF)
+HASHING_N_FEATURES = 2 ** 20
+
+# Number of chunks hashed at a time by hashing_tf_idf_analysis
+HASHING_BATCH_SIZE = 8
+
+# Number of frequent words tracked to label hash columns with words
+HASHING_REVERSE_MAP_SIZE = 50000
+
+# Number of most similar documents kept per document by document_similarity
+SIMILARITY_TOP_K = 10
+
+# Largest number of similarity scores (documents x documents) held in memory at once by document_similarity
+SIMILARITY_BLOCK_CELLS = 16 * 1024 * 1024
+
+# Precompiled REGEX patterns used by the Tokenizer (see tally_words for an explanation of WORD_PATTERN)
+WORD_PATTERN = re.compile(r"\b[a-zA-Z]+(?:-[a-zA-Z]+)*(?:(?<=\w)[\'’](?![sSdD]\b)[a-zA-Z]+)?\b")
+
+# Word Count words plus the punctuation which ends a sentence or clause, used by Tokenizer.phrase_words so that phrases never span them
+PHRASE_PATTERN = re.compile(WORD_PATTERN.pattern + r'|[.!?;:]')
+
+# Bytes versions of the patterns used to tokenize memory-mapped files (see tally_words_mmap)
+WORD_PATTERN_BYTES = re.compile(rb"\b[a-zA-Z]+(?:-[a-zA-Z]+)*(?:(?<=\w)(?:'|\xe2\x80\x99)(?![sSdD]\b)[a-zA-Z]+)?\b")
+WHITESPACE_PATTERN_BYTES = re.compile(rb'[ \t\n\r\f\v]')
+NON_ASCII_PATTERN_BYTES = re.compile(rb'[\x80-\xff]+')
+
+# Splits text into normalized words for the Word Count and TF-IDF functions
+class Tokenizer:
+    """
+    Holds the precompiled REGEX patterns and the commonwords.txt filter used to split text into normalized, lower-case words. A single Tokenizer is built once per analysis and reused for every file or chunk, rather than rebuilding the REGEX and scanning the common words list for every word.
+
+    Parameters:
+    common_list - the words to filter, usually returned by load_common_words(). Stored as a frozenset for fast membership tests.
+    min_length - the minimum length of a word to be kept. tally_words uses 3 (words longer than two letters). Default is 0 (no length filter).
+
+    Methods:
+    words(text) - generator yielding the Word Count words of text (WORD_PATTERN, keeps hyphenated words and contractions).
+    phrase_words(text) - generator yielding the same words as words(text), plus None wherever a phrase must break (a filtered word or sentence punctuation), for NGramCounter.
+    tally(text, wordtally_dict) - counts words(text) into wordtally_dict and returns it.
+    tally_bytes(buffer, wordtally_dict) - counts the Word Count words of an ASCII-safe bytes-like object (i.e., an mmap) into wordtally_dict and returns it.
+    """
+    def __init__(self, common_list=None, min_length=0):
+        self.stopwords = frozenset(common_list or ())
+        self.min_length = min_length
+
+    def words(self, text):
+        stopwords = self.stopwords
+        min_length = self.min_length
+
+        for word in WORD_PATTERN.findall(text.lower()):
+            if len(word) >= min_length and word not in stopwords:
+                yield word
+
+    def phrase_words(self, text):
+        stopwords = self.stopwords
+        min_length = self.min_length
+
+        for token in PHRASE_PATTERN.findall(text.lower()):
+            if token[0].isalpha() and len(token) >= min_length and token not in stopwords:
+                yield token
+            else:
+                yield None
+
+    def tally(self, text, wordtally_dict=None):
+        if wordtally_dict is None:
+            wordtally_dict = {}
+
+        get = wordtally_dict.get
+        for word in self.words(text):
+            wordtally_dict[word] = get(word, 0) + 1
+
+        return wordtally_dict
+
+    def tally_bytes(self, buffer, wordtally_dict=None):
+        if wordtally_dict is None:
+            wordtally_dict = {}
+
+        # Counts the raw (not yet lower-cased) tokens one whitespace-aligned window at a time
+        raw_counts = Counter()
+        start, size = 0, len(buffer)
+        while start < size:
+            end = start + STREAM_CHUNK_SIZE
+            if end < size:
+                match = WHITESPACE_PATTERN_BYTES.search(buffer, end)
+                end = match.start() if match else size
+            else:
+                end = size
+
+            raw_counts.update(WORD_PATTERN_BYTES.findall(buffer, start, end))
+            start = end
+
+        # Lower-cases, decodes, and filters each distinct token only once
+        stopwords = self.stopwords
+        min_length = self.min_length
+        get = wordtally_dict.get
+        for token, count in raw_counts.items():
+            word = token.lower().decode('utf-8')
+            if len(word) >= min_length and word not in stopwords:
+                wordtally_dict[word] = get(word, 0) + count
+
+        return wordtally_dict
+
+# Maps words to compact integer ids shared by a whole corpus
+class Vocabulary:
+    """
+    Corpus-wide registry which gives each distinct word a compact integer id (0, 1, 2, ... in order of first appearance). The word counts of each document can then be stored as a pair of NumPy arrays (ids, counts) instead of a dictionary of Python strings, and a whole corpus is turned into a count matrix without building a word:column dictionary (see build_id_count_matrix). Words are only resolved from their ids for the matrix columns.
+
+    Attributes:
+    word_ids - dictionary of word:id.
+    words - list of words, indexed by id.
+
+    Methods:
+    add(word) - returns the id of word, registering it if it is new.
+    encode(wordtally_dict) - converts a wordtally dictionary into a pair of NumPy arrays (ids, counts), registering new words.
+    decode(ids) - returns a list of the words for an iterable of ids.
+    """
+    def __init__(self, words=()):
+        self.word_ids = {}
+        self.words = []
+        for word in words:
+            self.add(word)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word):
+        return word in self.word_ids
+
+    def add(self, word):
+        word_id = self.word_ids.get(word)
+        if word_id is None:
+            word_id = len(self.words)
+            self.word_ids[word] = word_id
+            self.words.append(word)
+        return word_id
+
+    def encode(self, wordtally_dict):
+        ids = np.fromiter(map(self.add, wordtally_dict), dtype=np.uint32, count=len(wordtally_dict))
+        counts = np.fromiter(wordtally_dict.values(), dtype=np.int64, count=len(wordtally_dict))
+        return ids, counts
+
+    def decode(self, ids):
+        words = self.words
+        return [words[word_id] for word_id in ids]
+
+# Builds a sparse count matrix from the id counts of each document
+def build_id_count_matrix(id_counts_all_docs, vocabulary, sort_words=True):
+    """
+    Converts a dictionary {doc_title:(ids, counts)} into a sparse CSR matrix with one row per document (in dictionary order) and one column per word used by the documents. Only the words of the columns are resolved from the Vocabulary.
+
+    Parameters:
+    id_counts_all_docs - a dictionary of (ids, counts) pairs returned by Vocabulary.encode.
+    vocabulary - the Vocabulary which produced the ids.
+    sort_words - if True, columns are in alphabetical order (matching TfidfVectorizer). If False, columns are in id order (the order in which words first appeared).
+
+    Returns:
+    count_matrix - a scipy.sparse CSR matrix of word counts (documents x words).
+    feature_names - the list of words for the columns of count_matrix.
+    """
+    id_counts_list = list(id_counts_all_docs.values())
+    used_ids = np.unique(np.concatenate([ids for ids, counts in id_counts_list])) if id_counts_list else np.empty(0, dtype=np.uint32)
+    feature_names = vocabulary.decode(used_ids)
+
+    # Orders the columns and maps each id to its column
+    if sort_words:
+        order = sorted(range(len(feature_names)), key=feature_names.__getitem__)
+        used_ids = used_ids[order]
+        feature_names = [feature_names[position] for position in order]
+    column_of_id = np.zeros(len(vocabulary), dtype=np.int64)
+    column_of_id[used_ids] = np.arange(len(used_ids))
+
+    # Builds the CSR arrays from the id counts of each document
+    indptr = np.zeros(len(id_counts_list) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(ids) for ids, counts in id_counts_list])
+    indices = column_of_id[np.concatenate([ids for ids, counts in id_counts_list])] if id_counts_list else np.empty(0, dtype=np.int64)
+    data = np.concatenate([counts for ids, counts in id_counts_list]) if id_counts_list else np.empty(0, dtype=np.int64)
+
+    count_matrix = csr_matrix((data, indices, indptr), shape=(len(id_counts_list), len(feature_names)))
+    count_matrix.sort_indices()
+
+    return count_matrix, feature_names
+
 # Loads a single .txt file from Textfiles and returns it as string
 def load_textfile(filename):
     """ 
@@ -46,138 +280,1402 @@ def load_textfile(filename):
         print(ui_helpers.RED + 'The load_textfile function expected a valid file name, but none was passed')
         input(ui_helpers.RESET + 'Press Enter to continue')
 
-# Clean and strip a txt file prior to processing
-def clean_strip_txt_file(loaded_text_file):
+# URL-based text file open
+def url_text_file_open(user_url):
     """
-    Assists other functions (such as analysis.text_tf_idf_analysis()) with noramlizing the contents of a .txt file and filtering any words found in the commonwords.txt filter prior to performing the TF-IDF calculation. Uses Regular Expressions.
-
+    Prompts the user for a URL pointing to a .txt file and attempts to download and analyze the text. The function
+    fetches the file, loads common words for filtering, and prompts the user for the number of most commonly used 
+    words to display. It then normalizes and tallies the words, excluding those found in commonwords.txt, and 
+    displays the results.
+    
     Parameters:
-    loaded_text_file - a string containing the contents of a .txt after it has been read by load_textfile().
+    user_url - the user-specified URL for the .txt to open
 
     Returns:
-    cleaned_content - the full text of the original file, normalized and stripped of any words found in commonwords.txt.
+    filename - the name of the file
+    text_file_data - a string containing the complete text of the file retrieved at the URL specified. Used by other functions to process the words contained.
 
     Raises:
-    Exception - for any unexpected errors encountered.
+    Exception: catches unexpected exceptions that may occur during execution.
     """
-    # Load commonwords.txt filter
-    common_words_list = load_common_words()
-    
-    if loaded_text_file:
-        try:
-            # Perform text cleaning operations using RE
-            text = loaded_text_file.lower()
-            text = re.sub(r'[\d_]+|[^\w\s]', '', text)
+    # Accesses the .txt file from URL and returns contents as string object
+    try:
+        response = requests.get(user_url)
+        if response.status_code == 200:
+            response.encoding = 'utf-8'
+            text_file_data = response.text
+            
+            # Retrieves the filename
+            filename = user_url.split('/')
+            filename = filename[-1:]
 
-            # Creat list of words not found in the common_words_list filter, rejoin as string
-            filtered_words = [word for word in text.split() if word not in common_words_list]
-            cleaned_content = ' '.join(filtered_words)
+            print(f'\nSuccessfully accessed {filename} file!')
+            return filename, text_file_data
             
-            return cleaned_content
+        else:
+            print(ui_helpers.RED + 'Failed to retrieve data.', response.status_code + ui_helpers.RESET + 'Please check the URL or your connection and try again.')
+    
+    except requests.exceptions.RequestException as e:
+        print(ui_helpers.RED + 'TextAnalysis encountered an error retrieving the URL!' + ui_helpers.RESET)
+
+# Performs word frequency analysis with user parameters
+def tally_words(text_file_data, common_list):
+    r"""
+    Counts the words in the user-specified text file which was loaded by the load_textfile function.
+    Normalizes the words by stripping most punctuation, whitespace, and converts capital letters to
+    lowercase. These noramlized words are then compared to the common_list object, and if not present,
+    added to the wordtally dictionary. Finally, the function displays the number of user-specified
+    words most commonly found in the text file by rank, showing both the word itself and number of
+    occurrences within the text.
+
+    Explanation of REGEX: 
+    - \b[a-zA-Z]+       Matches the beginning of a word followed by one or more letters
+    - (?:-[a-zA-Z]+)*   Matches zero or more occurrences of a hyphen followed by more letters
+    - (?<=\w)           Looks behind to ensure apostrophes are preceded by a word
+    - [\'’]             Matches an apostrophe, either straight or curly character type
+    - (?![sSdD]\b)      Looks ahead to ensure the apostrophe is NOT followed by "s, S, d, D" at a word boundary
+    - [a-zA-Z]+         Matches one or more letters following the apostrophe (to include contractions)
+    - \b                Matches the end of a word
+
+    Parameters:
+    text_file_data: This should be a string returned by load_textfile()
+    common_list: A list object of words to filter returned by load_common_words()
+
+    Returns:
+    wordtally_dict - a dictionary containing all words from text_file_data and NOT in common_list with number of occurrences (k:v = word:count)
+
+    Raises:
+    - Exception - for other unexpected issues 
+
+    Notes:
+    - Changes to "Textfiles" directory before looking for file
+    - Loads text files in UTF-8 for compatability
+    - Will pause every 2,500 lines if the user selects a number > 2,500 to list 
+    """
+
+    wordtally_dict = {}
+
+    if text_file_data:
+        try:
+            # Separates, filters, and counts each word in the lower-case normalized text_file_data
+            Tokenizer(common_list, min_length=3).tally(text_file_data, wordtally_dict)
         
+            return wordtally_dict
+
         except Exception as e:
-            print(ui_helpers.RED + f'An error was encountered while trying to normalize and filter the .txt file: {e}' + ui_helpers.RESET)
+            ui_helpers.clear_screen()
+            print(ui_helpers.RED + f'TextAnalysis encountered an unexpected error during the word_tally function: {e} ' + ui_helpers.RESET)
+            input('...')
 
     else:
-        print(ui_helpers.RED + 'The clean_strip_txt_file function failed because it was not given a valid string containing the contents of a .txt file')
-        input(ui_helpers.RESET + 'Press Enter to continue.')
+        print(ui_helpers.RED + 'Error: A string containing text data was expected by the tally_words function, but was not found')
+        input(ui_helpers.RESET + '\nPress Enter to continue.')
 
-# URL-based text file open
-def url_text_file_open(user_url):
+
+# Checks whether a file can be tokenized as raw bytes
+def is_ascii_safe(buffer):
     """
-    Prompts the user for a URL pointing to a .txt file and attempts to download and analyze the text. The function
-    fetches the file, loads common words for filtering, and prompts the user for the number of most commonly used 
-    words to display. It then normalizes and tallies the words, excluding those found in commonwords.txt, and 
-    displays the results.
-    
+    Determines whether Tokenizer.tally_bytes will give exactly the same words as the str-based Tokenizer.tally for the contents of buffer. The bytes REGEX treats every non-ASCII character as a non-letter, which is only correct when:
+    - the content is valid UTF-8,
+    - no non-ASCII letter or digit (i.e., the "é" in "café") touches an ASCII letter, digit, or underscore, since that changes where words begin and end, and
+    - no non-ASCII character lower-cases into ASCII (i.e., the Kelvin sign).
+
+    Punctuation such as curly quotes, dashes, and the byte order mark is therefore safe. Each distinct run of non-ASCII bytes is only checked once.
+
+    Parameters:
+    buffer - a bytes-like object, such as an mmap of a .txt file.
+
+    Returns:
+    True if the bytes path is safe to use, False otherwise.
+    """
+    checked_runs = set()
+
+    for match in NON_ASCII_PATTERN_BYTES.finditer(buffer):
+        start, end = match.span()
+        before = buffer[start - 1:start] if start > 0 else b''
+        after = buffer[end:end + 1]
+        run = (before.isalnum() or before == b'_', match.group(), after.isalnum() or after == b'_')
+
+        if run in checked_runs:
+            continue
+        checked_runs.add(run)
+
+        touches_before, run_bytes, touches_after = run
+        try:
+            characters = run_bytes.decode('utf-8')
+        except UnicodeDecodeError:
+            return False
+
+        # Non-ASCII letters or digits next to ASCII word characters move word boundaries
+        if touches_before and (characters[0].isalnum() or characters[0] == '_'):
+            return False
+        if touches_after and (characters[-1].isalnum() or characters[-1] == '_'):
+            return False
+
+        # Characters which lower-case into ASCII would create words the bytes REGEX cannot see
+        if any(ord(character) < 128 for character in characters.lower()):
+            return False
+
+    return True
+
+# Performs word frequency analysis directly over a memory-mapped local file
+def tally_words_mmap(filename, common_list):
+    """
+    Counts the words in a .txt file from the Textfiles subdirectory by running the bytes REGEX directly over an mmap of the file, rather than decoding it into a Python string first. Tokens are lower-cased with ASCII rules and only the distinct matched tokens are decoded. Because the file is read through the operating system's page cache, repeated analyses of the same Textfiles are nearly free.
+
+    If the file contains non-ASCII content that would change the results (see is_ascii_safe), or cannot be memory-mapped (i.e., it is empty), the file is tallied by the decode path in tally_words_streaming instead. Either way the result is identical to tally_words(load_textfile(filename), common_list).
+
+    Parameters:
+    filename - the name of the file in the Textfiles subdirectory.
+    common_list - a list object of words to filter returned by load_common_words().
+
+    Returns:
+    wordtally_dict - a dictionary containing all words from the file and NOT in common_list with number of occurrences (k:v = word:count)
+
+    Raises:
+    - FileNotFoundError - if text file is not found in Textfiles directory
+    - Exception - for other unexpected issues
+    """
+    # Moves to 'Textfiles' directory
+    ui_helpers.move_to_textfiles()
+
+    try:
+        with open(filename, 'rb') as text_file:
+            with mmap.mmap(text_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                if is_ascii_safe(buffer):
+                    return Tokenizer(common_list, min_length=3).tally_bytes(buffer)
+
+    except FileNotFoundError:
+        print(ui_helpers.RED + 'The file was not found!' + ui_helpers.RESET + 'Please try again.')
+        return None
+
+    except (ValueError, OSError):
+        # Empty files and special files cannot be memory-mapped
+        pass
+
+    return tally_words_streaming(filename, common_list)
+
+# Performs word frequency analysis on a local file without loading it into memory all at once
+def tally_words_streaming(filename, common_list, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Counts the words in a .txt file from the Textfiles subdirectory by reading it in buffered chunks instead of loading the whole file with load_textfile. Peak memory depends on chunk_size rather than on the size of the file, which allows very large files (i.e., archive dumps) to be tallied.
+
+    Words can never contain whitespace, so each chunk is only counted up to its last whitespace character. The remainder (a possibly incomplete word) is carried over and joined to the start of the next chunk. This guarantees that words split across chunk boundaries are counted exactly once and that the result is identical to tally_words(load_textfile(filename), common_list).
+
+    Parameters:
+    filename - the name of the file in the Textfiles subdirectory.
+    common_list - a list object of words to filter returned by load_common_words().
+    chunk_size - the number of characters read per chunk. Default is STREAM_CHUNK_SIZE (1 MiB).
+
+    Returns:
+    wordtally_dict - a dictionary containing all words from the file and NOT in common_list with number of occurrences (k:v = word:count)
+
+    Raises:
+    - FileNotFoundError - if text file is not found in Textfiles directory
+    - Exception - for other unexpected issues
+    """
+    # Moves to 'Textfiles' directory
+    ui_helpers.move_to_textfiles()
+
+    tokenizer = Tokenizer(common_list, min_length=3)
+    wordtally_dict = {}
+
+    try:
+        with open(filename, 'r', encoding='utf-8') as text_file:
+            for text in iter_text_chunks(text_file, chunk_size):
+                tokenizer.tally(text, wordtally_dict)
+
+        return wordtally_dict
+
+    except FileNotFoundError:
+        print(ui_helpers.RED + 'The file was not found!' + ui_helpers.RESET + 'Please try again.')
+        return None
+
+    except Exception as e:
+        print(ui_helpers.RED + f'TextAnalysis encountered an unexpected error during the tally_words_streaming function: {e} ' + ui_helpers.RESET)
+        return None
+
+# Reads an open text file in whitespace-aligned chunks
+def iter_text_chunks(text_file, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the contents of an open text file in chunks of roughly chunk_size characters, each ending at a whitespace character. Words can never contain whitespace, so each chunk is only yielded up to its last whitespace character and the remainder (a possibly incomplete word) is carried over and joined to the start of the next chunk. Tokenizing the chunks one by one therefore gives exactly the same words as tokenizing the whole file.
+
+    Parameters:
+    text_file - a file object opened in text mode.
+    chunk_size - the number of characters read per chunk. Default is STREAM_CHUNK_SIZE (1 MiB).
+
+    Yields:
+    text - the next whitespace-aligned chunk of the file.
+    """
+    return align_text_chunks(iter(lambda: text_file.read(chunk_size), ''))
+
+# Re-cuts any stream of text chunks at whitespace
+def align_text_chunks(chunks):
+    """
+    Yields the text of an iterable of string chunks (i.e., file reads or a streamed URL response) re-cut so that every piece ends at a whitespace character, carrying any incomplete word over to the next piece. See iter_text_chunks.
+
+    Parameters:
+    chunks - an iterable of strings.
+
+    Yields:
+    text - the next whitespace-aligned piece of text.
+    """
+    carry = ''
+    for chunk in chunks:
+        if not chunk:
+            continue
+
+        # Yields everything up to the last whitespace, carries the rest into the next chunk
+        text = carry + chunk
+        cut = max(text.rfind(whitespace) for whitespace in ' \n\t\r\f\v')
+        if cut == -1:
+            carry = text
+            continue
+
+        yield text[:cut]
+        carry = text[cut:]
+
+    # Yields whatever remains after the final chunk
+    if carry:
+        yield carry
+
+# Hashes the active word filter
+def filter_hash(common_list, min_length=3):
+    """
+    Returns a hash identifying a Word Count filter (the common words and the minimum word length), used to key cached and incremental tally results so that they are invalidated when commonwords.txt changes.
+
+    Parameters:
+    common_list - a list object of words to filter returned by load_common_words().
+    min_length - the minimum word length used by the Tokenizer.
+
+    Returns:
+    filter_hash - a hexadecimal string.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f'{min_length}\n'.encode('utf-8'))
+    digest.update('\n'.join(sorted(set(common_list))).encode('utf-8'))
+    return digest.hexdigest()
+
+# On-disk cache of tally results keyed by file content and filter
+class TallyCache:
+    """
+    Persistent cache of wordtally dictionaries stored in the 'TallyCache' subdirectory, so that re-analyzing unchanged Textfiles only costs reading the cached result.
+
+    Each entry is keyed by a hash of the file's contents, a hash of the active filter (the common words and minimum word length), and TOKENIZER_VERSION. Editing the file or commonwords.txt therefore changes the key, and stale entries are never returned. To avoid re-hashing unchanged files, content hashes are remembered by file path, size and modification time in an index file. When the cache grows beyond max_bytes, the least recently used entries are deleted first.
+
+    Parameters:
+    max_bytes - the largest total size of the cache in bytes. Default is TALLY_CACHE_MAX_BYTES.
+
+    Methods:
+    key(filename, common_list, min_length) - returns the cache key for a file in the Textfiles subdirectory.
+    get(key) - returns the cached wordtally dictionary, or None if it is not cached.
+    put(key, wordtally_dict) - stores a wordtally dictionary and evicts old entries if needed.
+    evict() - deletes least recently used entries until the cache is within max_bytes.
+    save_index() - writes the remembered content hashes to disk.
+    """
+    def __init__(self, max_bytes=TALLY_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.filter_hashes = {}
+        self.hash_index = {}
+
+        # Loads the remembered content hashes
+        try:
+            ui_helpers.move_to_tally_cache()
+            with open(TALLY_CACHE_INDEX, 'r', encoding='utf-8') as index_file:
+                self.hash_index = json.load(index_file)
+        except (FileNotFoundError, ValueError):
+            self.hash_index = {}
+
+    def content_hash(self, filename):
+        path = os.path.join(ui_helpers.script_dir, 'Textfiles', filename)
+        stat = os.stat(path)
+        remembered = self.hash_index.get(path)
+        if remembered and remembered[0] == stat.st_size and remembered[1] == stat.st_mtime_ns:
+            return remembered[2]
+
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as text_file:
+            for block in iter(lambda: text_file.read(STREAM_CHUNK_SIZE), b''):
+                digest.update(block)
+        self.hash_index[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+
+        return digest.hexdigest()
+
+    def filter_hash(self, common_list, min_length=3):
+        cache_id = (id(common_list), len(common_list), min_length)
+        if cache_id not in self.filter_hashes:
+            self.filter_hashes[cache_id] = filter_hash(common_list, min_length)
+        return self.filter_hashes[cache_id]
+
+    def key(self, filename, common_list, min_length=3):
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f'{TOKENIZER_VERSION}:{self.content_hash(filename)}:{self.filter_hash(common_list, min_length)}'.encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        ui_helpers.move_to_tally_cache()
+        try:
+            with open(key + '.pickle', 'rb') as cache_file:
+                wordtally_dict = pickle.load(cache_file)
+
+            # Marks the entry as recently used
+            os.utime(key + '.pickle')
+            return wordtally_dict
+
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def put(self, key, wordtally_dict):
+        if wordtally_dict is None:
+            return
+        ui_helpers.move_to_tally_cache()
+        with open(key + '.pickle.tmp', 'wb') as cache_file:
+            pickle.dump(wordtally_dict, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(key + '.pickle.tmp', key + '.pickle')
+        self.evict()
+
+    def evict(self):
+        ui_helpers.move_to_tally_cache()
+        entries = [(os.path.getmtime(name), os.path.getsize(name), name) for name in os.listdir() if name.endswith('.pickle')]
+        total_bytes = sum(size for last_used, size, name in entries)
+
+        # Deletes the least recently used entries first
+        for last_used, size, name in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            os.remove(name)
+            total_bytes -= size
+
+    def save_index(self):
+        ui_helpers.move_to_tally_cache()
+        with open(TALLY_CACHE_INDEX, 'w', encoding='utf-8') as index_file:
+            json.dump(self.hash_index, index_file)
+
+# Counts only the text appended to a file since it was last tallied
+class IncrementalTally:
+    """
+    Incremental Word Count for append-only .txt files in the Textfiles subdirectory (i.e., transcripts and logs which only ever grow). The state of the last tally is kept in the TallyCache subdirectory: the byte offset reached, the trailing partial token after the last whitespace (which may still grow), and the counts of everything before it. update() reads and counts only the bytes appended since then.
+
+    Each state belongs to one file, filter and (optionally) database, so every database receives exactly the changes since its own last update. If the file shrank or its previously counted bytes changed, the file is counted again from the start; the returned delta still brings earlier totals up to date.
+
+    Parameters:
+    filename - the name of the file in the Textfiles subdirectory.
+    common_list - a list object of words to filter returned by load_common_words().
+    database_name - optional name of the SQL database this state is kept for.
+
+    Attributes:
+    doc_id - the Documents doc_id of the file in database_name, or None if it has not been exported yet.
+
+    Methods:
+    update() - counts the appended text and returns the delta dictionary {word:change}.
+    counts() - returns the wordtally dictionary of the whole file as of the last update.
+    save() - writes the state to the TallyCache subdirectory.
+    """
+    def __init__(self, filename, common_list, database_name=None):
+        self.filename = filename
+        self.path = os.path.join(ui_helpers.script_dir, 'Textfiles', filename)
+        self.tokenizer = Tokenizer(common_list, min_length=3)
+
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f'{TOKENIZER_VERSION}:{self.path}:{database_name}:{filter_hash(common_list)}'.encode('utf-8'))
+        self.state_name = digest.hexdigest() + INCREMENTAL_STATE_SUFFIX
+        self.state = self._load_state()
+
+    @property
+    def doc_id(self):
+        return self.state['doc_id']
+
+    @doc_id.setter
+    def doc_id(self, doc_id):
+        self.state['doc_id'] = doc_id
+
+    def _load_state(self):
+        ui_helpers.move_to_tally_cache()
+        try:
+            with open(self.state_name, 'rb') as state_file:
+                return pickle.load(state_file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return {'offset': 0, 'carry': '', 'committed': {}, 'check': '', 'doc_id': None}
+
+    def _check_hash(self, text_file, offset):
+        # Hashes the bytes just before offset to detect files which were edited rather than appended to
+        start = max(0, offset - INCREMENTAL_CHECK_BYTES)
+        text_file.seek(start)
+        return hashlib.blake2b(text_file.read(offset - start), digest_size=20).hexdigest()
+
+    def counts(self):
+        wordtally_dict = dict(self.state['committed'])
+        if self.state['carry']:
+            self.tokenizer.tally(self.state['carry'], wordtally_dict)
+        return wordtally_dict
+
+    def update(self):
+        previous_counts = self.counts()
+        state = self.state
+
+        with open(self.path, 'rb') as text_file:
+            size = os.fstat(text_file.fileno()).st_size
+
+            # Starts over if the file is no longer an extension of what was counted
+            if state['offset'] and (size < state['offset'] or self._check_hash(text_file, state['offset']) != state['check']):
+                print(ui_helpers.YELLOW + f'{self.filename} was changed, not only appended to. Counting it again from the start...' + ui_helpers.RESET)
+                state = {'offset': 0, 'carry': '', 'committed': {}, 'check': '', 'doc_id': state['doc_id']}
+
+            # Counts the appended bytes up to their last whitespace and carries the partial token
+            text_file.seek(state['offset'])
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            committed = dict(state['committed'])
+            carry = state['carry']
+            for block in iter(lambda: text_file.read(STREAM_CHUNK_SIZE), b''):
+                text = carry + decoder.decode(block)
+                cut = max(text.rfind(whitespace) for whitespace in ' \n\t\r\f\v')
+                if cut == -1:
+                    carry = text
+                    continue
+                self.tokenizer.tally(text[:cut], committed)
+                carry = text[cut:]
+
+            # Bytes of an incomplete UTF-8 character are left for the next update
+            offset = text_file.tell() - len(decoder.getstate()[0])
+            check = self._check_hash(text_file, offset)
+
+        self.state = {'offset': offset, 'carry': carry, 'committed': committed, 'check': check, 'doc_id': state['doc_id']}
+
+        # Difference between the new and previous totals (negative if a partial token grew into another word)
+        new_counts = self.counts()
+        delta_dict = {}
+        for word, count in new_counts.items():
+            change = count - previous_counts.get(word, 0)
+            if change:
+                delta_dict[word] = change
+        for word, count in previous_counts.items():
+            if word not in new_counts:
+                delta_dict[word] = -count
+
+        return delta_dict
+
+    def save(self):
+        ui_helpers.move_to_tally_cache()
+        with open(self.state_name + '.tmp', 'wb') as state_file:
+            pickle.dump(self.state, state_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self.state_name + '.tmp', self.state_name)
+
+# Performs word frequency analysis on many local files in parallel
+def tally_corpus(files_to_process, common_list, max_workers=TALLY_WORKERS, use_cache=True):
+    """
+    Counts the words in each of the user-selected files from the Textfiles subdirectory, fanning the files out to a pool of worker processes so that a large corpus uses every CPU core rather than one. Each file is tallied by tally_words_mmap in its own process.
+
+    Results are collected in the same order as files_to_process, regardless of which worker finishes first, so word_counts_to_df produces exactly the same DataFrame as tallying the files one at a time.
+
+    Parameters:
+    files_to_process - a list of file names to tally. Usually determined by the ui_helpers.list_select_textfile() function.
+    common_list - a list object of words to filter returned by load_common_words().
+    max_workers - the number of worker processes to use. Default is TALLY_WORKERS (None uses every available CPU core). Use 1 to tally serially.
+    use_cache - if True (default), unchanged files are read from the TallyCache instead of being tallied again, and new results are added to it.
+
+    Returns:
+    word_counts_all_docs - a dictionary structured {filename:{word:counts}} in the order of files_to_process.
+
+    Notes:
+    - Falls back to tallying serially if the process pool cannot be started.
+    """
+    if use_cache:
+        return tally_corpus_cached(files_to_process, common_list, max_workers)
+
+    word_counts_all_docs = {}
+
+    # Splits a single file across the workers instead
+    if len(files_to_process) == 1 and max_workers != 1:
+        filename = files_to_process[0]
+        word_counts_all_docs[filename] = tally_words_parallel(filename, common_list, max_workers)
+        return word_counts_all_docs
+
+    # Tallies serially when a process pool would not help
+    if max_workers == 1 or len(files_to_process) < 2:
+        for filename in files_to_process:
+            word_counts_all_docs[filename] = tally_words_mmap(filename, common_list)
+        return word_counts_all_docs
+
+    try:
+        # Fans the files out to the process pool; map() returns results in submission order
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(tally_words_mmap, files_to_process, repeat(common_list))
+
+            for filename, wordtally_dict in zip(files_to_process, results):
+                word_counts_all_docs[filename] = wordtally_dict
+
+        return word_counts_all_docs
+
+    except (BrokenProcessPool, OSError) as e:
+        print(ui_helpers.YELLOW + f'Parallel tally unavailable ({e}). Tallying files one at a time instead...' + ui_helpers.RESET)
+        return tally_corpus(files_to_process, common_list, max_workers=1, use_cache=False)
+
+# Performs word frequency analysis on many local files, reusing cached results for unchanged files
+def tally_corpus_cached(files_to_process, common_list, max_workers=TALLY_WORKERS):
+    """
+    Cached version of tally_corpus. Files whose contents and filter match a TallyCache entry are read from the cache; only the remaining files are tallied (in parallel, see tally_corpus) and then stored in the cache.
+
+    Parameters:
+    files_to_process - a list of file names to tally. Usually determined by the ui_helpers.list_select_textfile() function.
+    common_list - a list object of words to filter returned by load_common_words().
+    max_workers - the number of worker processes to use for files which are not cached.
+
+    Returns:
+    word_counts_all_docs - a dictionary structured {filename:{word:counts}} in the order of files_to_process.
+
+    Notes:
+    - If the cache cannot be used (i.e., a file is missing or the disk is read-only), the files are tallied without it.
+    """
+    try:
+        cache = TallyCache()
+        keys = {filename: cache.key(filename, common_list) for filename in files_to_process}
+        cached_counts = {filename: cache.get(key) for filename, key in keys.items()}
+        cache.save_index()
+
+    except OSError:
+        return tally_corpus(files_to_process, common_list, max_workers, use_cache=False)
+
+    # Tallies only the files which are not cached
+    files_to_tally = [filename for filename in files_to_process if cached_counts[filename] is None]
+    if files_to_tally:
+        new_counts = tally_corpus(files_to_tally, common_list, max_workers, use_cache=False)
+        for filename, wordtally_dict in new_counts.items():
+            cached_counts[filename] = wordtally_dict
+            try:
+                cache.put(keys[filename], wordtally_dict)
+            except OSError as e:
+                print(ui_helpers.YELLOW + f'Could not save {filename} to the tally cache ({e}).' + ui_helpers.RESET)
+
+    return {filename: cached_counts[filename] for filename in files_to_process}
+
+# Finds byte offsets that split a file into roughly equal ranges at whitespace
+def split_file_at_whitespace(filename, parts):
+    """
+    Divides a file into (start, end) byte ranges of roughly equal size for tally_words_parallel. Each split point is moved forward to the next ASCII whitespace byte, so no word, hyphenated word, or contraction is ever split between two ranges. Because UTF-8 never uses ASCII bytes inside a multi-byte character, every range can also be decoded on its own.
+
+    Parameters:
+    filename - the path of the file to split.
+    parts - the desired number of ranges.
+
+    Returns:
+    ranges - a list of (start, end) byte offsets covering the whole file in order. May contain fewer than 'parts' ranges.
+    """
+    file_size = os.path.getsize(filename)
+    offsets = [0]
+
+    with open(filename, 'rb') as text_file:
+        for part in range(1, parts):
+            # Starts searching at the ideal split point, or after the previous split if it ran past it
+            position = max(file_size * part // parts, offsets[-1] + 1)
+            text_file.seek(position)
+
+            # Reads forward until a whitespace byte is found or the end of the file is reached
+            while position < file_size:
+                block = text_file.read(64 * 1024)
+                match = re.search(rb'[ \t\n\r\f\v]', block)
+                if match:
+                    position += match.start()
+                    break
+                position += len(block)
+
+            if position >= file_size:
+                break
+            offsets.append(position)
+
+    offsets.append(file_size)
+    return list(zip(offsets[:-1], offsets[1:]))
+
+# Tallies one byte range of a file (run inside a worker process by tally_words_parallel)
+def tally_byte_range(filename, start, end, common_list, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Counts the words between two byte offsets of a file. Reads the range in chunks, cutting each chunk at its last whitespace byte and carrying the remainder forward (as in tally_words_streaming), so memory use stays bounded even for very large ranges.
+
+    Parameters:
+    filename - the path of the file.
+    start - the byte offset where the range begins. Must be 0 or the offset of a whitespace byte.
+    end - the byte offset where the range ends.
+    common_list - a list object of words to filter returned by load_common_words().
+    chunk_size - the number of bytes read per chunk. Default is STREAM_CHUNK_SIZE.
+
+    Returns:
+    wordtally_dict - a dictionary of word counts for the range (k:v = word:count)
+    """
+    tokenizer = Tokenizer(common_list, min_length=3)
+    wordtally_dict = {}
+    carry = b''
+
+    with open(filename, 'rb') as text_file:
+        text_file.seek(start)
+        remaining = end - start
+
+        while remaining > 0:
+            chunk = text_file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+
+            # Counts everything up to the last whitespace byte, carries the rest into the next chunk
+            data = carry + chunk
+            cut = max(data.rfind(whitespace) for whitespace in (b' ', b'\n', b'\t', b'\r', b'\f', b'\v'))
+            if cut == -1:
+                carry = data
+                continue
+
+            tokenizer.tally(data[:cut].decode('utf-8'), wordtally_dict)
+            carry = data[cut:]
+
+    # Counts whatever remains at the end of the range
+    if carry:
+        tokenizer.tally(carry.decode('utf-8'), wordtally_dict)
+
+    return wordtally_dict
+
+# Performs word frequency analysis on one very large local file using several processes
+def tally_words_parallel(filename, common_list, max_workers=TALLY_WORKERS):
+    """
+    Counts the words in a single .txt file from the Textfiles subdirectory by splitting it into byte ranges aligned to whitespace (see split_file_at_whitespace) and tallying each range in a separate worker process. The partial counts are merged in file order, so the result (including the order of the words) is exactly the same as tally_words_streaming, even for hyphenated words and contractions near a split point.
+
+    Files smaller than two PARALLEL_MIN_RANGE_SIZE ranges are tallied by tally_words_mmap, since starting the workers would cost more than it saves.
+
+    Parameters:
+    filename - the name of the file in the Textfiles subdirectory.
+    common_list - a list object of words to filter returned by load_common_words().
+    max_workers - the number of worker processes to use. Default is TALLY_WORKERS (None uses every available CPU core).
+
+    Returns:
+    wordtally_dict - a dictionary containing all words from the file and NOT in common_list with number of occurrences (k:v = word:count)
+
+    Raises:
+    - FileNotFoundError - if text file is not found in Textfiles directory
+    - Exception - for other unexpected issues
+    """
+    # Moves to 'Textfiles' directory
+    ui_helpers.move_to_textfiles()
+
+    try:
+        path = os.path.abspath(filename)
+        workers = max_workers or os.cpu_count() or 1
+        parts = min(workers, os.path.getsize(path) // PARALLEL_MIN_RANGE_SIZE)
+
+        if parts < 2:
+            return tally_words_mmap(filename, common_list)
+
+        ranges = split_file_at_whitespace(path, parts)
+        starts = [start for start, end in ranges]
+        ends = [end for start, end in ranges]
+
+        # Tallies each range in its own process, then merges the partial counts in file order
+        wordtally_dict = {}
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            for partial_dict in executor.map(tally_byte_range, repeat(path), starts, ends, repeat(common_list)):
+                for word, count in partial_dict.items():
+                    wordtally_dict[word] = wordtally_dict.get(word, 0) + count
+
+        return wordtally_dict
+
+    except FileNotFoundError:
+        print(ui_helpers.RED + 'The file was not found!' + ui_helpers.RESET + 'Please try again.')
+        return None
+
+    except (BrokenProcessPool, OSError) as e:
+        print(ui_helpers.YELLOW + f'Parallel tally unavailable ({e}). Tallying the file in a single process instead...' + ui_helpers.RESET)
+        return tally_words_mmap(filename, common_list)
+
+    except Exception as e:
+        print(ui_helpers.RED + f'TextAnalysis encountered an unexpected error during the tally_words_parallel function: {e} ' + ui_helpers.RESET)
+        return None
+
+# Approximate frequency counter with fixed memory
+class CountMinSketch:
+    """
+    Count-Min Sketch: a depth x width table of counters which estimates how often any item was added using a fixed amount of memory, no matter how many distinct items there are. Each item is hashed to one counter per row; its estimate is the smallest of those counters. Estimates are never too low and, with probability about 1 - e^-depth, are at most e/width * total too high.
+
+    Items are given as 64-bit hashes (NumPy uint64 arrays) so that whole batches are added and estimated with vectorized NumPy operations.
+
+    Attributes:
+    width - the number of counters per row.
+    depth - the number of rows (independent hash functions).
+    table - the NumPy int64 array of counters.
+    total - the sum of all counts added.
+
+    Methods:
+    add(hashes, counts) - adds counts to the items with the given hashes.
+    estimate(hashes) - returns the estimated counts of the items with the given hashes.
+    error_bound() - returns the largest expected overestimate of any count.
+    """
+    def __init__(self, width, depth=4, seed=0):
+        self.width = int(width)
+        self.depth = int(depth)
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+
+        # Random odd multipliers and offsets for multiply-shift hashing, one pair per row
+        rng = np.random.default_rng(seed)
+        self.multipliers = rng.integers(0, 2**63, size=self.depth, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.offsets = rng.integers(0, 2**63, size=self.depth, dtype=np.uint64)
+
+    def _columns(self, hashes):
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        mixed = hashes[np.newaxis, :] * self.multipliers[:, np.newaxis] + self.offsets[:, np.newaxis]
+        return ((mixed >> np.uint64(32)) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, hashes, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        columns = self._columns(hashes)
+        for row in range(self.depth):
+            np.add.at(self.table[row], columns[row], counts)
+        self.total += int(counts.sum())
+
+    def estimate(self, hashes):
+        columns = self._columns(hashes)
+        return self.table[np.arange(self.depth)[:, np.newaxis], columns].min(axis=0)
+
+    def error_bound(self):
+        return int(np.ceil(np.e / self.width * self.total))
+
+# Counts bigrams, trigrams, etc. within a memory cap
+class NGramCounter:
+    """
+    Counts n-grams (runs of n consecutive Word Count words, i.e., bigrams or trigrams) fed to it in any number of pieces. Words are usually given by Tokenizer.phrase_words, whose None values mark breaks (a filtered word or the end of a sentence), so only words which are adjacent in the text form an n-gram. N-grams are stored as their words joined by single spaces (i.e., 'jean valjean') so that results are ordinary wordtally dictionaries which work with word_counts_to_df, the DataFrame Transformation menu, and the WordCounts table of SQL databases.
+
+    Counting starts in exact mode using a dictionary. If the dictionary would grow beyond memory_cap, the counter switches to bounded-memory mode: all counts go into a CountMinSketch sized to the memory cap and only a heavy-hitters table of the top_k most frequent n-grams is kept. Counts reported in bounded-memory mode are estimates which are never too low and are at most error_bound() too high.
+
+    Parameters:
+    n - the number of words per n-gram. Default is 2 (bigrams).
+    memory_cap - the approximate memory budget in bytes. Default is NGRAM_MEMORY_CAP.
+    top_k - the number of n-grams kept in bounded-memory mode. Default is NGRAM_TOP_K.
+    exact - None (default) switches modes automatically, True always counts exactly, False starts in bounded-memory mode.
+
+    Methods:
+    update(words) - counts the n-grams of the next iterable of words (None breaks a phrase), including n-grams which span the previous piece.
+    results() - returns the wordtally dictionary {ngram:count} (in bounded-memory mode, the top_k n-grams sorted by count).
+    is_exact() - returns True if counts are still exact.
+    error_bound() - returns the largest expected overestimate of any reported count (0 in exact mode).
+
+    Raises:
+    ValueError - if n is less than 1.
+    """
+    def __init__(self, n=2, memory_cap=NGRAM_MEMORY_CAP, top_k=NGRAM_TOP_K, exact=None):
+        if n < 1:
+            raise ValueError('n must be 1 or greater')
+        self.n = n
+        self.memory_cap = memory_cap
+        self.top_k = top_k
+        self.exact = exact
+        self.counts = {}
+        self.sketch = None
+        self.threshold = 0
+        self.tail = []
+
+        if exact is False:
+            self._switch_to_sketch()
+
+    def update(self, words):
+        words = self.tail + list(words)
+        n = self.n
+
+        # Counts the n-grams within each run of words between breaks
+        batch = Counter()
+        start = 0
+        for end in [position for position, word in enumerate(words) if word is None] + [len(words)]:
+            run = words[start:end]
+            batch.update(' '.join(run[i:i + n]) for i in range(len(run) - n + 1))
+            start = end + 1
+
+        # Keeps the last n-1 words of an unbroken run so that n-grams spanning two pieces are counted
+        self.tail = run[-(n - 1):] if n > 1 else []
+        if not batch:
+            return
+
+        if self.sketch is None:
+            counts = self.counts
+            get = counts.get
+            for ngram, count in batch.items():
+                counts[ngram] = get(ngram, 0) + count
+            if self.exact is None and len(counts) * NGRAM_BYTES_PER_ENTRY > self.memory_cap:
+                self._switch_to_sketch()
+        else:
+            self._add_to_sketch(batch)
+
+    def _switch_to_sketch(self):
+        # Gives the heavy-hitters table its share of the memory cap and the sketch the rest
+        heavy_hitters_bytes = 2 * self.top_k * NGRAM_BYTES_PER_ENTRY
+        width = max(1024, (self.memory_cap - heavy_hitters_bytes) // (4 * 8))
+        self.sketch = CountMinSketch(width, depth=4)
+
+        exact_counts = self.counts
+        self.counts = {}
+        if exact_counts:
+            self._add_to_sketch(exact_counts)
+
+    def _add_to_sketch(self, batch):
+        ngrams = list(batch.keys())
+        counts = np.fromiter(batch.values(), dtype=np.int64, count=len(ngrams))
+        hashes = np.array([hash(ngram) for ngram in ngrams], dtype=np.int64).view(np.uint64)
+        self.sketch.add(hashes, counts)
+        estimates = self.sketch.estimate(hashes).tolist()
+
+        # Heavy hitters: tracked n-grams are refreshed, new ones are admitted above the current threshold
+        heavy_hitters = self.counts
+        threshold = self.threshold
+        for ngram, estimate in zip(ngrams, estimates):
+            if estimate > threshold or ngram in heavy_hitters:
+                heavy_hitters[ngram] = estimate
+
+        # Prunes back to top_k once the table doubles in size
+        if len(heavy_hitters) > 2 * self.top_k:
+            kept = sorted(heavy_hitters.items(), key=lambda item: item[1], reverse=True)[:self.top_k]
+            self.counts = dict(kept)
+            self.threshold = kept[-1][1]
+
+    def results(self):
+        if self.sketch is None:
+            return dict(self.counts)
+        kept = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:self.top_k]
+        return dict(kept)
+
+    def is_exact(self):
+        return self.sketch is None
+
+    def error_bound(self):
+        return 0 if self.sketch is None else self.sketch.error_bound()
+
+# Performs n-gram (phrase) frequency analysis on a local file in bounded memory
+def tally_ngrams_file(filename, common_list, n=2, memory_cap=NGRAM_MEMORY_CAP, top_k=NGRAM_TOP_K, exact=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Counts the n-grams (i.e., bigrams for n=2, trigrams for n=3) of a .txt file from the Textfiles subdirectory, the phrase-level counterpart of tally_words. N-grams are built from the same words that tally_words counts, but never across a word in common_list (or a word shorter than 3 letters) or across sentence punctuation (.!?;:), so every n-gram is a phrase which occurs in the text. See NGramCounter for how exact and bounded-memory modes are chosen.
+
+    The file is read in whitespace-aligned chunks (see iter_text_chunks) so that neither the file nor its full n-gram vocabulary has to fit in memory. N-grams spanning two chunks are counted exactly once.
+
+    Parameters:
+    filename - the name of the file in the Textfiles subdirectory.
+    common_list - a list object of words to filter returned by load_common_words().
+    n - the number of words per n-gram. Default is 2.
+    memory_cap - the approximate memory budget in bytes. Default is NGRAM_MEMORY_CAP.
+    top_k - the number of n-grams kept in bounded-memory mode. Default is NGRAM_TOP_K.
+    exact - None (default) switches modes automatically, True always counts exactly, False always uses bounded memory.
+    chunk_size - the number of characters read per chunk. Default is STREAM_CHUNK_SIZE (1 MiB).
+
+    Returns:
+    ngram_tally_dict - a wordtally dictionary of n-grams and their (possibly estimated) counts (k:v = ngram:count)
+    error_bound - the largest expected overestimate of any count (0 if the counts are exact)
+
+    Raises:
+    - FileNotFoundError - if text file is not found in Textfiles directory
+    - Exception - for other unexpected issues
+    """
+    # Moves to 'Textfiles' directory
+    ui_helpers.move_to_textfiles()
+
+    tokenizer = Tokenizer(common_list, min_length=3)
+    counter = NGramCounter(n, memory_cap, top_k, exact)
+
+    try:
+        with open(filename, 'r', encoding='utf-8') as text_file:
+            for text in iter_text_chunks(text_file, chunk_size):
+                counter.update(tokenizer.phrase_words(text))
+
+        return counter.results(), counter.error_bound()
+
+    except FileNotFoundError:
+        print(ui_helpers.RED + 'The file was not found!' + ui_helpers.RESET + 'Please try again.')
+        return None, None
+
+    except Exception as e:
+        print(ui_helpers.RED + f'TextAnalysis encountered an unexpected error during the tally_ngrams_file function: {e} ' + ui_helpers.RESET)
+        return None, None
+
+# Approximate Top N words using a fixed number of counters
+class StreamingTopK:
+    """
+    Finds the most frequent words of a stream while keeping at most capacity counters (Misra-Gries summary, the counter-based family which also includes Space-Saving). Words are fed in batches (i.e., one whitespace-aligned chunk at a time); whenever more than capacity words are tracked, the (capacity + 1)-th largest count is subtracted from every counter and counters which reach zero are dropped.
+
+    Every reported count is a lower bound: the true count lies between count and count + error_bound(), where error_bound() is the total amount subtracted so far and is never more than total / (capacity + 1). Any word occurring more often than error_bound() times is guaranteed to be tracked.
+
+    Parameters:
+    capacity - the maximum number of counters kept between batches.
+
+    Methods:
+    update(words) - counts the next iterable of words.
+    results(number_to_list) - returns a list of (word, count, error) tuples sorted from greatest to smallest count.
+    error_bound() - returns the largest amount by which any reported count may be too low.
+    """
+    def __init__(self, capacity):
+        self.capacity = max(1, int(capacity))
+        self.counters = {}
+        self.total = 0
+        self.decrement = 0
+
+    def update(self, words):
+        counters = self.counters
+        get = counters.get
+        for word, count in Counter(words).items():
+            counters[word] = get(word, 0) + count
+            self.total += count
+
+        # Keeps the number of counters at capacity by subtracting the (capacity + 1)-th largest count
+        if len(counters) > self.capacity:
+            values = np.fromiter(counters.values(), dtype=np.int64, count=len(counters))
+            position = len(values) - self.capacity - 1
+            cut = int(np.partition(values, position)[position])
+            self.decrement += cut
+            self.counters = {word: count - cut for word, count in counters.items() if count > cut}
+
+    def results(self, number_to_list=None):
+        top_words = sorted(self.counters.items(), key=lambda item: item[1], reverse=True)
+        if number_to_list:
+            top_words = top_words[:number_to_list]
+        return [(word, count, self.decrement) for word, count in top_words]
+
+    def error_bound(self):
+        return self.decrement
+
+# Approximate Top N words of a local file using bounded memory
+def tally_top_k_file(filename, common_list, top_n, capacity=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Streams a .txt file from the Textfiles subdirectory through a StreamingTopK summary to preview its Top N words without building the complete wordtally dictionary. Memory depends on capacity and chunk_size only, which suits enormous files.
+
+    Parameters:
+    filename - the name of the file in the Textfiles subdirectory.
+    common_list - a list object of words to filter returned by load_common_words().
+    top_n - the number of top words to return.
+    capacity - the number of counters to keep. Default is top_n * TOP_K_COUNTERS_PER_RESULT.
+    chunk_size - the number of characters read per chunk. Default is STREAM_CHUNK_SIZE (1 MiB).
+
+    Returns:
+    top_words - a list of (word, count, error) tuples; each true count is between count and count + error.
+
+    Raises:
+    - FileNotFoundError - if text file is not found in Textfiles directory
+    - Exception - for other unexpected issues
+    """
+    # Moves to 'Textfiles' directory
+    ui_helpers.move_to_textfiles()
+
+    tokenizer = Tokenizer(common_list, min_length=3)
+    top_k = StreamingTopK(capacity or top_n * TOP_K_COUNTERS_PER_RESULT)
+
+    try:
+        with open(filename, 'r', encoding='utf-8') as text_file:
+            for text in iter_text_chunks(text_file, chunk_size):
+                top_k.update(tokenizer.words(text))
+
+        return top_k.results(top_n)
+
+    except FileNotFoundError:
+        print(ui_helpers.RED + 'The file was not found!' + ui_helpers.RESET + 'Please try again.')
+        return None
+
+    except Exception as e:
+        print(ui_helpers.RED + f'TextAnalysis encountered an unexpected error during the tally_top_k_file function: {e} ' + ui_helpers.RESET)
+        return None
+
+# Approximate Top N words of a URL, streamed without downloading the whole text first
+def tally_top_k_url(user_url, common_list, top_n, capacity=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Streams the .txt file at a URL through a StreamingTopK summary to preview its Top N words. Unlike url_text_file_open, the response is never held in memory as a single string.
+
     Parameters:
     user_url - the user-specified URL for the .txt to open
+    common_list - a list object of words to filter returned by load_common_words().
+    top_n - the number of top words to return.
+    capacity - the number of counters to keep. Default is top_n * TOP_K_COUNTERS_PER_RESULT.
+    chunk_size - the number of bytes downloaded per chunk. Default is STREAM_CHUNK_SIZE (1 MiB).
+
+    Returns:
+    filename - the name of the file
+    top_words - a list of (word, count, error) tuples; each true count is between count and count + error.
+
+    Raises:
+    Exception: catches unexpected exceptions that may occur during execution.
+    """
+    tokenizer = Tokenizer(common_list, min_length=3)
+    top_k = StreamingTopK(capacity or top_n * TOP_K_COUNTERS_PER_RESULT)
+
+    try:
+        with requests.get(user_url, stream=True) as response:
+            if response.status_code != 200:
+                print(ui_helpers.RED + f'Failed to retrieve data. {response.status_code} ' + ui_helpers.RESET + 'Please check the URL or your connection and try again.')
+                return None, None
+
+            response.encoding = 'utf-8'
+            for text in align_text_chunks(response.iter_content(chunk_size, decode_unicode=True)):
+                top_k.update(tokenizer.words(text))
+
+        # Retrieves the filename
+        filename = user_url.split('/')[-1:]
+
+        return filename, top_k.results(top_n)
+
+    except requests.exceptions.RequestException as e:
+        print(ui_helpers.RED + 'TextAnalysis encountered an error retrieving the URL!' + ui_helpers.RESET)
+        return None, None
+
+# Computes TF-IDF scores from a sparse count matrix
+def tf_idf_from_counts(count_matrix, feature_names, doc_titles, common_list=None):
+    """
+    Applies TF-IDF weighting (TfidfTransformer, using the same defaults as TfidfVectorizer) to a sparse count matrix (i.e., produced by build_id_count_matrix), and returns the scores without densifying them.
+
+    Parameters:
+    count_matrix - a scipy.sparse matrix of word counts (documents x words).
+    feature_names - the list of words for the columns of count_matrix.
+    doc_titles - the document names for the rows of count_matrix.
+    common_list - the word filter the counts were tallied with. Its filter_hash is recorded in the model so that scoring can warn if commonwords.txt changes. Default None (i.e., counts read from a database) records no filter.
+
+    Returns:
+    tfidf_df - a SparseTfidf of TF-IDF scores (documents x words).
+    """
+    # Weighs the counts by inverse document frequency
+    transformer = TfidfTransformer()
+    tfidf_matrix = transformer.fit_transform(count_matrix)
+
+    # Keeps the TF-IDF matrix sparse, along with the fitted vocabulary and IDF weights
+    settings = {'documents': count_matrix.shape[0]}
+    if common_list is not None:
+        settings['filter_hash'] = filter_hash(common_list)
+    model = TfidfModel(feature_names, transformer.idf_, settings)
+    tfidf_df = SparseTfidf(tfidf_matrix, doc_titles, feature_names, model=model)
+
+    return tfidf_df
+
+# Sparse (CSR-backed) TF-IDF result
+class SparseTfidf:
+    """
+    TF-IDF scores kept as a scipy.sparse CSR matrix with document titles (rows) and words (columns), used instead of a dense DataFrame because almost every document/word pair scores zero. A corpus of 2,000 documents and 300,000 words needs about 4.8 GB as a dense float64 DataFrame, but only as much memory as its non-zero scores here.
+
+    SparseTfidf provides the parts of the DataFrame interface used by the TF-IDF menus and visuals, so callers can treat it like tfidf_df: shape, index, columns, head(), loc[doc_title] and iterrows() (which return the non-zero scores of a document as a Series), and to_csv() (written a block of rows at a time). Column operations such as thresholds and word searches are done by apply_threshold_filter, word_search_dataframe, remove_words_from_df, keep_top_n and keep_bottom_n, which accept either a SparseTfidf or a DataFrame.
+
+    Parameters:
+    matrix - a scipy.sparse matrix of TF-IDF scores (documents x words).
+    index - the document titles for the rows.
+    columns - the words for the columns.
+    model - the TfidfModel (vocabulary and IDF weights) the scores were computed with, if any. It is passed on unchanged when words are filtered.
+
+    Methods:
+    head(n) - returns the first n rows as a (dense) DataFrame for display.
+    to_dense(start, stop) - returns rows start to stop as a dense DataFrame.
+    iterrows() - yields (doc_title, Series of non-zero scores) for each document.
+    select_columns(positions) - returns a new SparseTfidf with only the given column positions.
+    column_max() - returns a Series of the largest score of each word.
+    min_max() - returns the smallest and largest scores, counting zeros.
+    to_csv(path, sep, index, header) - writes the scores as a (dense) delimited file without densifying the whole matrix.
+    """
+    # Number of rows densified at a time by to_csv
+    CSV_CHUNK_ROWS = 64
+
+    def __init__(self, matrix, index, columns, model=None):
+        self.matrix = csr_matrix(matrix)
+        self.matrix.sort_indices()
+        self.index = pd.Index(list(index))
+        self.columns = pd.Index(list(columns))
+        self.model = model
+        self.loc = _SparseTfidfLocator(self)
+
+    def __repr__(self):
+        return f'SparseTfidf({self.shape[0]} documents x {self.shape[1]} words, {self.matrix.nnz} non-zero scores)\n{self.head()}'
+
+    def __len__(self):
+        return self.shape[0]
+
+    @property
+    def shape(self):
+        return self.matrix.shape
+
+    @property
+    def empty(self):
+        return self.matrix.shape[0] == 0 or self.matrix.shape[1] == 0
+
+    def to_dense(self, start=0, stop=None):
+        rows = self.matrix[start:stop]
+        return pd.DataFrame(rows.toarray(), index=self.index[start:stop], columns=self.columns)
+
+    def head(self, n=5):
+        return self.to_dense(0, n)
+
+    def row(self, position):
+        start, end = self.matrix.indptr[position], self.matrix.indptr[position + 1]
+        return pd.Series(self.matrix.data[start:end], index=self.columns[self.matrix.indices[start:end]], name=self.index[position])
+
+    def iterrows(self):
+        for position, doc_title in enumerate(self.index):
+            yield doc_title, self.row(position)
+
+    def select_columns(self, positions):
+        positions = np.asarray(positions, dtype=np.intp)
+        return SparseTfidf(self.matrix[:, positions], self.index, self.columns[positions], model=self.model)
+
+    def column_max(self):
+        if self.empty:
+            return pd.Series(dtype=float, index=self.columns)
+        return pd.Series(self.matrix.max(axis=0).toarray().ravel(), index=self.columns)
+
+    def min_max(self):
+        if self.matrix.nnz == 0:
+            return 0.0, 0.0
+        data = self.matrix.data
+        has_zeros = self.matrix.nnz < self.shape[0] * self.shape[1]
+        min_value = min(data.min(), 0.0) if has_zeros else data.min()
+        max_value = max(data.max(), 0.0) if has_zeros else data.max()
+        return min_value, max_value
+
+    def to_csv(self, path, sep=',', index=True, header=True):
+        with open(path, 'w', encoding='utf-8', newline='') as output_file:
+            for start in range(0, max(self.shape[0], 1), self.CSV_CHUNK_ROWS):
+                self.to_dense(start, start + self.CSV_CHUNK_ROWS).to_csv(output_file, sep=sep, index=index, header=header and start == 0)
+
+# Row lookup by document title for SparseTfidf (i.e., tfidf_df.loc[doc_title])
+class _SparseTfidfLocator:
+    def __init__(self, sparse_tfidf):
+        self.sparse_tfidf = sparse_tfidf
+
+    def __getitem__(self, doc_title):
+        return self.sparse_tfidf.row(self.sparse_tfidf.index.get_loc(doc_title))
+
+# Fitted TF-IDF vocabulary and IDF weights, saved to and mapped from the Models subdirectory
+class TfidfModel:
+    """
+    The vocabulary and IDF weights of a TF-IDF analysis, i.e., everything needed to score new documents against the original corpus without refitting it. Every SparseTfidf created by a TF-IDF analysis carries its model (tfidf_df.model), which keeps the full fitted vocabulary even after words are filtered from the scores.
+
+    Models are saved as uncompressed .npz files in the 'Models' subdirectory. Words are stored as a sorted, fixed-width bytes string table (UTF-8), IDF weights as float64 and the settings as a JSON string. load() memory-maps the file instead of reading it, so loading takes the same time for any vocabulary size and only the pages touched while scoring are read from disk. Words are found by binary search (np.searchsorted) on the mapped string table, so no word:column dictionary has to be built either. close() copies the arrays into memory and releases the mapping, i.e., before the file is replaced.
+
+    Parameters:
+    words - the vocabulary, as a list of words or a sorted NumPy bytes array.
+    idf - the IDF weight of each word.
+    settings - a dictionary describing how the model was fitted (i.e., number of documents and, if known, the filter_hash of the word filter the counts were tallied with).
+
+    Methods:
+    transform(word_counts_all_docs) - returns a SparseTfidf of scores for new documents ({doc_title:{word:count}}).
+    save(filename) - writes the model to the Models subdirectory.
+    load(filename) - (class method) maps a saved model from the Models subdirectory.
+    close() - copies a mapped model into memory and closes its file mapping.
+    """
+    # Version of the saved file layout
+    FORMAT_VERSION = 1
+
+    def __init__(self, words, idf, settings=None):
+        self.settings = dict(settings or {})
+        self.mapped_file = None
+        idf = np.asarray(idf, dtype=np.float64)
+
+        # Sorts the vocabulary by its UTF-8 bytes so it can be binary searched
+        if isinstance(words, np.ndarray) and words.dtype.kind == 'S':
+            self.words = words
+            self.idf = idf
+        else:
+            encoded_words = np.array([word.encode('utf-8') for word in words], dtype=bytes)
+            order = np.argsort(encoded_words, kind='stable')
+            self.words = encoded_words[order]
+            self.idf = idf[order]
+
+    def __len__(self):
+        return len(self.words)
+
+    def transform(self, word_counts_all_docs):
+        doc_titles = list(word_counts_all_docs.keys())
+        rows, positions, counts = [], [], []
+
+        # Finds the column of each word by binary search; words outside the vocabulary score zero
+        for row, word_counts in enumerate(word_counts_all_docs.values()):
+            if not word_counts:
+                continue
+            words = np.array([word.encode('utf-8') for word in word_counts.keys()], dtype=bytes)
+            found = np.searchsorted(self.words, words).clip(max=len(self.words) - 1)
+            matched = self.words[found] == words
+            positions.append(found[matched])
+            counts.append(np.fromiter(word_counts.values(), dtype=np.float64, count=len(words))[matched])
+            rows.append(np.full(int(matched.sum()), row, dtype=np.intp))
+
+        # Weighs the counts by the saved IDF and normalizes each document, as TfidfTransformer does
+        if positions:
+            rows, positions, counts = np.concatenate(rows), np.concatenate(positions), np.concatenate(counts)
+        used_columns, columns = np.unique(np.asarray(positions, dtype=np.intp), return_inverse=True)
+        scores = np.asarray(counts, dtype=np.float64) * self.idf[used_columns][columns]
+        tfidf_matrix = normalize(csr_matrix((scores, (np.asarray(rows, dtype=np.intp), columns)), shape=(len(doc_titles), len(used_columns))), norm='l2')
+
+        words = [word.decode('utf-8') for word in self.words[used_columns]]
+        return SparseTfidf(tfidf_matrix, doc_titles, words, model=self)
+
+    def save(self, filename):
+        # Moves to 'Models' directory
+        ui_helpers.move_to_models()
+
+        settings = dict(self.settings, format_version=self.FORMAT_VERSION, words=len(self.words))
+        temp_filename = filename + '.tmp'
+        with open(temp_filename, 'wb') as model_file:
+            np.savez(model_file,
+                     words=self.words,
+                     idf=self.idf,
+                     settings=np.frombuffer(json.dumps(settings).encode('utf-8'), dtype=np.uint8))
+        os.replace(temp_filename, filename)
+
+    @classmethod
+    def load(cls, filename):
+        # Moves to 'Models' directory
+        ui_helpers.move_to_models()
+
+        arrays, mapped_file = _map_npz(filename)
+        settings = json.loads(arrays.pop('settings').tobytes().decode('utf-8'))
+        if settings.get('format_version') != cls.FORMAT_VERSION:
+            del arrays
+            mapped_file.close()
+            raise ValueError(f'unsupported model format version {settings.get("format_version")}')
+
+        model = cls(arrays['words'], arrays['idf'], settings)
+        model.mapped_file = mapped_file
+        return model
+
+    def close(self):
+        if self.mapped_file is None:
+            return
+
+        # Copies the arrays out of the mapping so the model stays usable, then unmaps the file
+        self.words = np.array(self.words)
+        self.idf = np.array(self.idf)
+        try:
+            self.mapped_file.close()
+        except BufferError:
+            pass
+        self.mapped_file = None
+
+# Maps the arrays of an uncompressed .npz file without reading them (returns the arrays and the mmap, which the caller closes)
+def _map_npz(filename):
+    with open(filename, 'rb') as npz_file:
+        mapped_file = mmap.mmap(npz_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    arrays = {}
+    with zipfile.ZipFile(filename) as archive:
+        for member in archive.infolist():
+            if member.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f'{member.filename} is compressed and cannot be memory-mapped')
+
+            # Skips the zip local file header (30 bytes, the member name and its extra field) to the .npy data
+            name_length, extra_length = struct.unpack_from('<HH', mapped_file, member.header_offset + 26)
+            npy_offset = member.header_offset + 30 + name_length + extra_length
+
+            # Reads the .npy header to find the shape, dtype and start of the array
+            npy_header = io.BytesIO(mapped_file[npy_offset:npy_offset + min(member.file_size, 65536)])
+            version = np.lib.format.read_magic(npy_header)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+            shape, fortran_order, dtype = read_header(npy_header)
+
+            arrays[member.filename.removesuffix('.npy')] = np.ndarray(shape, dtype, buffer=mapped_file, offset=npy_offset + npy_header.tell(), order='F' if fortran_order else 'C')
+
+    return arrays, mapped_file
+
+# Saves the model of a TF-IDF analysis
+def save_tfidf_model(tfidf_df, filename):
+    """
+    Saves the vocabulary and IDF weights of a TF-IDF analysis (tfidf_df.model) to the 'Models' subdirectory so that new documents can later be scored against the same corpus with score_text_files_with_model, without refitting. The model keeps the filter_hash of the commonwords.txt filter it was fitted with (see tf_idf_from_counts). A loaded model with the same file name is closed first, so the file can be replaced.
+
+    Parameters:
+    tfidf_df - the SparseTfidf returned by a TF-IDF analysis function.
+    filename - the name of the model file. '.npz' is added if missing.
+
+    Returns:
+    filename - the name of the saved file, or None if the model could not be saved.
+
+    Raises:
+    Exception - for any unexpected errors encountered.
+    """
+    if getattr(tfidf_df, 'model', None) is None:
+        print(ui_helpers.RED + 'This DataFrame has no TF-IDF model to save!' + ui_helpers.RESET)
+        return None
+
+    if not filename.endswith('.npz'):
+        filename += '.npz'
+
+    try:
+        ui_helpers.move_to_models()
+        _close_loaded_models(os.path.abspath(filename))
+        tfidf_df.model.save(filename)
+        return filename
+
+    except Exception as e:
+        print(ui_helpers.RED + f'An error occurred while saving the TF-IDF model: {e}' + ui_helpers.RESET)
+        return None
+
+# Loads a saved TF-IDF model
+def load_tfidf_model(filename):
+    """
+    Memory-maps a TF-IDF model saved by save_tfidf_model from the 'Models' subdirectory. Models are kept for the life of the process and mapped again only if the file changes, in which case the mapping of the older version is closed.
+
+    Parameters:
+    filename - the name of the model file in the Models subdirectory.
 
     Returns:
-    filename - the name of the file
-    text_file_data - a string containing the complete text of the file retrieved at the URL specified. Used by other functions to process the words contained.
+    model - a TfidfModel, or None if the model could not be loaded.
 
     Raises:
-    Exception: catches unexpected exceptions that may occur during execution.
+    FileNotFoundError - if the model is not found in the Models subdirectory.
+    Exception - for any other unexpected errors encountered.
     """
-    # Accesses the .txt file from URL and returns contents as string object
     try:
-        response = requests.get(user_url)
-        if response.status_code == 200:
-            response.encoding = 'utf-8'
-            text_file_data = response.text
-            
-            # Retrieves the filename
-            filename = user_url.split('/')
-            filename = filename[-1:]
+        ui_helpers.move_to_models()
+        model_path = os.path.abspath(filename)
+        model_id = (model_path, os.stat(filename).st_mtime_ns)
+        if model_id not in _LOADED_MODELS:
+            _close_loaded_models(model_path)
+            _LOADED_MODELS[model_id] = TfidfModel.load(filename)
+        return _LOADED_MODELS[model_id]
 
-            print(f'\nSuccessfully accessed {filename} file!')
-            return filename, text_file_data
-            
-        else:
-            print(ui_helpers.RED + 'Failed to retrieve data.', response.status_code + ui_helpers.RESET + 'Please check the URL or your connection and try again.')
-    
-    except requests.exceptions.RequestException as e:
-        print(ui_helpers.RED + 'TextAnalysis encountered an error retrieving the URL!' + ui_helpers.RESET)
+    except FileNotFoundError:
+        print(ui_helpers.RED + 'The model was not found!' + ui_helpers.RESET + 'Please try again.')
+        return None
 
-# Performs word frequency analysis with user parameters
-def tally_words(text_file_data, common_list):
-    r"""
-    Counts the words in the user-specified text file which was loaded by the load_textfile function.
-    Normalizes the words by stripping most punctuation, whitespace, and converts capital letters to
-    lowercase. These noramlized words are then compared to the common_list object, and if not present,
-    added to the wordtally dictionary. Finally, the function displays the number of user-specified
-    words most commonly found in the text file by rank, showing both the word itself and number of
-    occurrences within the text.
+    except Exception as e:
+        print(ui_helpers.RED + f'An error occurred while loading the TF-IDF model: {e}' + ui_helpers.RESET)
+        return None
 
-    Explanation of REGEX: 
-    - \b[a-zA-Z]+       Matches the beginning of a word followed by one or more letters
-    - (?:-[a-zA-Z]+)*   Matches zero or more occurrences of a hyphen followed by more letters
-    - (?<=\w)           Looks behind to ensure apostrophes are preceded by a word
-    - [\'’]             Matches an apostrophe, either straight or curly character type
-    - (?![sSdD]\b)      Looks ahead to ensure the apostrophe is NOT followed by "s, S, d, D" at a word boundary
-    - [a-zA-Z]+         Matches one or more letters following the apostrophe (to include contractions)
-    - \b                Matches the end of a word
+# Models loaded by load_tfidf_model, keyed by path and modification time
+_LOADED_MODELS = {}
+
+# Forgets the loaded models of a file and closes their mappings
+def _close_loaded_models(model_path):
+    for model_id in [model_id for model_id in _LOADED_MODELS if model_id[0] == model_path]:
+        _LOADED_MODELS.pop(model_id).close()
+
+# Scores new text files against a saved TF-IDF model
+def score_text_files_with_model(files_to_process, model_filename):
+    """
+    Computes TF-IDF scores for text files from the Textfiles subdirectory using the vocabulary and IDF weights of a saved model (see save_tfidf_model), i.e., to find what is distinctive about a new document relative to an existing corpus. Nothing is refitted: each file is tallied (using the TallyCache), then weighted by the saved IDF and normalized. Words which are not in the model's vocabulary are ignored. A single file may be scored.
 
     Parameters:
-    text_file_data: This should be a string returned by load_textfile()
-    common_list: A list object of words to filter returned by load_common_words()
+    files_to_process - a list of file names to score. Usually determined by the ui_helpers.list_select_textfile() function.
+    model_filename - the name of the model file in the Models subdirectory.
 
     Returns:
-    wordtally_dict - a dictionary containing all words from text_file_data and NOT in common_list with number of occurrences (k:v = word:count)
+    tfidf_df - a SparseTfidf of TF-IDF scores (documents x words).
+    final_metadata - a dictionary of default metadata for each document (the file name is used as its title).
 
     Raises:
-    - Exception - for other unexpected issues 
-
-    Notes:
-    - Changes to "Textfiles" directory before looking for file
-    - Loads text files in UTF-8 for compatability
-    - Will pause every 2,500 lines if the user selects a number > 2,500 to list 
+    Exception - for any unexpected errors encountered.
     """
+    model = load_tfidf_model(model_filename)
+    if model is None:
+        return None, None
 
-    wordtally_dict = {}
-
-    if text_file_data:
-        try:
-            # REGEX findall method to separate each word from the lower-case normalized string object text_file_data
-            words = re.findall(r"\b[a-zA-Z]+(?:-[a-zA-Z]+)*(?:(?<=\w)[\'’](?![sSdD]\b)[a-zA-Z]+)?\b", text_file_data.lower())
-
-            # Iterate over words list to add to wordtally_dict count
-            for word in words:
-                if word not in common_list and len(word) > 2:
-                    wordtally_dict[word] = wordtally_dict.get(word, 0) + 1
-        
-            return wordtally_dict
-
-        except Exception as e:
-            ui_helpers.clear_screen()
-            print(ui_helpers.RED + f'TextAnalysis encountered an unexpected error during the word_tally function: {e} ' + ui_helpers.RESET)
-            input('...')
+    try:
+        common_list = load_common_words()
+        if model.settings.get('filter_hash') not in (None, filter_hash(common_list)):
+            print(ui_helpers.YELLOW + 'Warning: commonwords.txt has changed since this model was fitted, so some scores may differ.' + ui_helpers.RESET)
+
+        word_counts_all_docs = tally_corpus(files_to_process, common_list)
+        tfidf_df = model.transform(word_counts_all_docs)
+
+        final_metadata = {}
+        for filename in word_counts_all_docs:
+            final_metadata[filename] = {
+                'doc_title': filename,
+                'author': 'Not Entered',
+                'year': '',
+                'genre': 'Not Entered'
+            }
 
-    else:
-        print(ui_helpers.RED + 'Error: A string containing text data was expected by the tally_words function, but was not found')
-        input(ui_helpers.RESET + '\nPress Enter to continue.')
+        return tfidf_df, final_metadata
 
+    except Exception as e:
+        print(ui_helpers.RED + f'An error occurred while scoring the text files: {e}' + ui_helpers.RESET)
+        return None, None
 
 
 def url_tf_idf_analysis(menu_return):
@@ -192,9 +1690,10 @@ def url_tf_idf_analysis(menu_return):
     final_metadata - the dictionary containing the user-defined metadata for each document.
 
     """
-    # Set lists for the TF-IDF Vectorizer and Pandas to use for data organization
-    texts = []
-    file_names = []
+    # Set dictionaries for the word counts and metadata of each document
+    common_words = load_common_words()
+    vocabulary = Vocabulary()
+    id_counts_all_docs = {}
     final_metadata = {}
 
     while True:
@@ -240,9 +1739,9 @@ def url_tf_idf_analysis(menu_return):
             # Opens the URL and returns the filename and entire .txt as a string
             default_filename, text_file_data = url_text_file_open(user_url)
 
-        # If the URL is successfully loaded as a string, it is cleaned/normalized for further processing
+        # If the URL is successfully loaded as a string, it is counted once by the Word Count tally (as in option_1_2)
         if text_file_data:
-            cleaned_content = clean_strip_txt_file(text_file_data)
+            wordtally_dict = tally_words(text_file_data, common_words)
             filename = str(default_filename[0])
 
             # Prompts user to input file metadata
@@ -257,26 +1756,18 @@ def url_tf_idf_analysis(menu_return):
                 'genre': genre
                 }
 
-                # Adds file name and cleaned content to lists for Vectorizer
-                texts.append(cleaned_content)
-                file_names.append(default_filename)
+                # Adds the word counts for the document
+                id_counts_all_docs[doc_title] = vocabulary.encode(wordtally_dict or {})
 
     if len(final_metadata) > 1:
 
-        # Initialize Vectorizer
-        vectorizer = TfidfVectorizer()
-
-        # Load contents of each file into Vectorizer
-        tfidf_matrix = vectorizer.fit_transform(texts)
-
-        # Convert TF-IDF matrix to Pandas DataFrame
-        tfidf_df = pd.DataFrame(tfidf_matrix.toarray(),
-                                index=final_metadata.keys(),
-                                columns=vectorizer.get_feature_names_out())
+        # Compute TF-IDF scores from the word counts without re-tokenizing
+        count_matrix, feature_names = build_id_count_matrix(id_counts_all_docs, vocabulary)
+        tfidf_df = tf_idf_from_counts(count_matrix, feature_names, id_counts_all_docs.keys(), common_words)
         
         # Filter words with very low TF-IDF for data efficiency/performance
         threshold = 0.01
-        tfidf_df = tfidf_df.loc[:, (tfidf_df.max() > threshold)]
+        tfidf_df = apply_threshold_filter(tfidf_df, threshold)
 
         return tfidf_df, final_metadata
 
@@ -292,10 +1783,12 @@ def text_tf_idf_analysis(files_to_process, menu_return):
     Returns:
     tfidf_df - a Pandas DF for use by other functions.
     final_metadata - an optional list of dictionaries containing information about the file processed.
+
+    Notes:
+    - The files are counted by tally_corpus, the same tally used by option_1_1, and its TallyCache entries are shared, so files already analyzed by Word Count are not tokenized again.
     """
-    # Set lists for the TF-IDF Vectorizer and Pandas to use for data organization
-    texts = []
-    file_names = []
+    # Set dictionaries for the word counts and metadata of each document
+    id_counts_all_docs = {}
     final_metadata = {}
 
     # Checks to ensure list has two or more files
@@ -305,18 +1798,15 @@ def text_tf_idf_analysis(files_to_process, menu_return):
         return
 
     try:
-        # Ensures function looks in "Textfiles" subdirectory
-        ui_helpers.move_to_textfiles()
+        # Counts the files with the same parallel, cached tally as Word Count (see tally_corpus), so analyzing the same files in both menus tokenizes them once
+        common_words = load_common_words()
+        corpus_counts = tally_corpus(files_to_process, common_words)
+        vocabulary = Vocabulary()
 
-        # Read each file specified
-        for filename in files_to_process:
-            file_content = load_textfile(filename)
-
-            # If the .txt file is not blank, requests user input file metadata
-            if file_content:
+        for filename, wordtally_dict in corpus_counts.items():
 
-                # Removes common words, numbers, punctuation
-                cleaned_content = clean_strip_txt_file(file_content)
+            # If the .txt file has words, requests user input file metadata
+            if wordtally_dict:
                 doc_title, author, year, genre = ui_helpers.input_file_metadata(filename)
                 
                 # Adds metadata to final_metadata dictionary
@@ -328,86 +1818,226 @@ def text_tf_idf_analysis(files_to_process, menu_return):
                     'genre': genre
                 }
 
-                # Adds file names and cleaned content to lists for Vectorizer
-                texts.append(cleaned_content)
-                file_names.append(filename)
-
-        # Initialize TF-IDF Vectorizer
-        vectorizer = TfidfVectorizer()
-
-        # Load contents of each file into Vectorizer
-        tfidf_matrix = vectorizer.fit_transform(texts)
+                    # Adds the word counts for the document as word ids
+                    id_counts_all_docs[doc_title] = vocabulary.encode(wordtally_dict)
 
-        # Convert TF-IDF matrix to Pandas DataFrame
-        tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), 
-                                index=final_metadata.keys(), 
-                                columns=vectorizer.get_feature_names_out())
+        # Compute TF-IDF scores from the word counts without re-tokenizing
+        count_matrix, feature_names = build_id_count_matrix(id_counts_all_docs, vocabulary)
+        tfidf_df = tf_idf_from_counts(count_matrix, feature_names, id_counts_all_docs.keys(), common_words)
 
         # Filter words with very low TF-IDF for data efficiency/performance
         threshold = 0.01
-        tfidf_df = tfidf_df.loc[:, (tfidf_df.max() > threshold)]
+        tfidf_df = apply_threshold_filter(tfidf_df, threshold)
 
         return tfidf_df, final_metadata
     
     except Exception as e:
         print(ui_helpers.RED + f'An error occurred while trying to analyze the .txt files: {e}' + ui_helpers.RESET)
 
-# TF-IDF SQL Query
-def sql_tf_idf_analysis(df):
-    r"""
-    Performs TF-IDF analysis on a DataFrame created using a SQL query and containing 'word counts by document.' Utilizes TfidfVectorizer for TF-IDF analysis once the DataFrame's data is re-aggregated into the documents dictionary. Creates a final_metadata dictionary for use by other functions (i.e., visuals.create_tf_idf_dash() in displaying document information.)
+# Out-of-core TF-IDF of text files using feature hashing
+def hashing_tf_idf_analysis(files_to_process, menu_return, n_features=HASHING_N_FEATURES, batch_size=HASHING_BATCH_SIZE, reverse_map=True, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Performs TF-IDF analysis on two or more text files which together (or individually) may be larger than memory. Instead of holding every document and a corpus vocabulary, each file is read in whitespace-aligned chunks (see iter_text_chunks) and the word counts of batch_size chunks at a time are hashed into n_features columns by scikit-learn's FeatureHasher (the hashing engine of HashingVectorizer, given the Tokenizer's word counts so that commonwords.txt is applied exactly as in the other analyses). Document frequencies are accumulated in a single array of n_features counts, and IDF weighting (smooth, as TfidfTransformer) and L2 normalization are applied once all files have been read.
+
+    Peak memory depends on batch_size, chunk_size and n_features, plus the sparse result itself, but not on the size of the corpus.
+
+    Because columns are hash buckets rather than words, reverse_map keeps a StreamingTopK summary of the most frequent words while reading and uses it to label their columns, so that the results remain readable in the DataFrame Transformation menu. Columns holding more than one of these words (hash collisions) are labelled 'word1/word2'; columns with no tracked word are labelled '#<column number>'.
 
     Parameters:
-    df - the DataFrame containing 'word counts by document' before TF-IDF scores are computed.
+    files_to_process - a list of file names to perform the analysis. Usually determined by the ui_helpers.list_select_textfile() function.
+    menu_return - specifies where to take the user if fewer than two files are selected.
+    n_features - the number of hash columns. Default is HASHING_N_FEATURES (2**20); more columns mean fewer collisions.
+    batch_size - the number of chunks hashed at a time. Default is HASHING_BATCH_SIZE.
+    reverse_map - if True (default), labels the columns of the most frequent words with the words themselves.
+    chunk_size - the number of characters read per chunk. Default is STREAM_CHUNK_SIZE (1 MiB).
 
     Returns:
-    tfidf_df - a new DataFrame with the same data as the original DataFrame, now including TF-IDF scores.
+    tfidf_df - a SparseTfidf of TF-IDF scores (documents x hash columns).
     final_metadata - a dictionary containing key information about each document included in the DataFrame.
 
     Raises:
     Exception - for any unexpected errors encountered.
     """
+    # Checks to ensure list has two or more files
+    if len(files_to_process) < 2:
+        input(ui_helpers.RED + 'Error! You must select at least two documents to perform TF-IDF analysis!' + ui_helpers.RESET)
+        menu_return()
+        return None, None
 
-    # Aggregate words into documents dictionary
-    documents = {}
     final_metadata = {}
-    
+    files_by_title = {}
+
+    # Requests all metadata first so that the analysis can run unattended
+    for filename in files_to_process:
+        doc_title, author, year, genre = ui_helpers.input_file_metadata(filename)
+        if doc_title not in final_metadata:
+            final_metadata[doc_title] = {
+                'doc_title': doc_title,
+                'author': author,
+                'year': year,
+                'genre': genre
+            }
+            files_by_title[doc_title] = filename
+
     try:
-        for index, row in df.iterrows():
-            doc_title = row['doc_title']
-            if doc_title not in documents:
-                documents[doc_title] = []
-            documents[doc_title].append((row['word'] + ' ') * row['count'])
-
-            # Get document metadata from SQL query
-            if doc_title not in final_metadata:
-                final_metadata[doc_title] = {
-                    'doc_title' : doc_title,
-                    'author' : row['author'],
-                    'year' : row['year'],
-                    'genre' : row['genre']
-                }
-        
-        # Rejoin words to form full document
-        for doc_title in documents:
-            documents[doc_title] = ''.join(documents[doc_title])
+        tokenizer = Tokenizer(load_stopword_filter(), min_length=3)
+        hasher = FeatureHasher(n_features=n_features, input_type='dict', alternate_sign=False)
+        top_words = StreamingTopK(HASHING_REVERSE_MAP_SIZE) if reverse_map else None
+        document_frequency = np.zeros(n_features, dtype=np.int64)
+        doc_rows = []
+
+        # Ensures function looks in "Textfiles" subdirectory
+        ui_helpers.move_to_textfiles()
 
-        # Initialize TF-IDF Vectorizer
-        texts = list(documents.values())
-        vectorizer = TfidfVectorizer()
+        for doc_title, filename in files_by_title.items():
+            doc_row = csr_matrix((1, n_features))
+            batch_counts = []
 
-        # Load contents of each file into Vectorizer
-        tfidf_matrix = vectorizer.fit_transform(texts)
+            with open(filename, 'r', encoding='utf-8') as text_file:
+                for text in iter_text_chunks(text_file, chunk_size):
+                    chunk_counts = Counter(tokenizer.words(text))
+                    if top_words is not None:
+                        top_words.update(chunk_counts)
+                    batch_counts.append(chunk_counts)
+
+                    # Hashes a batch of chunks and adds their rows to the document's row
+                    if len(batch_counts) >= batch_size:
+                        doc_row = doc_row + csr_matrix(np.ones((1, len(batch_counts)))) @ hasher.transform(batch_counts)
+                        batch_counts = []
+
+            if batch_counts:
+                doc_row = doc_row + csr_matrix(np.ones((1, len(batch_counts)))) @ hasher.transform(batch_counts)
+
+            # Accumulates document frequencies from the document's non-zero columns
+            doc_row = csr_matrix(doc_row)
+            doc_row.eliminate_zeros()
+            document_frequency[doc_row.indices] += 1
+            doc_rows.append(doc_row)
+
+        # Applies IDF (smooth, as TfidfTransformer) and normalizes each document
+        count_matrix = vstack(doc_rows).tocsr()
+        n_documents = count_matrix.shape[0]
+        used_columns = np.flatnonzero(document_frequency)
+        idf = np.log((1 + n_documents) / (1 + document_frequency[used_columns])) + 1
+        tfidf_matrix = normalize(count_matrix[:, used_columns] @ diags(idf), norm='l2')
+
+        # Labels the columns, using words for the columns of the most frequent words
+        labels = {}
+        if top_words is not None:
+            mapped_words = [word for word, count, error in top_words.results()]
+            if mapped_words:
+                word_columns = hasher.transform([{word: 1} for word in mapped_words]).tocsr().indices
+                for word, column in zip(mapped_words, word_columns):
+                    labels.setdefault(int(column), []).append(word)
+        columns = ['/'.join(labels[column]) if column in labels else f'#{column}' for column in used_columns.tolist()]
+
+        tfidf_df = SparseTfidf(tfidf_matrix, files_by_title.keys(), columns)
 
-        # Convert TF-IDF matrix to Pandas DataFrame
-        tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), 
-                                index=documents.keys(), 
-                                columns=vectorizer.get_feature_names_out())
+        # Filter words with very low TF-IDF for data efficiency/performance
+        threshold = 0.01
+        tfidf_df = apply_threshold_filter(tfidf_df, threshold)
 
         return tfidf_df, final_metadata
-    
+
+    except FileNotFoundError:
+        print(ui_helpers.RED + 'The file was not found!' + ui_helpers.RESET + 'Please try again.')
+        return None, None
+
+    except Exception as e:
+        print(ui_helpers.RED + f'An error occurred while trying to analyze the .txt files: {e}' + ui_helpers.RESET)
+        return None, None
+
+# Computes TF-IDF scores from the (doc_id, word_id, count) rows of a SQL database
+def sql_tf_idf_from_ids(counts_df, documents_df, words_df):
+    """
+    Performs TF-IDF analysis on the id-based word counts returned by sql_manager.query_sql_word_counts. The (doc_id, word_id, count) rows are turned into NumPy arrays and placed into a sparse document x word matrix with scipy's coo_matrix, then weighted by tf_idf_from_counts. Words are only looked up once per distinct word_id, and no text is rebuilt, so memory and CPU scale with the number of stored counts.
+
+    Documents sharing a title are combined into one row, which keeps the metadata of the first of them.
+
+    Parameters:
+    counts_df - a DataFrame with columns doc_id, word_id, count.
+    documents_df - a DataFrame with columns doc_id, doc_title, author, year, genre.
+    words_df - a DataFrame with columns word_id, word.
+
+    Returns:
+    tfidf_df - a SparseTfidf of TF-IDF scores (documents x words).
+    final_metadata - a dictionary containing key information about each document included in the DataFrame.
+
+    Raises:
+    Exception - for any unexpected errors encountered.
+    """
+    try:
+        count_matrix, words_df, doc_titles, final_metadata = _sql_count_matrix(counts_df, documents_df, words_df)
+        tfidf_df = tf_idf_from_counts(count_matrix, words_df['word'].tolist(), doc_titles)
+
+        return tfidf_df, final_metadata
+
+    except Exception as e:
+        print(ui_helpers.RED + f'An error occurred while attempting to calculate TF-IDF scores: {e}' + ui_helpers.RESET)
+        return None, None
+
+# Computes TF-IDF scores for any subset of a SQL database using its stored document frequencies
+def tf_idf_with_stored_idf(counts_df, documents_df, words_df, total_documents):
+    """
+    Performs TF-IDF analysis on selected documents of a SQL database using the DocumentFrequency table kept up to date by sql_manager.wordtally_to_database (see sql_manager.query_word_counts_with_document_frequency). No vectorizer is fitted: the IDF of each word is computed from its stored document count with the same formula as TfidfTransformer (smooth_idf=True), idf = ln((1 + N) / (1 + doc_count)) + 1, where N is the number of distinct document titles in the whole database (documents sharing a title are combined into one row here and in sql_tf_idf_from_ids, so doc_count counts titles too). Each document's scores are then L2-normalized.
+
+    Because IDF comes from the whole database, scores for a subset of documents match the scores those documents have in a TF-IDF analysis of the full database.
+
+    Parameters:
+    counts_df - a DataFrame with columns doc_id, word_id, count.
+    documents_df - a DataFrame with columns doc_id, doc_title, author, year, genre.
+    words_df - a DataFrame with columns word_id, word, doc_count.
+    total_documents - the number of distinct document titles in the database (N).
+
+    Returns:
+    tfidf_df - a SparseTfidf of TF-IDF scores (documents x words).
+    final_metadata - a dictionary containing key information about each document included in the DataFrame.
+
+    Raises:
+    Exception - for any unexpected errors encountered.
+    """
+    try:
+        count_matrix, words_df, doc_titles, final_metadata = _sql_count_matrix(counts_df, documents_df, words_df)
+
+        # Weighs each column by its stored IDF, then normalizes each document
+        idf = np.log((1 + total_documents) / (1 + words_df['doc_count'].to_numpy(dtype=np.float64))) + 1
+        tfidf_matrix = normalize(count_matrix @ diags(idf), norm='l2')
+
+        model = TfidfModel(words_df['word'].tolist(), idf, {'documents': int(total_documents)})
+        tfidf_df = SparseTfidf(tfidf_matrix, doc_titles, words_df['word'], model=model)
+
+        return tfidf_df, final_metadata
+
     except Exception as e:
         print(ui_helpers.RED + f'An error occurred while attempting to calculate TF-IDF scores: {e}' + ui_helpers.RESET)
+        return None, None
+
+# Builds the sparse count matrix of SQL word counts, with words in alphabetical order
+def _sql_count_matrix(counts_df, documents_df, words_df):
+    # Only documents with counts are included, in doc_id order
+    documents_df = documents_df[documents_df['doc_id'].isin(counts_df['doc_id'])]
+    final_metadata = {}
+    for row in documents_df.itertuples(index=False):
+        if row.doc_title not in final_metadata:
+            final_metadata[row.doc_title] = {
+                'doc_title' : row.doc_title,
+                'author' : row.author,
+                'year' : row.year,
+                'genre' : row.genre
+            }
+
+    # Maps doc_ids to rows (by title) and word_ids to columns (alphabetical, matching TfidfVectorizer)
+    title_positions, doc_titles = pd.factorize(documents_df['doc_title'])
+    row_of_doc_id = pd.Series(title_positions, index=documents_df['doc_id'].to_numpy())
+    words_df = words_df.sort_values('word', kind='stable').reset_index(drop=True)
+    column_of_word_id = pd.Series(np.arange(len(words_df)), index=words_df['word_id'].to_numpy())
+
+    rows = row_of_doc_id.reindex(counts_df['doc_id'].to_numpy()).to_numpy()
+    columns = column_of_word_id.reindex(counts_df['word_id'].to_numpy()).to_numpy()
+    count_matrix = coo_matrix((counts_df['count'].to_numpy(dtype=np.float64), (rows, columns)),
+                              shape=(len(doc_titles), len(words_df))).tocsr()
+
+    return count_matrix, words_df, doc_titles, final_metadata
 
 # Applies user-defined threshold to DataFrame containing TF-IDF scores
 def apply_threshold_filter(tfidf_df, threshold=0.01):
@@ -415,12 +2045,15 @@ def apply_threshold_filter(tfidf_df, threshold=0.01):
     Applies a minimum threshold for filtering scores in a DataFrame which contains TF-IDF values. A TF-IDF typically contains large quantities of words and users often only need a select few.
 
     Parameters:
-    tfidf_df - the DataFrame containing TF-IDF scores
+    tfidf_df - the DataFrame or SparseTfidf containing TF-IDF scores
     threshold - a user-defined minimum threshold below which all columns (words) are removed. Default is .01.
 
     Returns:
     tfidf_df - with values filtered below the threshold.
     """
+    if isinstance(tfidf_df, SparseTfidf):
+        return tfidf_df.select_columns(np.flatnonzero(tfidf_df.column_max().to_numpy() > threshold))
+
     return tfidf_df.loc[:, (tfidf_df.max() > threshold)]
 
 # Calculates the Min and Max values for a DataFrame
@@ -429,13 +2062,16 @@ def get_min_max(df):
     Calculates and returns the Min/Max values for values in a DataFrame. Enables the user to quickly sort or truncate a DF based on TF-IDF values.
 
     Parameters:
-    df - a Pandas DataFrame which contains TF-IDF score calculations. Can be either the TF-IDF or Word Counts DataFrames.
+    df - a Pandas DataFrame (or SparseTfidf) which contains TF-IDF score calculations. Can be either the TF-IDF or Word Counts DataFrames.
 
     Returns:
     min_value - the smallest value in the DataFrame.
     max_value - the largest value in the DataFrame.
     """
 
+    if isinstance(df, SparseTfidf):
+        return df.min_max()
+
     min_value = df.min().min()
     max_value = df.max().max()
 
@@ -447,7 +2083,7 @@ def word_search_dataframe(df, words_list):
     Performs a search within a DataFrame for specific words (columns) and keeps only the user-defined words.
 
     Parameters:
-    df - a Pandas DataFrame which contains Word Counts or TF-IDF scores.
+    df - a Pandas DataFrame (or SparseTfidf) which contains Word Counts or TF-IDF scores.
     words_list - a user-defined list of search words.
 
     Returns:
@@ -456,6 +2092,9 @@ def word_search_dataframe(df, words_list):
 
     # Checks if word is in DF column list and applies filter
     filtered_words = [word for word in words_list if word in df.columns]
+    if isinstance(df, SparseTfidf):
+        return df.select_columns(df.columns.get_indexer(filtered_words))
+
     filtered_df = df[filtered_words]
 
     return filtered_df
@@ -466,7 +2105,7 @@ def remove_words_from_df(df, words_list):
     Performs a search within a DataFrame for specific words (columns) removes the words.
 
     Parameters:
-    df - a Pandas DataFrame which contains Word Counts or TF-IDF scores.
+    df - a Pandas DataFrame (or SparseTfidf) which contains Word Counts or TF-IDF scores.
     words_list - a user-defined list of search words.
 
     Returns:
@@ -475,10 +2114,372 @@ def remove_words_from_df(df, words_list):
 
     # Checks if word is in DF column list and applies filter
     filtered_words = [word for word in words_list if word in df.columns]
+    if isinstance(df, SparseTfidf):
+        return df.select_columns(np.flatnonzero(~df.columns.isin(filtered_words)))
+
     filtered_df = df.drop(filtered_words, axis=1)
 
     return filtered_df
 
+# Keeps only the Top N words per document
+def keep_top_n(df, top_n):
+    """
+    Keeps only the 'Top N' highest values of each document (row) of a TF-IDF or Word Counts DataFrame, setting the rest to 0 and dropping words which are not in any document's Top N. The rows are ranked by the shared top_n_entries engine (np.argpartition) rather than one Series.nlargest() per row.
+
+    Parameters:
+    df - a Pandas DataFrame or SparseTfidf.
+    top_n - the number of words to keep per document.
+
+    Returns:
+    filtered_df - the filtered DataFrame (or SparseTfidf, without densifying it).
+    """
+    return _keep_entries(df, *top_n_entries(df, top_n, largest=True))
+
+# Keeps only the Bottom N words per document
+def keep_bottom_n(df, bottom_n):
+    """
+    Keeps only the 'Bottom N' lowest values of each document (row) of a TF-IDF or Word Counts DataFrame, setting the rest to 0 and dropping words which are not in any document's Bottom N.
+
+    Note: for a SparseTfidf, only the words a document actually uses (non-zero scores) are considered.
+
+    Parameters:
+    df - a Pandas DataFrame or SparseTfidf.
+    bottom_n - the number of words to keep per document.
+
+    Returns:
+    filtered_df - the filtered DataFrame (or SparseTfidf, without densifying it).
+    """
+    return _keep_entries(df, *top_n_entries(df, bottom_n, largest=False))
+
+# Top (or Bottom) N words of each document in long format
+def top_n_per_document(df, top_n, largest=True):
+    """
+    Returns the 'Top N' (or 'Bottom N') words of each document (row) of a TF-IDF or Word Counts DataFrame as one long-format DataFrame, i.e., for bar charts and reports, without building a Series per document.
+
+    Parameters:
+    df - a Pandas DataFrame or SparseTfidf.
+    top_n - the number of words to return per document.
+    largest - True (default) for the highest values, False for the lowest.
+
+    Returns:
+    top_n_df - a DataFrame with columns Document, Word, Value and Rank (1 is the highest, or lowest, value), ordered by document and rank.
+    """
+    rows, columns, values = top_n_entries(df, top_n, largest)
+    ranks = np.arange(len(rows)) - np.searchsorted(rows, rows) + 1
+
+    return pd.DataFrame({
+        'Document': df.index[rows],
+        'Word': df.columns[columns],
+        'Value': values,
+        'Rank': ranks
+    })
+
+# Top/Bottom N engine shared by keep_top_n, keep_bottom_n, top_n_per_document and the bar charts
+def top_n_entries(df, n, largest=True):
+    """
+    Finds the n highest (or lowest) values of every row of a DataFrame or SparseTfidf. Dense frames are ranked with a single np.argpartition over the underlying 2-D array; a SparseTfidf is ranked per row on its stored (non-zero) scores only, skipping rows which have n or fewer of them. Only the selected entries are then sorted, so the cost is about one pass over the data.
+
+    Parameters:
+    df - a Pandas DataFrame or SparseTfidf.
+    n - the number of entries per row.
+    largest - True (default) for the highest values, False for the lowest.
+
+    Returns:
+    rows - the row position of each selected entry.
+    columns - the column position of each selected entry.
+    values - the value of each selected entry.
+    (all NumPy arrays, ordered by row, then by rank, then by column)
+    """
+    n = max(int(n), 0)
+
+    if isinstance(df, SparseTfidf):
+        matrix = df.matrix
+        lengths = np.diff(matrix.indptr)
+
+        # Rows with n or fewer scores are kept whole; the rest are partitioned one row at a time
+        keep = np.repeat(lengths <= n, lengths)
+        if n > 0:
+            for position in np.flatnonzero(lengths > n):
+                start, end = matrix.indptr[position], matrix.indptr[position + 1]
+                row_data = matrix.data[start:end]
+                keep[start + np.argpartition(-row_data if largest else row_data, n - 1)[:n]] = True
+
+        rows = np.repeat(np.arange(matrix.shape[0]), lengths)[keep]
+        columns = matrix.indices[keep]
+        values = matrix.data[keep]
+
+    else:
+        array = df.to_numpy(dtype=np.float64)
+        n_rows, n_columns = array.shape
+        k = min(n, n_columns)
+
+        # Partitions every row at once so that its k highest (or lowest) values come first
+        if k == 0:
+            selected = np.empty((n_rows, 0), dtype=np.intp)
+        elif k == n_columns:
+            selected = np.broadcast_to(np.arange(n_columns), (n_rows, n_columns))
+        else:
+            selected = np.argpartition(-array if largest else array, k - 1, axis=1)[:, :k]
+
+        rows = np.repeat(np.arange(n_rows), k)
+        columns = selected.ravel()
+        values = array[rows, columns]
+
+    # Orders the selected entries by row, then rank (ties by column)
+    order = np.lexsort((columns, -values if largest else values, rows))
+
+    return rows[order], columns[order], values[order]
+
+# Finds the most similar documents of each document
+def document_similarity(tfidf_df, top_k=SIMILARITY_TOP_K, use_cache=True):
+    """
+    Finds the top_k most similar documents of every document of a TF-IDF DataFrame (i.e., from text_tf_idf_analysis, url_tf_idf_analysis or the SQL TF-IDF analyses) by cosine similarity of their TF-IDF scores.
+
+    The rows are L2-normalized, so cosine similarity is the sparse product of the matrix with its transpose. It is computed a block of documents at a time (at most SIMILARITY_BLOCK_CELLS scores), and only the top_k neighbours of each document are kept from each block (see top_n_entries), so memory grows with documents x top_k instead of documents x documents. Results are kept in the TallyCache subdirectory, keyed by a hash of the scores, so asking again about an unchanged DataFrame only reads the cached result.
+
+    Parameters:
+    tfidf_df - a SparseTfidf or Pandas DataFrame of TF-IDF scores.
+    top_k - the number of similar documents to return per document. Default is SIMILARITY_TOP_K.
+    use_cache - if True (default), reads and stores results in the TallyCache.
+
+    Returns:
+    similarity_df - a DataFrame with columns Document, Similar Document, Similarity and Rank, ordered by document and rank. Documents with no words in common are not listed.
+
+    Raises:
+    Exception - for any unexpected errors encountered.
+    """
+    try:
+        if isinstance(tfidf_df, SparseTfidf):
+            matrix = tfidf_df.matrix
+        else:
+            matrix = csr_matrix(tfidf_df.to_numpy(dtype=np.float64))
+        matrix = normalize(matrix, norm='l2').tocsr()
+        matrix.sort_indices()
+
+        # Looks for a cached result for the same scores and top_k
+        if use_cache:
+            digest = hashlib.blake2b(digest_size=20)
+            digest.update(f'similarity:{top_k}:{matrix.shape}:'.encode('utf-8'))
+            for array in (matrix.indptr, matrix.indices, matrix.data):
+                digest.update(np.ascontiguousarray(array).tobytes())
+            digest.update('\n'.join(map(str, tfidf_df.index)).encode('utf-8'))
+            cache_key = 'similarity_' + digest.hexdigest()
+
+            tally_cache = TallyCache()
+            similarity_df = tally_cache.get(cache_key)
+            if similarity_df is not None:
+                return similarity_df
+
+        n_documents = matrix.shape[0]
+        block_rows = max(1, SIMILARITY_BLOCK_CELLS // max(n_documents, 1))
+        transposed = matrix.T.tocsc()
+        all_rows, all_columns, all_values = [], [], []
+
+        # Scores one block of documents against every document and keeps each one's top_k neighbours
+        for start in range(0, n_documents, block_rows):
+            stop = min(start + block_rows, n_documents)
+            block = (matrix[start:stop] @ transposed).toarray()
+            block[np.arange(stop - start), np.arange(start, stop)] = -1  # Excludes each document itself
+
+            rows, columns, values = top_n_entries(pd.DataFrame(block), top_k)
+            related = values > 0
+            all_rows.append(rows[related] + start)
+            all_columns.append(columns[related])
+            all_values.append(values[related])
+
+        rows = np.concatenate(all_rows) if all_rows else np.empty(0, dtype=np.intp)
+        columns = np.concatenate(all_columns) if all_columns else np.empty(0, dtype=np.intp)
+        values = np.concatenate(all_values) if all_values else np.empty(0)
+        ranks = np.arange(len(rows)) - np.searchsorted(rows, rows) + 1
+
+        similarity_df = pd.DataFrame({
+            'Document': tfidf_df.index[rows],
+            'Similar Document': tfidf_df.index[columns],
+            'Similarity': values,
+            'Rank': ranks
+        })
+
+        if use_cache:
+            tally_cache.put(cache_key, similarity_df)
+
+        return similarity_df
+
+    except Exception as e:
+        print(ui_helpers.RED + f'An error occurred while computing document similarity: {e}' + ui_helpers.RESET)
+        return None
+
+# Rebuilds a DataFrame or SparseTfidf with only the given entries, dropping unused words
+def _keep_entries(df, rows, columns, values):
+    used_columns, kept_columns = np.unique(columns, return_inverse=True)
+
+    if isinstance(df, SparseTfidf):
+        kept_matrix = csr_matrix((values, (rows, kept_columns)), shape=(df.shape[0], len(used_columns)))
+        return SparseTfidf(kept_matrix, df.index, df.columns[used_columns], model=df.model)
+
+    kept_array = np.zeros((df.shape[0], len(used_columns)))
+    kept_array[rows, kept_columns] = values
+    return pd.DataFrame(kept_array, index=df.index, columns=df.columns[used_columns])
+
+# Process-wide, mtime-invalidated cache of the commonwords.txt filter
+class StopwordFilter:
+    """
+    Holds the words of commonwords.txt in memory so that the file is read once per process instead of once per document. The words are kept as a frozenset for O(1) membership tests (and are accepted as common_list by the Tokenizer without copying). Before each use the file's modification time is checked, and the file is only read again if it was changed by something else (i.e., edited by hand). The add, delete and reset functions update the filter in place.
+
+    Parameters:
+    filename - the path of commonwords.txt.
+
+    Methods:
+    words() - returns the frozenset of common words, reloading commonwords.txt only if its mtime changed.
+    word_list() - returns the common words as a new list in file order.
+    write(words) - writes the words to commonwords.txt and updates the filter in place.
+    reload() - reads commonwords.txt again (i.e., after it is recreated).
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.mtime_ns = None
+        self.ordered_words = []
+        self.frozen_words = frozenset()
+
+    def _stat_mtime(self):
+        return os.stat(self.filename).st_mtime_ns
+
+    def reload(self):
+        mtime_ns = self._stat_mtime()
+        with open(self.filename, 'r', encoding='utf-8') as common_words_file:
+            ordered_words = []
+            for line in common_words_file:
+                ordered_words = line.split(' ')
+        self.ordered_words = ordered_words
+        self.frozen_words = frozenset(ordered_words)
+        self.mtime_ns = mtime_ns
+
+    def words(self):
+        if self.mtime_ns != self._stat_mtime():
+            self.reload()
+        return self.frozen_words
+
+    def word_list(self):
+        self.words()
+        return list(self.ordered_words)
+
+    def write(self, words):
+        words = list(words)
+        with open(self.filename, 'w', encoding='utf-8') as common_words_file:
+            common_words_file.write(' '.join(words))
+        self.ordered_words = words
+        self.frozen_words = frozenset(words)
+        self.mtime_ns = self._stat_mtime()
+
+# Shared by every function which loads the commonwords.txt filter
+STOPWORD_FILTER = StopwordFilter(os.path.join(ui_helpers.script_dir, 'commonwords.txt'))
+
+# Named filter profiles stored in one compact indexed file
+class FilterProfiles:
+    """
+    Stores any number of named word filters (i.e., one per language or project) in a single compact file. The first line of the file is a JSON index giving the active profile and the byte offset and length of each profile's words; the words follow as newline-separated blocks, so any one profile is loaded with a single seek and read. Loaded profiles are kept as precompiled frozensets which can be passed directly to the Tokenizer.
+
+    commonwords.txt is the working copy of the active profile: every Word Count function and the add/remove/reset options keep using it. Switching profiles first saves commonwords.txt into the profile being left, then writes the new profile's words into commonwords.txt and updates STOPWORD_FILTER in place.
+
+    Parameters:
+    filename - the path of the profiles file.
+
+    Methods:
+    names() - returns the list of profile names.
+    active() - returns the name of the active profile.
+    words(profile_name) - returns a profile's words as a precompiled frozenset.
+    save(profile_name, words) - creates or replaces a profile.
+    delete(profile_name) - deletes an inactive profile.
+    switch(profile_name) - makes a profile active, creating it from the current filter if it does not exist.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.compiled = {}
+
+    def _read_index(self):
+        # Creates the file from the current commonwords.txt on first use
+        if not os.path.isfile(self.filename):
+            self._write('default', {'default': '\n'.join(w for w in load_common_words() if w).encode('utf-8')})
+        with open(self.filename, 'rb') as profiles_file:
+            header = json.loads(profiles_file.readline())
+            return header, profiles_file.tell()
+
+    def _read_blocks(self):
+        header, data_start = self._read_index()
+        with open(self.filename, 'rb') as profiles_file:
+            profiles_file.seek(data_start)
+            data = profiles_file.read()
+        return header['active'], {name: data[start:start + length] for name, (start, length) in header['profiles'].items()}
+
+    def _write(self, active, blocks):
+        # Lays the blocks out one after another and records where each starts
+        profiles = {}
+        position = 0
+        for name, block in blocks.items():
+            profiles[name] = [position, len(block)]
+            position += len(block)
+        header = json.dumps({'active': active, 'profiles': profiles}).encode('utf-8')
+
+        with open(self.filename + '.tmp', 'wb') as profiles_file:
+            profiles_file.write(header + b'\n')
+            for block in blocks.values():
+                profiles_file.write(block)
+        os.replace(self.filename + '.tmp', self.filename)
+
+    def names(self):
+        header, data_start = self._read_index()
+        return list(header['profiles'])
+
+    def active(self):
+        header, data_start = self._read_index()
+        return header['active']
+
+    def words(self, profile_name):
+        if profile_name not in self.compiled:
+            header, data_start = self._read_index()
+            start, length = header['profiles'][profile_name]
+            with open(self.filename, 'rb') as profiles_file:
+                profiles_file.seek(data_start + start)
+                block = profiles_file.read(length)
+            self.compiled[profile_name] = frozenset(block.decode('utf-8').split('\n')) - {''}
+        return self.compiled[profile_name]
+
+    def save(self, profile_name, words):
+        active, blocks = self._read_blocks()
+        words = [word for word in dict.fromkeys(words) if word]
+        blocks[profile_name] = '\n'.join(words).encode('utf-8')
+        self._write(active, blocks)
+        self.compiled[profile_name] = frozenset(words)
+
+    def delete(self, profile_name):
+        active, blocks = self._read_blocks()
+        if profile_name == active:
+            raise ValueError('The active filter profile cannot be deleted')
+        del blocks[profile_name]
+        self._write(active, blocks)
+        self.compiled.pop(profile_name, None)
+
+    def switch(self, profile_name):
+        active, blocks = self._read_blocks()
+
+        # Saves the working copy (commonwords.txt) into the profile being left
+        current_words = [word for word in load_common_words() if word]
+        blocks[active] = '\n'.join(current_words).encode('utf-8')
+        self.compiled[active] = frozenset(current_words)
+
+        # New profiles start as a copy of the current filter
+        if profile_name not in blocks:
+            blocks[profile_name] = blocks[active]
+        self._write(profile_name, blocks)
+        self.compiled.pop(profile_name, None)
+
+        # Makes the profile the working copy, keeping the original ordering of its words
+        new_words = blocks[profile_name].decode('utf-8').split('\n') if blocks[profile_name] else []
+        STOPWORD_FILTER.write(new_words if new_words else ['', ''])
+        return self.words(profile_name)
+
+# Shared by the Filter Settings menu
+FILTER_PROFILES = FilterProfiles(os.path.join(ui_helpers.script_dir, 'filterprofiles.dat'))
+
 # Creates the default commonwords.txt filter
 def initialize_common_words():
     """
@@ -500,6 +2501,9 @@ def load_common_words():
 
     Returns:
     common_words_list: For use in tally_words and other functions.
+
+    Notes:
+    - The file is only read again if it changed since the last load (see StopwordFilter). Use load_stopword_filter for the frozenset itself.
     """
     # Changes to parent directory if needed
     ui_helpers.move_to_parent()
@@ -507,10 +2511,8 @@ def load_common_words():
     # Loads and returns commonwords.txt into a list 
     while True:
         try:
-            with open('commonwords.txt', 'r', encoding='utf-8') as common_words_file:
-                for line in common_words_file:
-                    common_words_list = line.split(' ')
-                return common_words_list
+            common_words_list = STOPWORD_FILTER.word_list()
+            return common_words_list
         
         except FileNotFoundError:
             initialize_common_words()
@@ -521,6 +2523,20 @@ def load_common_words():
         except Exception as e:
             print(ui_helpers.RED + f'TextAnalysis encountered an unexpected error: {e}' + ui_helpers.RESET)
 
+# Loads commonwords.txt filter as a frozenset
+def load_stopword_filter():
+    """
+    Returns the process-wide frozenset of common words from commonwords.txt, creating the file with default word filters if it does not exist. Unlike load_common_words, no list is copied, so this is the cheapest way to get the filter for each document.
+
+    Returns:
+    stopwords - a frozenset of the words in commonwords.txt.
+    """
+    try:
+        return STOPWORD_FILTER.words()
+
+    except FileNotFoundError:
+        return frozenset(load_common_words())
+
 # Read/display commonwords.txt file
 def read_commonwords_txt():
     """
@@ -572,12 +2588,14 @@ def add_to_commonwords_txt(user_words_input):
     user_words_split = re.split(r'[,\s]+', user_words_input.strip().lower())
     user_words_split = [word.strip() for word in user_words_split if word]  # Remove empty strings
 
-    # Iterates over the user's words to add them to the commonwords.txt file, if necessary
+    # Iterates over the user's words to add them to the commonwords.txt file, if necessary (set lookups keep bulk additions linear)
+    existing_words = set(commonwords_content)
     changes_made = False
     for word in user_words_split:
         
-        if word not in commonwords_content:
+        if word not in existing_words:
             commonwords_content.append(word)
+            existing_words.add(word)
             print(ui_helpers.YELLOW + word + ui_helpers.RESET + ' added to commonwords.txt!')
             changes_made = True
         
@@ -585,10 +2603,9 @@ def add_to_commonwords_txt(user_words_input):
             print(ui_helpers.YELLOW + word + ui_helpers.RESET + ' already in commonwords.txt!')
             continue
 
-    # Writes the updated content to the commonwords.txt file
+    # Writes the updated content to the commonwords.txt file and updates the filter in place
     if changes_made == True:
-        with open('commonwords.txt', 'w', encoding='utf-8') as commonwords:
-            commonwords.write(' '.join(commonwords_content))
+        STOPWORD_FILTER.write(commonwords_content)
 
 # Deletes user-defined words from commonwords.txt
 def delete_from_commonwords_txt(user_words_input):
@@ -616,23 +2633,24 @@ def delete_from_commonwords_txt(user_words_input):
     user_words_split = re.split(r'[,\s]+', user_words_input.strip().lower())
     user_words_split = [word.strip() for word in user_words_split if word]  # Remove empty strings
 
-    # Loop checks if the user-defined word(s) are in the content read from commonwords.txt and replaces (or not) as appropriate
-    changes_made = False
+    # Checks each user-defined word against a set of the filter, then removes all of them in a single pass
+    existing_words = {existing_word.lower() for existing_word in commonwords_content}
+    words_to_remove = set()
     for word in user_words_split:
-        original_len = len(commonwords_content)
-        commonwords_content = [existing_word for existing_word in commonwords_content if existing_word.lower() != word]
         
-        if len(commonwords_content) < original_len:
+        if word in existing_words and word not in words_to_remove:
+            words_to_remove.add(word)
             print(ui_helpers.YELLOW + word + ui_helpers.RESET + ' removed from commonwords.txt!')
-            changes_made = True
         
         else:
             print(ui_helpers.YELLOW + word + ui_helpers.RESET + ' not found in commonwords.txt!')
 
-    # Writes the updated content to the commonwords.txt file
+    commonwords_content = [existing_word for existing_word in commonwords_content if existing_word.lower() not in words_to_remove]
+    changes_made = bool(words_to_remove)
+
+    # Writes the updated content to the commonwords.txt file and updates the filter in place
     if changes_made == True:
-        with open('commonwords.txt', 'w', encoding='utf-8') as commonwords:
-            commonwords.write(' '.join(commonwords_content))
+        STOPWORD_FILTER.write(commonwords_content)
     
 # Resets commonwords.txt to default
 def reset_commonwords_txt():
@@ -653,6 +2671,9 @@ def reset_commonwords_txt():
     except FileNotFoundError:
         initialize_common_words()
 
+    # Updates the filter in place
+    STOPWORD_FILTER.reload()
+
 # Removes all filters by deleting the contents of commonwords.txt
 def delete_commonwords_txt_contents():
     """
@@ -661,9 +2682,60 @@ def delete_commonwords_txt_contents():
     # Changes to parent directory if needed
     ui_helpers.move_to_parent()
 
-    # Removes filters and displays user confirmation
-    with open('commonwords.txt', 'w', encoding='utf-8') as common_build:
-        common_build.write(' ')
+    # Removes filters (leaving a single space in the file) and updates the filter in place
+    STOPWORD_FILTER.write(['', ''])
+
+# Lists the saved filter profiles
+def list_filter_profiles():
+    """
+    Returns the names of the saved filter profiles and the name of the active one.
+
+    Returns:
+    profile_names - a list of profile names.
+    active_profile - the name of the profile currently in commonwords.txt.
+    """
+    return FILTER_PROFILES.names(), FILTER_PROFILES.active()
+
+# Switches the active filter profile
+def switch_filter_profile(profile_name):
+    """
+    Makes profile_name the active filter (copied into commonwords.txt), saving the current filter into the previously active profile first. If profile_name does not exist yet, it is created as a copy of the current filter.
+
+    Parameters:
+    profile_name - the name of the profile to activate.
+
+    Returns:
+    stopwords - the profile's words as a frozenset.
+    """
+    try:
+        return FILTER_PROFILES.switch(profile_name)
+
+    except Exception as e:
+        print(ui_helpers.RED + f'TextAnalysis encountered an unexpected error while switching filter profiles: {e}' + ui_helpers.RESET)
+        return None
+
+# Deletes a filter profile
+def delete_filter_profile(profile_name):
+    """
+    Deletes a saved filter profile. The active profile cannot be deleted.
+
+    Parameters:
+    profile_name - the name of the profile to delete.
+
+    Returns:
+    True if the profile was deleted, otherwise False.
+    """
+    try:
+        FILTER_PROFILES.delete(profile_name)
+        return True
+
+    except KeyError:
+        print(ui_helpers.RED + f'Filter profile "{profile_name}" was not found!' + ui_helpers.RESET)
+        return False
+
+    except ValueError as e:
+        print(ui_helpers.RED + f'{e}!' + ui_helpers.RESET)
+        return False
 
 # Create DataFrame from Word Counts Nested Dictionary
 def word_counts_to_df(word_counts_all_docs):
@@ -1,11 +1,206 @@
 # Import standard libraries
 import os
+import io
+import math
+import time
+import atexit
 import sqlite3
+import contextlib
+from itertools import islice
+from urllib.request import pathname2url
 import pandas as pd
 
 # Import local library
 import ui_helpers
 
+# Number of documents added per transaction by documents_to_database
+INGEST_BATCH_DOCUMENTS = 50
+
+# Current version of the database schema (see migrate_database)
+SCHEMA_VERSION = 5
+
+# Rollup tables of word counts summed by document metadata (see database_build), each with the Documents columns it is grouped by
+ROLLUP_TABLES = {
+    'YearWordCounts': ('year',),
+    'AuthorWordCounts': ('author',),
+    'GenreWordCounts': ('genre',),
+    'AuthorYearWordCounts': ('author', 'year'),
+    'GenreYearWordCounts': ('genre', 'year')
+}
+
+# Rollup key expressions for the Documents columns of a rollup table (NULL metadata is stored as an empty blob, since key columns cannot be NULL)
+def _rollup_keys(columns):
+    return ', '.join(f"IFNULL(d.{column}, x'')" for column in columns)
+
+# Adds the ngram_size column to Documents (databases built since phrase counts could be stored already have it)
+def _add_ngram_size_column(cur):
+    columns = [column[1] for column in cur.execute('PRAGMA table_info(Documents);')]
+    if 'ngram_size' not in columns:
+        cur.execute('ALTER TABLE Documents ADD COLUMN ngram_size INTEGER NOT NULL DEFAULT 1;')
+
+# Statements which bring a database from the previous schema version up to each version
+SCHEMA_MIGRATIONS = {
+    # Version 2: covering indexes for the joins and filters used by the query functions, then fresh planner statistics
+    # Note: Documents has no index led by year alone; without range statistics SQLite assumes any year range is selective and would loop over documents instead of words
+    2: [
+        'CREATE INDEX IF NOT EXISTS WordCountsByWord ON WordCounts (word_id, doc_id, count);',
+        'CREATE INDEX IF NOT EXISTS WordCountsByDocument ON WordCounts (doc_id, word_id, count);',
+        'CREATE INDEX IF NOT EXISTS DocumentsByAuthor ON Documents (author, year);',
+        'CREATE INDEX IF NOT EXISTS DocumentsByGenre ON Documents (genre, year);',
+        'ANALYZE;'
+    ],
+    # Version 3: document frequency tables for stored-IDF TF-IDF, for databases which were only ever migrated by queries (DocumentFrequency counts distinct titles and is filled from the existing word counts if it is empty)
+    3: [
+        'CREATE TABLE IF NOT EXISTS DocumentFrequency (word_id INTEGER NOT NULL PRIMARY KEY, doc_count INTEGER NOT NULL, FOREIGN KEY (word_id) REFERENCES Words(word_id));',
+        'CREATE TABLE IF NOT EXISTS InverseDocumentFrequency (word_id INTEGER NOT NULL PRIMARY KEY, idf REAL NOT NULL, FOREIGN KEY (word_id) REFERENCES Words(word_id));',
+        'CREATE INDEX IF NOT EXISTS DocumentsByTitle ON Documents (doc_title);',
+        '''INSERT INTO DocumentFrequency (word_id, doc_count)
+        SELECT wc.word_id, COUNT(DISTINCT d.doc_title)
+        FROM WordCounts AS wc JOIN Documents AS d ON d.doc_id = wc.doc_id
+        WHERE wc.count > 0 AND NOT EXISTS (SELECT 1 FROM DocumentFrequency)
+        GROUP BY wc.word_id;'''
+    ],
+    # Version 4: the number of words per entry (1 for words, 2 or more for phrases) of each document, so that words and phrases are never mixed in one database
+    4: [
+        _add_ngram_size_column
+    ],
+    # Version 5: rollup tables for the trend queries, filled from the existing word counts
+    5: [
+        'CREATE TABLE IF NOT EXISTS YearWordCounts (year INTEGER NOT NULL, word_id INTEGER NOT NULL, total_count INTEGER NOT NULL, row_count INTEGER NOT NULL, PRIMARY KEY (word_id, year)) WITHOUT ROWID;',
+        'CREATE TABLE IF NOT EXISTS AuthorWordCounts (author VARCHAR(75) NOT NULL, word_id INTEGER NOT NULL, total_count INTEGER NOT NULL, row_count INTEGER NOT NULL, PRIMARY KEY (author, word_id)) WITHOUT ROWID;',
+        'CREATE TABLE IF NOT EXISTS GenreWordCounts (genre VARCHAR(25) NOT NULL, word_id INTEGER NOT NULL, total_count INTEGER NOT NULL, row_count INTEGER NOT NULL, PRIMARY KEY (genre, word_id)) WITHOUT ROWID;',
+        'CREATE TABLE IF NOT EXISTS AuthorYearWordCounts (author VARCHAR(75) NOT NULL, year INTEGER NOT NULL, word_id INTEGER NOT NULL, total_count INTEGER NOT NULL, row_count INTEGER NOT NULL, PRIMARY KEY (author, year, word_id)) WITHOUT ROWID;',
+        'CREATE TABLE IF NOT EXISTS GenreYearWordCounts (genre VARCHAR(25) NOT NULL, year INTEGER NOT NULL, word_id INTEGER NOT NULL, total_count INTEGER NOT NULL, row_count INTEGER NOT NULL, PRIMARY KEY (genre, year, word_id)) WITHOUT ROWID;'
+    ] + [
+        f'''INSERT INTO {table} ({', '.join(columns)}, word_id, total_count, row_count)
+        SELECT {_rollup_keys(columns)}, wc.word_id, SUM(wc.count), COUNT(*)
+        FROM WordCounts AS wc JOIN Documents AS d ON d.doc_id = wc.doc_id
+        GROUP BY {_rollup_keys(columns)}, wc.word_id;'''
+        for table, columns in ROLLUP_TABLES.items()
+    ]
+}
+
+# Number of documents (N) for IDF weights: distinct titles with word counts, matching the rows of the TF-IDF analyses
+DOCUMENT_COUNT = '(SELECT COUNT(DISTINCT d.doc_title) FROM Documents AS d WHERE EXISTS (SELECT 1 FROM WordCounts AS wc WHERE wc.doc_id = d.doc_id))'
+
+# Smooth IDF weight of a DocumentFrequency row (see InverseDocumentFrequency in database_build)
+IDF_EXPRESSION = f'ln((1.0 + {DOCUMENT_COUNT}) / (1.0 + doc_count)) + 1'
+
+# PRAGMA settings applied to every connection opened by get_connection (see set_connection_profile)
+CONNECTION_PROFILES = {
+    # Write-ahead logging (queries never block ingest), one sync per checkpoint instead of per commit, 64 MiB page cache, 256 MiB memory-mapped reads, and in-memory temporary tables
+    'performance': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'cache_size': -65536, 'mmap_size': 268435456, 'temp_store': 'MEMORY'},
+    # SQLite's own defaults (rollback journal, a sync per commit, 2 MB page cache)
+    'default': {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'cache_size': -2000, 'mmap_size': 0, 'temp_store': 'DEFAULT'}
+}
+
+# The profile used by get_connection
+CONNECTION_PROFILE = 'performance'
+
+# Open connections reused within a session, keyed by (absolute database path, read_only)
+_CONNECTIONS = {}
+
+# Returns a pooled, tuned connection to a database
+def get_connection(database_name, read_only=False):
+    """
+    Central connection manager for every function in sql_manager. Connections are opened once per database (and per mode) and reused for the rest of the session, and each new connection receives the PRAGMA settings of the active CONNECTION_PROFILE. Read-only connections are opened with a 'mode=ro' URI, so query functions cannot modify a database (their temporary tables are still allowed) and never create an empty database from a mistyped name. Query functions only write to a database through migrate_database, which first checks the schema version read-only and never creates a database.
+
+    Parameters:
+    database_name - the database to connect to (relative to the current directory, i.e., Databases).
+    read_only - if True, returns a read-only connection. Default is False.
+
+    Returns:
+    conn - the sqlite3 Connection. Callers hand it back with release_connection rather than closing it.
+
+    Raises:
+    sqlite3.Error - for SQLite3 errors (i.e., a read-only connection to a database which does not exist).
+
+    Notes:
+    - journal_mode is only set by read-write connections, since it is stored in the database file; read-only connections follow whatever the database uses.
+    - Connections whose database file has been deleted are discarded (with any leftover -wal and -shm files) and reopened.
+    """
+    path = os.path.abspath(database_name)
+    key = (path, read_only)
+    conn = _CONNECTIONS.get(key)
+
+    # Discards connections to databases deleted since they were opened, along with their orphaned WAL files
+    if conn is not None and not os.path.exists(path):
+        close_connections(database_name)
+        for suffix in ('-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        conn = None
+
+    if conn is None:
+        if read_only:
+            conn = sqlite3.connect(f'file:{pathname2url(path)}?mode=ro', uri=True)
+        else:
+            conn = sqlite3.connect(path)
+
+        for pragma, value in CONNECTION_PROFILES[CONNECTION_PROFILE].items():
+            if read_only and pragma == 'journal_mode':
+                continue
+            conn.execute(f'PRAGMA {pragma} = {value};')
+        _CONNECTIONS[key] = conn
+
+    # Never hands out a connection in the middle of a transaction (i.e., one left open by an error)
+    elif conn.in_transaction:
+        conn.rollback()
+
+    return conn
+
+# Hands a connection from get_connection back to the pool
+def release_connection(conn):
+    """
+    Returns a connection obtained from get_connection to the pool, used in place of conn.close(). Any transaction which was not committed is rolled back, so that pooled connections never hold locks or an old snapshot between calls.
+
+    Parameters:
+    conn - the sqlite3 Connection returned by get_connection.
+    """
+    if conn.in_transaction:
+        conn.rollback()
+
+# Closes pooled connections
+def close_connections(database_name=None):
+    """
+    Closes the pooled connections to one database (i.e., before it is deleted or copied) or, by default, to every database. Closing the last connection to a database in WAL mode checkpoints it and removes its -wal and -shm files. Called automatically when TextAnalysis exits.
+
+    Parameters:
+    database_name - the database whose connections are closed. Default None closes all connections.
+    """
+    path = os.path.abspath(database_name) if database_name is not None else None
+
+    # Read-only connections are closed first, so the last connection to close can checkpoint the WAL
+    for key in sorted(_CONNECTIONS, key=lambda key: not key[1]):
+        if path is None or key[0] == path:
+            _CONNECTIONS.pop(key).close()
+
+# Changes the PRAGMA settings of new connections
+def set_connection_profile(profile):
+    """
+    Selects the PRAGMA profile used by get_connection and closes the pooled connections so the new settings apply to the next connection of each database.
+
+    Parameters:
+    profile - the name of a profile in CONNECTION_PROFILES (i.e., 'performance' or 'default'), or a dict of PRAGMA settings which override the active profile (i.e., {'synchronous': 'FULL'}), saved as the 'custom' profile.
+
+    Raises:
+    ValueError - if the profile name is unknown.
+    """
+    global CONNECTION_PROFILE
+
+    if isinstance(profile, dict):
+        CONNECTION_PROFILES['custom'] = {**CONNECTION_PROFILES[CONNECTION_PROFILE], **profile}
+        profile = 'custom'
+
+    if profile not in CONNECTION_PROFILES:
+        raise ValueError(f'Unknown connection profile: {profile}')
+
+    CONNECTION_PROFILE = profile
+    close_connections()
+
+# Checkpoints and closes every pooled connection when TextAnalysis exits
+atexit.register(close_connections)
+
 # Builds a SQL database with user-defined name using the correct database schema
 def database_build(database_name):
     """
@@ -18,6 +213,7 @@ def database_build(database_name):
     author
     year
     genre
+    ngram_size - the number of words per entry of the document's word counts (1 for single words, 2 or more for phrases, see analysis.tally_ngrams_file). Added by schema version 4; documents_to_database refuses to mix sizes in one database, since phrase and word counts would distort DocumentFrequency and every query.
 
     Words
     word_id (PK)
@@ -29,6 +225,24 @@ def database_build(database_name):
     count
     Note: word_id and doc_id are the composite primary key.
 
+    DocumentFrequency
+    word_id (PK, FK)
+    doc_count - the number of distinct document titles which contain the word (documents sharing a title are one document to the TF-IDF analyses). Kept up to date by wordtally_to_database so that IDF weights never require a scan of the whole corpus.
+    Note: created by schema version 3, which fills it from WordCounts if the database already has word counts.
+
+    SchemaVersion
+    version - the schema version of the database (see SCHEMA_VERSION and migrate_database).
+
+    YearWordCounts, AuthorWordCounts, GenreWordCounts, AuthorYearWordCounts, GenreYearWordCounts
+    year and/or author or genre (see ROLLUP_TABLES), word_id
+    total_count - the sum of the word's counts over all documents with that year/author/genre.
+    row_count - the number of WordCounts rows summed into total_count (rows which reach 0 are kept and skipped by queries).
+    Note: rollup tables are updated by documents_to_database along with WordCounts, so the trend queries never re-aggregate the whole corpus. They are WITHOUT ROWID tables clustered on their key, so NULL metadata is stored as an empty blob (x'') and turned back into NULL by the queries with NULLIF.
+
+    InverseDocumentFrequency
+    word_id (PK, FK)
+    idf - the smooth IDF weight of the word, ln((1 + N) / (1 + doc_count)) + 1, where N is the number of distinct titles with word counts (see DOCUMENT_COUNT). A materialized table used by query_tf_idf_top_n; documents_to_database rebuilds it from DocumentFrequency after documents are added or updated (if it is empty, i.e., after an interrupted ingest, the query computes the weights from DocumentFrequency instead).
+
     Parameters:
     database_name - the name that will serve as the .sqlite database file name.
 
@@ -43,7 +257,7 @@ def database_build(database_name):
 
     try:
         # Establish SQL connection and cursor position
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name)
         cur = conn.cursor()
         
         # Create database, tables, and columns
@@ -74,6 +288,9 @@ def database_build(database_name):
             FOREIGN KEY (doc_id) REFERENCES Documents(doc_id)
         );
         ''')
+
+        # Adds the indexes and tables of later schema versions (see SCHEMA_MIGRATIONS)
+        _migrate_schema(cur)
         conn.commit()
 
     except sqlite3.OperationalError as e:
@@ -91,12 +308,90 @@ def database_build(database_name):
     # Close connection if it exists
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
+
+# Brings a database up to the current schema version
+def migrate_database(database_name):
+    """
+    Applies any SCHEMA_MIGRATIONS newer than the version recorded in the SchemaVersion table of an existing database (i.e., adds the covering indexes of version 2, the document frequency tables of version 3, the n-gram size of version 4, and the rollup tables of version 5), so databases created by earlier versions of TextAnalysis get the same indexes and tables as new ones. Called by database_build, documents_to_database, and at the start of each query function.
+
+    The version is read through a read-only connection, so a database which does not exist is never created (i.e., from a mistyped name) and databases already at SCHEMA_VERSION are never written to; a read-write connection is only opened when migrations are pending.
+
+    Parameters:
+    database_name - the database to migrate.
+
+    Returns:
+    version - the schema version of the database after migration, or None if it could not be migrated.
+
+    Raises:
+    sqlite3.Error - for SQLite3 errors.
+    """
+    # Missing databases are left for the caller to report
+    if not os.path.exists(database_name):
+        return None
+
+    try:
+        conn = get_connection(database_name, read_only=True)
+        cur = conn.cursor()
+
+        # Databases without tables (i.e., not yet built) have nothing to migrate
+        if not cur.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'WordCounts');").fetchone()[0]:
+            return None
+
+        version = _schema_version(cur)
+        if version >= SCHEMA_VERSION:
+            return version
+        release_connection(conn)
+
+        # Migrates through a read-write connection only when needed
+        conn = get_connection(database_name)
+        version = _migrate_schema(conn.cursor())
+        conn.commit()
+        return version
+
+    except sqlite3.Error as e:
+        print(ui_helpers.RED + f'The following SQLite3 error occurred while migrating the database: {e}' + ui_helpers.RESET)
+        return None
+
+    finally:
+        if 'conn' in locals():
+            release_connection(conn)
+
+# Reads the recorded schema version without writing to the database (databases without a SchemaVersion table are version 1)
+def _schema_version(cur):
+    if not cur.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'SchemaVersion');").fetchone()[0]:
+        return 1
+    version = cur.execute('SELECT MAX(version) FROM SchemaVersion;').fetchone()[0]
+    return version if version is not None else 1
+
+# Applies the schema migrations newer than the recorded version (the caller commits)
+def _migrate_schema(cur):
+    cur.execute('CREATE TABLE IF NOT EXISTS SchemaVersion (version INTEGER NOT NULL);')
+    row = cur.execute('SELECT MAX(version) FROM SchemaVersion;').fetchone()
+    version = row[0] if row[0] is not None else 1
+
+    pending = [migration_version for migration_version in sorted(SCHEMA_MIGRATIONS) if migration_version > version]
+    for migration_version in pending:
+        for statement in SCHEMA_MIGRATIONS[migration_version]:
+            # Steps which depend on the existing schema are functions of the cursor
+            if callable(statement):
+                statement(cur)
+            else:
+                cur.execute(statement)
+        version = migration_version
+
+    # Only writes to the database when something was migrated
+    if pending or row[0] is None:
+        cur.execute('DELETE FROM SchemaVersion;')
+        cur.execute('INSERT INTO SchemaVersion (version) VALUES (?);', (version,))
+    return version
 
 # Adds data from the wordtally dict to the SQL database
-def wordtally_to_database(wordtally_dict, database_name, doc_title, author, year, genre):
+def wordtally_to_database(wordtally_dict, database_name, doc_title, author, year, genre, ngram_size=1, doc_id=None):
     """
-    Uses the wordtally dictionary to add to the specified SQLite database.
+    Uses the wordtally dictionary to add to the specified SQLite database. A single document is added through the same bulk path as documents_to_database (one transaction, executemany and a staging table); use documents_to_database directly to add many documents at once.
+
+    If doc_id is given, no new document is created: wordtally_dict is treated as a delta (i.e., returned by analysis.IncrementalTally.update()) and added to the existing counts of that document. Words whose count falls to zero are removed from WordCounts.
 
     Parameters:
     wordtally_dict - must be the dictionary that is returned by analysis.tally_words().
@@ -105,6 +400,36 @@ def wordtally_to_database(wordtally_dict, database_name, doc_title, author, year
     author - author of the .txt document.
     year - year of publication for the .txt document.
     genre - genre of the .txt document
+    ngram_size - the number of words per entry of wordtally_dict (1 for single words, 2 or more for phrases). Nothing is added if the database already holds documents of another size.
+    doc_id - optional doc_id of an existing document to which the counts are added.
+
+    Returns:
+    doc_id - the doc_id of the document, or None if it was not added (i.e., an error occurred, wordtally_dict is None or the database holds another n-gram size).
+
+    Raises:
+    sqlite3.Error - for sqlite3 errors.
+    Exception - for all other errors.
+    """
+    doc_ids = documents_to_database([(wordtally_dict, doc_title, author, year, genre)], database_name, doc_id=doc_id, ngram_size=ngram_size)
+    return doc_ids[0] if doc_ids else None
+
+# Adds many wordtally dicts to the SQL database in bulk
+def documents_to_database(documents, database_name, batch_size=INGEST_BATCH_DOCUMENTS, doc_id=None, report=False, ngram_size=1):
+    """
+    Adds the word counts of many documents to the specified SQLite database using one transaction per batch of batch_size documents, instead of one statement per word.
+
+    For each batch, the distinct words are staged in a temporary table with executemany, added to Words with a single INSERT ... SELECT, and read back into an in-memory word:word_id map, so no per-row (SELECT word_id FROM Words WHERE word = ?) lookups are needed. The (word_id, doc_id, count) rows are then staged with executemany and moved into WordCounts, DocumentFrequency, and each of the ROLLUP_TABLES with one set-based statement each.
+
+    Parameters:
+    documents - an iterable of (wordtally_dict, doc_title, author, year, genre) tuples.
+    database_name - the name of the database to which the documents are added.
+    batch_size - the number of documents per transaction. Default is INGEST_BATCH_DOCUMENTS.
+    doc_id - optional doc_id of an existing document; if given, documents must hold a single delta (see wordtally_to_database).
+    report - if True, prints the number of rows added per second.
+    ngram_size - the number of words per entry of the word counts (1 for single words, 2 or more for phrases). Nothing is added if the database already holds documents of another size.
+
+    Returns:
+    doc_ids - the doc_id of each document in the order given, with None for documents without word counts (i.e., a wordtally_dict of None from a file which could not be read), which are skipped. If an error occurs, its batch is rolled back and only the doc_ids of the batches committed before it are returned.
 
     Raises:
     sqlite3.Error - for sqlite3 errors.
@@ -113,47 +438,163 @@ def wordtally_to_database(wordtally_dict, database_name, doc_title, author, year
     # Moves to Databases folder
     ui_helpers.move_to_databases()
 
+    # The document frequency tables, the ngram_size column, and the rollup tables must exist before they are updated
+    migrate_database(database_name)
+
     # SQL connection and cursor objects
-    conn = sqlite3.connect(database_name)
+    conn = get_connection(database_name)
     cur = conn.cursor()
+    doc_ids = []
 
     try:
-        # Adds user-specified document name, author, year, and genre
-        cur.execute('''
-        INSERT INTO Documents (doc_title, author, year, genre)
-        VALUES (?, ?, ?, ?)        
-        ''', (doc_title, author, year, genre))
-        doc_id = cur.lastrowid
-
-        # Checks if the word exists in Words table already; if not, insert
-        for word in wordtally_dict:
+        start_time = time.perf_counter()
+        row_count = 0
+        is_delta = doc_id is not None
+
+        # Temporary staging tables, private to this connection and kept in memory (temp_store of the connection profile)
+        cur.execute('CREATE TEMP TABLE IF NOT EXISTS StagedWords (word TEXT PRIMARY KEY);')
+        cur.execute('CREATE TEMP TABLE IF NOT EXISTS StagedCounts (word_id INTEGER, doc_id INTEGER, count INTEGER, count_change INTEGER, row_change INTEGER);')
+
+        # Rows of new documents are added to the rollups as they are; a delta adds the change in each WordCounts row (rows may be deleted)
+        count_change, row_change = ('s.count_change', 's.row_change') if is_delta else ('s.count', '1')
+
+        # Words and phrases are never mixed in one database
+        existing_size = cur.execute('SELECT ngram_size FROM Documents WHERE ngram_size != ? LIMIT 1;', (ngram_size,)).fetchone()
+        if existing_size is not None:
+            print(ui_helpers.RED + f'{database_name} holds counts of {existing_size[0]} word(s) per entry, so counts of {ngram_size} word(s) per entry cannot be added to it. ' + ui_helpers.RESET + 'Please choose another database.')
+            return doc_ids
+
+        documents = iter(documents)
+        while True:
+            batch = list(islice(documents, batch_size))
+            if not batch:
+                break
+
+            # Adds user-specified document name, author, year, genre, and n-gram size (unless adding to an existing document)
+            batch_doc_ids = []
+            for wordtally_dict, doc_title, author, year, genre in batch:
+                if wordtally_dict is None:
+                    print(ui_helpers.YELLOW + 'Skipped ' + ui_helpers.RESET + f'{doc_title}' + ui_helpers.YELLOW + ' (no word counts).' + ui_helpers.RESET)
+                    batch_doc_ids.append(None)
+                elif is_delta:
+                    batch_doc_ids.append(doc_id)
+                else:
+                    cur.execute('''
+                    INSERT INTO Documents (doc_title, author, year, genre, ngram_size)
+                    VALUES (?, ?, ?, ?, ?)        
+                    ''', (doc_title, author, year, genre, ngram_size))
+                    batch_doc_ids.append(cur.lastrowid)
+
+            # Adds new words to Words and maps every word of the batch to its word_id
+            batch_words = set().union(*(document[0] for document in batch if document[0] is not None))
+            cur.executemany('INSERT INTO StagedWords (word) VALUES (?);', ((word,) for word in batch_words))
+            cur.execute('INSERT INTO Words (word) SELECT word FROM StagedWords WHERE true ON CONFLICT(word) DO NOTHING;')
+            word_ids = dict(cur.execute('SELECT s.word, w.word_id FROM StagedWords AS s JOIN Words AS w ON w.word = s.word;'))
+
+            # Stages the (word_id, doc_id, count) rows of the batch
+            for (wordtally_dict, *metadata), batch_doc_id in zip(batch, batch_doc_ids):
+                if wordtally_dict is None:
+                    continue
+                cur.executemany('INSERT INTO StagedCounts (word_id, doc_id, count) VALUES (?, ?, ?);',
+                                ((word_ids[word], batch_doc_id, count) for word, count in wordtally_dict.items()))
+                row_count += len(wordtally_dict)
+
+            # Records the WordCounts rows which a delta is about to change
+            if is_delta:
+                cur.execute('''
+                UPDATE StagedCounts SET
+                    count_change = -IFNULL((SELECT wc.count FROM WordCounts AS wc WHERE wc.word_id = StagedCounts.word_id AND wc.doc_id = StagedCounts.doc_id), 0),
+                    row_change = -EXISTS (SELECT 1 FROM WordCounts AS wc WHERE wc.word_id = StagedCounts.word_id AND wc.doc_id = StagedCounts.doc_id);
+                ''')
+
+            # Moves the staged rows into WordCounts
             cur.execute('''
-            INSERT INTO Words (word)
-            VALUES (?)
-            ON CONFLICT(word) DO NOTHING;
-            ''', (word,))
-
-        # SQL statement for insertion into WordCounts table
-        sql_insertion = '''
-        INSERT INTO WordCounts (word_id, doc_id, count) 
-        VALUES ((SELECT word_id FROM Words WHERE word = ?), ?, ?)
-        ON CONFLICT (word_id, doc_id) DO UPDATE SET count = count + EXCLUDED.count;
-        '''
-
-        # Executes the SQL insertion for WordCounts table
-        for word, count in wordtally_dict.items():
-            cur.execute(sql_insertion, (word, doc_id, count))
-
+            INSERT INTO WordCounts (word_id, doc_id, count)
+            SELECT word_id, doc_id, count FROM StagedCounts WHERE true
+            ON CONFLICT (word_id, doc_id) DO UPDATE SET count = count + EXCLUDED.count;
+            ''')
+
+            # Updates the document frequency (distinct titles) of each word: +1 per new title using it, recounted for a delta
+            # Note: CROSS JOIN keeps SQLite looking up earlier documents by title (DocumentsByTitle) rather than scanning every document using the word
+            if is_delta:
+                cur.execute('DELETE FROM WordCounts WHERE doc_id = ? AND count <= 0', (doc_id,))
+                cur.execute('''
+                INSERT INTO DocumentFrequency (word_id, doc_count)
+                SELECT s.word_id, (SELECT COUNT(DISTINCT d.doc_title) FROM WordCounts AS wc JOIN Documents AS d ON d.doc_id = wc.doc_id WHERE wc.word_id = s.word_id)
+                FROM (SELECT DISTINCT word_id FROM StagedCounts) AS s WHERE true
+                ON CONFLICT (word_id) DO UPDATE SET doc_count = EXCLUDED.doc_count;
+                ''')
+            else:
+                cur.execute('''
+                INSERT INTO DocumentFrequency (word_id, doc_count)
+                SELECT t.word_id, COUNT(*)
+                FROM (SELECT DISTINCT s.word_id, d.doc_title FROM StagedCounts AS s JOIN Documents AS d ON d.doc_id = s.doc_id WHERE s.count > 0) AS t
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM Documents AS od CROSS JOIN WordCounts AS wc ON wc.doc_id = od.doc_id AND wc.word_id = t.word_id
+                    WHERE od.doc_title = t.doc_title AND wc.count > 0 AND od.doc_id NOT IN (SELECT doc_id FROM StagedCounts)
+                )
+                GROUP BY t.word_id
+                ON CONFLICT (word_id) DO UPDATE SET doc_count = doc_count + EXCLUDED.doc_count;
+                ''')
+
+            # Completes the change of each WordCounts row of a delta (after the upsert and the removal of rows with no count)
+            if is_delta:
+                cur.execute('''
+                UPDATE StagedCounts SET
+                    count_change = count_change + IFNULL((SELECT wc.count FROM WordCounts AS wc WHERE wc.word_id = StagedCounts.word_id AND wc.doc_id = StagedCounts.doc_id), 0),
+                    row_change = row_change + EXISTS (SELECT 1 FROM WordCounts AS wc WHERE wc.word_id = StagedCounts.word_id AND wc.doc_id = StagedCounts.doc_id);
+                ''')
+
+            # Adds the batch to each rollup table by the metadata of its documents (rows with the same key are summed by the upsert)
+            for table, columns in ROLLUP_TABLES.items():
+                keys = ', '.join(columns)
+                cur.execute(f'''
+                INSERT INTO {table} ({keys}, word_id, total_count, row_count)
+                SELECT {_rollup_keys(columns)}, s.word_id, {count_change}, {row_change}
+                FROM StagedCounts AS s JOIN Documents AS d ON d.doc_id = s.doc_id WHERE true
+                ON CONFLICT ({keys}, word_id) DO UPDATE SET total_count = total_count + EXCLUDED.total_count, row_count = row_count + EXCLUDED.row_count;
+                ''')
+
+            # The IDF of every word depends on the number of documents, so the materialized IDF table is emptied until it is rebuilt below
+            cur.execute('DELETE FROM InverseDocumentFrequency;')
+
+            # Clears the staging tables and commits the batch
+            cur.execute('DELETE FROM StagedWords;')
+            cur.execute('DELETE FROM StagedCounts;')
+            conn.commit()
+            doc_ids.extend(batch_doc_ids)
+
+        # Rebuilds the materialized IDF table once all batches are in
+        _register_math_functions(conn)
+        cur.execute('DELETE FROM InverseDocumentFrequency;')
+        cur.execute(f'INSERT INTO InverseDocumentFrequency (word_id, idf) SELECT word_id, {IDF_EXPRESSION} FROM DocumentFrequency;')
         conn.commit()
 
+        # Refreshes the planner statistics gathered by the schema migration if the tables have grown substantially
+        cur.execute('PRAGMA optimize;')
+
+        # Reports ingest speed
+        if report:
+            elapsed = time.perf_counter() - start_time
+            print(ui_helpers.YELLOW + 'Added ' + ui_helpers.RESET + f'{row_count:,}' + ui_helpers.YELLOW + ' word counts from ' +
+                  ui_helpers.RESET + f'{sum(doc_id is not None for doc_id in doc_ids)}' + ui_helpers.YELLOW + ' document(s) in ' +
+                  ui_helpers.RESET + f'{elapsed:.2f}' + ui_helpers.YELLOW + ' seconds (' +
+                  ui_helpers.RESET + f'{row_count / max(elapsed, 1e-9):,.0f}' + ui_helpers.YELLOW + ' rows/second).' + ui_helpers.RESET)
+
+        return doc_ids
+
     except sqlite3.Error as e:
+        conn.rollback()
         print(ui_helpers.RED + f'The following SQLite3 error occurred while adding data to the database: {e}' + ui_helpers.RESET)
+        return doc_ids
 
     except Exception as e:
+        conn.rollback()
         print(ui_helpers.RED + f'The following Exception occurred while adding data to the database: {e}' + ui_helpers.RESET)
+        return doc_ids
 
     finally:
-        conn.close()
+        release_connection(conn)
     
 # Summarizes SQL database
 def summarize_database(database_name):
@@ -163,9 +604,11 @@ def summarize_database(database_name):
     Parameters:
     database_name - the database to be summarized.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
 
     # Create objects for connecting to the database
-    conn = sqlite3.connect(database_name)
+    conn = get_connection(database_name, read_only=True)
     cursor = conn.cursor()
 
     # Query unique author count
@@ -188,9 +631,9 @@ def summarize_database(database_name):
     cursor.execute("SELECT COUNT(DISTINCT word_id) FROM WORDS;")
     total_words = cursor.fetchone()[0]
 
-    # Close connection
+    # Release connection
     cursor.close()
-    conn.close()
+    release_connection(conn)
 
     # Get file size of the database
     db_size = os.path.getsize(database_name)
@@ -219,51 +662,46 @@ def query_most_used_words(database_name, start_year=-3000, end_year=2075, top_n=
     Returns:
     df - the Pandas DataFrame
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
     # Create objects for connecting to the database
-    conn = sqlite3.connect(database_name)
+    conn = get_connection(database_name, read_only=True)
 
-    # Query database for most-used words over time
+    # Query the YearWordCounts rollup for most-used words over time
     query = """
-        WITH TotalCounts AS (
-        SELECT w.word, SUM(wc.count) AS grand_total
-        FROM Words As w
-        JOIN WordCounts AS wc ON w.word_id = wc.word_id
-        JOIN Documents AS d ON wc.doc_id = d.doc_id
-        WHERE d.year BETWEEN ? AND ?
-        AND w.word IN (
-            SELECT w2.word
-            FROM Words AS w2
-            JOIN WordCounts as wc2 on w2.word_id = wc2.word_id
-            JOIN Documents AS d2 ON wc2.doc_id = d2.doc_id
-            GROUP BY w2.word
-            HAVING COUNT(DISTINCT d2.year) > 1
+        WITH MultiYearWords AS (
+            SELECT word_id
+            FROM YearWordCounts
+            WHERE row_count > 0
+            GROUP BY word_id
+            HAVING COUNT(DISTINCT NULLIF(year, x'')) > 1
+        ),
+        YearTotals AS (
+            SELECT y.year, y.word_id, y.total_count
+            FROM YearWordCounts AS y
+            JOIN MultiYearWords AS m ON m.word_id = y.word_id
+            WHERE y.year BETWEEN ? AND ?
+            AND y.row_count > 0
+        ),
+        TotalCounts AS (
+            SELECT word_id, SUM(total_count) AS grand_total
+            FROM YearTotals
+            GROUP BY word_id
         )
-        GROUP BY w.word
-    )
-    SELECT d.year, w.word, SUM(wc.count) AS total_count
-    FROM Words as w
-    JOIN WordCounts AS wc ON w.word_id = wc.word_id
-    JOIN Documents AS d on wc.doc_id = d.doc_id
-    JOIN TotalCounts AS tc ON w.word = tc.word
-    WHERE d.year BETWEEN ? AND ?
-    AND w.word IN (
-        SELECT w2.word
-        FROM Words AS w2
-        JOIN WordCounts as wc2 on w2.word_id = wc2.word_id
-        JOIN Documents AS d2 ON wc2.doc_id = d2.doc_id
-        GROUP BY w2.word
-        HAVING COUNT(DISTINCT d2.year) > 1
-    )
-    GROUP BY d.year, w.word
-    ORDER BY tc.grand_total DESC, w.word, d.year, total_count
-    LIMIT ?    
+        SELECT yt.year, w.word, yt.total_count
+        FROM YearTotals AS yt
+        JOIN TotalCounts AS tc ON tc.word_id = yt.word_id
+        JOIN Words AS w ON w.word_id = yt.word_id
+        ORDER BY tc.grand_total DESC, w.word, yt.year, yt.total_count
+        LIMIT ?
     """
 
     # Execute the query and load results as DataFrame
-    df = pd.read_sql_query(query, conn, params=(start_year, end_year, start_year, end_year, top_n))
+    df = pd.read_sql_query(query, conn, params=(start_year, end_year, top_n))
 
     # Close connection and Return Dataframe
-    conn.close()
+    release_connection(conn)
     return df
 
 # Word Count Trends Over Time (By Author(s))
@@ -284,53 +722,39 @@ def query_most_used_words_by_author(database_name, start_year=-3000, end_year=20
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
     try:
         # Database connection
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
-        # Query database for most-used words over time
+        # Query the AuthorYearWordCounts rollup for most-used words over time
         query = """
-        WITH TotalCounts AS (
-            SELECT w.word, SUM(wc.count) AS grand_total
-            FROM Words As w
-            JOIN WordCounts AS wc ON w.word_id = wc.word_id
-            JOIN Documents AS d ON wc.doc_id = d.doc_id
-            WHERE d.year BETWEEN ? AND ?
-            AND w.word IN (
-                SELECT w2.word
-                FROM Words AS w2
-                JOIN WordCounts as wc2 on w2.word_id = wc2.word_id
-                JOIN Documents AS d2 ON wc2.doc_id = d2.doc_id
-                GROUP BY w2.word
-                HAVING COUNT(DISTINCT d2.year) > 1
-            )
-            GROUP BY w.word
+        WITH MultiYearWords AS (
+            SELECT word_id
+            FROM YearWordCounts
+            WHERE row_count > 0
+            GROUP BY word_id
+            HAVING COUNT(DISTINCT NULLIF(year, x'')) > 1
         ),
         RankedWords AS (
-            SELECT d.author, d.year, w.word, SUM(wc.count) AS total_count,
-                ROW_NUMBER() OVER (PARTITION BY d.author ORDER BY SUM(wc.count) DESC) AS rank
-            FROM Words AS w
-            JOIN WordCounts AS wc ON w.word_id = wc.word_id
-            JOIN Documents AS d ON wc.doc_id = d.doc_id
-            JOIN TotalCounts AS tc ON w.word = tc.word
-            WHERE d.year BETWEEN ? AND ?
-            AND w.word IN (
-                SELECT w2.word
-                FROM Words as w2
-                JOIN WordCounts AS wc2 ON w2.word_id = wc2.word_id
-                JOIN Documents AS d2 ON wc2.doc_id = d2.doc_id
-                GROUP BY w2.word
-                HAVING COUNT(DISTINCT d2.year) > 1
-            )
-        GROUP BY d.author, d.year, w.word
+            SELECT r.author, r.year, r.word_id, r.total_count,
+                ROW_NUMBER() OVER (PARTITION BY r.author ORDER BY r.total_count DESC) AS rank
+            FROM AuthorYearWordCounts AS r
+            JOIN MultiYearWords AS m ON m.word_id = r.word_id
+            WHERE r.year BETWEEN ? AND ?
+            AND r.row_count > 0
         )
-        SELECT author, year, word, total_count
-        FROM RankedWords
-        WHERE rank <=?;
+        SELECT NULLIF(rw.author, x'') AS author, rw.year, w.word, rw.total_count
+        FROM RankedWords AS rw
+        JOIN Words AS w ON w.word_id = rw.word_id
+        WHERE rw.rank <= ?
+        ORDER BY author, rw.rank;
         """
 
         # Execute the query and load results as DataFrame
-        df = pd.read_sql_query(query, conn, params=(start_year, end_year, start_year, end_year, top_n))
+        df = pd.read_sql_query(query, conn, params=(start_year, end_year, top_n))
         return df
 
     except sqlite3.Error as e:
@@ -342,7 +766,7 @@ def query_most_used_words_by_author(database_name, start_year=-3000, end_year=20
     # Close connection and Return Dataframe
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
 # Word Count Trends Over Time (By Genre)
 def query_most_used_words_by_genre(database_name, start_year=-3000, end_year=2075, top_n=25):
@@ -362,54 +786,39 @@ def query_most_used_words_by_genre(database_name, start_year=-3000, end_year=207
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
 
     try:
         # Database connection
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
-        # Query database for most-used words over time by genre
+        # Query the GenreYearWordCounts rollup for most-used words over time by genre
         query = """
-        WITH TotalCounts AS (
-            SELECT w.word, SUM(wc.count) AS grand_total
-            FROM Words As w
-            JOIN WordCounts AS wc ON w.word_id = wc.word_id
-            JOIN Documents AS d ON wc.doc_id = d.doc_id
-            WHERE d.year BETWEEN ? AND ?
-            AND w.word IN (
-                SELECT w2.word
-                FROM Words AS w2
-                JOIN WordCounts as wc2 on w2.word_id = wc2.word_id
-                JOIN Documents AS d2 ON wc2.doc_id = d2.doc_id
-                GROUP BY w2.word
-                HAVING COUNT(DISTINCT d2.year) > 1
-            )
-            GROUP BY w.word
+        WITH MultiYearWords AS (
+            SELECT word_id
+            FROM YearWordCounts
+            WHERE row_count > 0
+            GROUP BY word_id
+            HAVING COUNT(DISTINCT NULLIF(year, x'')) > 1
         ),
         RankedWords AS (
-            SELECT d.genre, d.year, w.word, SUM(wc.count) as total_count,
-                ROW_NUMBER() OVER (PARTITION BY d.genre ORDER BY SUM (wc.count) DESC) AS rank
-            FROM Words AS w
-            JOIN WordCounts AS wc ON w.word_id = wc.word_id
-            JOIN Documents AS d ON wc.doc_id = d.doc_id
-            JOIN TotalCounts AS tc ON w.word = tc.word
-            WHERE d.year BETWEEN ? AND ?
-            AND w.word IN (
-                SELECT w2.word
-                FROM Words as w2
-                JOIN WordCounts AS wc2 ON w2.word_id = wc2.word_id
-                JOIN Documents AS d2 ON wc2.doc_id = d2.doc_id
-                GROUP BY w2.word
-                HAVING COUNT(DISTINCT d2.year) > 1
-            )
-        GROUP BY d.genre, d.year, w.word
+            SELECT r.genre, r.year, r.word_id, r.total_count,
+                ROW_NUMBER() OVER (PARTITION BY r.genre ORDER BY r.total_count DESC) AS rank
+            FROM GenreYearWordCounts AS r
+            JOIN MultiYearWords AS m ON m.word_id = r.word_id
+            WHERE r.year BETWEEN ? AND ?
+            AND r.row_count > 0
         )
-        SELECT genre, year, word, total_count
-        FROM RankedWords
-        WHERE rank <=?;
+        SELECT NULLIF(rw.genre, x'') AS genre, rw.year, w.word, rw.total_count
+        FROM RankedWords AS rw
+        JOIN Words AS w ON w.word_id = rw.word_id
+        WHERE rw.rank <= ?
+        ORDER BY genre, rw.rank;
         """
 
         # Execute query and return results as DataFrame
-        df = pd.read_sql_query(query, conn, params=(start_year, end_year, start_year, end_year, top_n,))
+        df = pd.read_sql_query(query, conn, params=(start_year, end_year, top_n))
         return df
     
     except sqlite3.Error as e:
@@ -421,7 +830,7 @@ def query_most_used_words_by_genre(database_name, start_year=-3000, end_year=207
     # Close connection if it exists
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
 # Publications Over Time (By Author)
 def publications_over_time_by_author(database_name, start_year=-3000, end_year=2075, top_n=10):
@@ -441,10 +850,12 @@ def publications_over_time_by_author(database_name, start_year=-3000, end_year=2
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
-    
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
     try:
         # SQL Connection
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
         # SQL Query
         query = """
@@ -469,7 +880,7 @@ def publications_over_time_by_author(database_name, start_year=-3000, end_year=2
     # Close connection if it exists
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
 # Word(s) Lookup Over Time
 def words_lookup_over_time(database_name, start_year=-3000, end_year=2075, word_list=None):
@@ -490,37 +901,40 @@ def words_lookup_over_time(database_name, start_year=-3000, end_year=2075, word_
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
     try:
         # Connect to SQL database
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
         # Prepare the word list for SQL query
         formatted_word_list = ', '.join(f"'{word}'" for word in word_list) if word_list else "'default_word'"
 
-        # SQL Query
+        # Query the YearWordCounts rollup
         query = f"""
-        WITH TotalCounts AS (
-            SELECT w.word, SUM(wc.count) AS grand_total
-            FROM Words AS w
-            JOIN WordCounts AS wc ON w.word_id = wc.word_id
-            JOIN Documents AS d ON wc.doc_id = d.doc_id
-            WHERE d.year BETWEEN ? AND ?
+        WITH YearTotals AS (
+            SELECT y.year, y.word_id, y.total_count
+            FROM YearWordCounts AS y
+            JOIN Words AS w ON w.word_id = y.word_id
+            WHERE y.year BETWEEN ? AND ?
+            AND y.row_count > 0
             AND w.word IN ({formatted_word_list})
-            GROUP BY w.word
+        ),
+        TotalCounts AS (
+            SELECT word_id, SUM(total_count) AS grand_total
+            FROM YearTotals
+            GROUP BY word_id
         )
-        SELECT d.year, w.word, SUM(wc.count) AS total_count
-        FROM Words AS w
-        JOIN WordCounts AS wc ON w.word_id = wc.word_id
-        JOIN Documents AS d ON wc.doc_id = d.doc_id
-        JOIN TotalCounts as tc ON w.word = tc.word
-        WHERE d.year BETWEEN ? AND ?
-        AND w.word IN ({formatted_word_list})
-        GROUP BY d.year, w.word
-        ORDER BY tc.grand_total DESC, w.word, d.year
+        SELECT yt.year, w.word, yt.total_count
+        FROM YearTotals AS yt
+        JOIN TotalCounts AS tc ON tc.word_id = yt.word_id
+        JOIN Words AS w ON w.word_id = yt.word_id
+        ORDER BY tc.grand_total DESC, w.word, yt.year
         """
 
         # Execute the query and return as Pandas DataFrame
-        df = pd.read_sql_query(query, conn, params=(start_year, end_year, start_year, end_year))
+        df = pd.read_sql_query(query, conn, params=(start_year, end_year))
         return df
 
     except sqlite3.Error as e:
@@ -532,7 +946,7 @@ def words_lookup_over_time(database_name, start_year=-3000, end_year=2075, word_
     # Close connection
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
 # Most Common Words By Author
 def query_most_used_words_by_author_no_time(database_name, top_n=25):
@@ -550,28 +964,26 @@ def query_most_used_words_by_author_no_time(database_name, top_n=25):
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
     try:
         # Database connection
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
-        # Query database for most-used words by author
+        # Query the AuthorWordCounts rollup for most-used words by author
         query = """
-        WITH AuthorWordCounts AS (
-            SELECT d.author, w.word, SUM(wc.count) AS total_count
-            FROM Words AS w
-            JOIN WordCounts AS wc ON w.word_id = wc.word_id
-            JOIN Documents AS d ON wc.doc_id = d.doc_id
-            GROUP BY d.author, w.word
-        ),
-        RankedWords AS (
-            SELECT author, word, total_count,
+        WITH RankedWords AS (
+            SELECT author, word_id, total_count,
                 RANK() OVER (PARTITION BY author ORDER BY total_count DESC) AS rank
             FROM AuthorWordCounts
+            WHERE row_count > 0
         )
-        SELECT author, word, total_count
-        FROM RankedWords
-        WHERE rank <= ?
-        ORDER BY author, rank;
+        SELECT NULLIF(rw.author, x'') AS author, w.word, rw.total_count
+        FROM RankedWords AS rw
+        JOIN Words AS w ON w.word_id = rw.word_id
+        WHERE rw.rank <= ?
+        ORDER BY author, rw.rank;
         """
 
         # Execute the query and load results as DataFrame
@@ -587,7 +999,7 @@ def query_most_used_words_by_author_no_time(database_name, top_n=25):
     # Close connection if it exists
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
 # Word Count By Genre
 def query_most_used_words_by_genre_no_time(database_name, top_n=25):
@@ -605,29 +1017,26 @@ def query_most_used_words_by_genre_no_time(database_name, top_n=25):
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
 
     try:
         # Database connection
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
-        # Query database for most-used words by genre
+        # Query the GenreWordCounts rollup for most-used words by genre
         query = """
-        WITH GenreWordCounts AS (
-            SELECT d.genre, w.word, SUM(wc.count) AS total_count
-            FROM Words as w
-            JOIN WordCounts AS wc ON w.word_id = wc.word_id
-            JOIN Documents AS d ON wc.doc_id = d.doc_id
-            GROUP BY d.genre, w.word
-        ),
-        RankedWords AS (
-            SELECT genre, word, total_count,
+        WITH RankedWords AS (
+            SELECT genre, word_id, total_count,
                 ROW_NUMBER() OVER (PARTITION BY genre ORDER BY total_count DESC) AS rank
             FROM GenreWordCounts
+            WHERE row_count > 0
         )
-        SELECT genre, word, total_count
-        FROM RankedWords
-        WHERE rank <= ?
-        ORDER BY genre, rank;
+        SELECT NULLIF(rw.genre, x'') AS genre, w.word, rw.total_count
+        FROM RankedWords AS rw
+        JOIN Words AS w ON w.word_id = rw.word_id
+        WHERE rw.rank <= ?
+        ORDER BY genre, rw.rank;
         """
 
         # Execute the query and load results as DataFrame
@@ -643,7 +1052,7 @@ def query_most_used_words_by_genre_no_time(database_name, top_n=25):
     # Close connection if it exists
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
 # Word Frequency by Publication
 def query_word_count_by_pub(database_name, top_n=25):
@@ -661,10 +1070,12 @@ def query_word_count_by_pub(database_name, top_n=25):
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
 
     try:
         # Database connection
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
         # Query database for most-used words over time
         query = """
@@ -701,7 +1112,7 @@ def query_word_count_by_pub(database_name, top_n=25):
     # Close connection if it exists
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
 # Publications By Genre with Author
 def publications_by_genre_no_time(database_name):
@@ -719,9 +1130,12 @@ def publications_by_genre_no_time(database_name):
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
     try:
         # SQL Connection
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
         # SQL Query
         query = """
@@ -744,7 +1158,7 @@ def publications_by_genre_no_time(database_name):
     # Close connection if it exists
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
 # Word Lookup by Publication with Author
 def words_lookup_publication_with_author(database_name, word_list=None):
@@ -762,9 +1176,12 @@ def words_lookup_publication_with_author(database_name, word_list=None):
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
     try:
         # Connect to SQL database
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
         # Prepare the word list for SQL query
         formatted_word_list = ', '.join(f"'{word}'" for word in word_list) if word_list else "'default_word'"
@@ -802,47 +1219,406 @@ def words_lookup_publication_with_author(database_name, word_list=None):
     # Close connection if it exists
     finally:
         if 'conn' in locals():
-            conn.close()
+            release_connection(conn)
 
-# Query SQL Database for TF-IDF
-def query_sql_for_tf_idf(database_name):
+# Queries the raw id-based word counts for TF-IDF analysis
+def query_sql_word_counts(database_name):
     """
-    Queries selected SQLite database and returns a DataFrame which may be used by the analysis.sql_tf_idf_analysis() function to compute TF-IDF scores for each word retrieved.
+    Queries selected SQLite database for its word counts as (doc_id, word_id, count) rows, plus the Documents and Words tables needed to label them. Words and metadata are not repeated on every row, so this may be used by analysis.sql_tf_idf_from_ids() to build a sparse count matrix directly.
 
     Parameters:
     database_name - the name of the database to query.
 
     Returns:
-    df - the DataFrame which may be used by other functions to complete TF-IDF analysis.
+    counts_df - a DataFrame with columns doc_id, word_id, count.
+    documents_df - a DataFrame with columns doc_id, doc_title, author, year, genre.
+    words_df - a DataFrame with columns word_id, word (only words which have counts).
 
     Raises:
     sqlite3.Error - for SQLite3 errors.
     Exception - for all other errors encountered during function execution.
     """
+    # Moves to Databases folder
+    ui_helpers.move_to_databases()
+
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
     try:
         # Connect to DB
-        conn = sqlite3.connect(database_name)
+        conn = get_connection(database_name, read_only=True)
 
-        # Query
-        query = """
-        SELECT d.doc_id, d.doc_title, d.author, d.year, d.genre, w.word, wc.count
+        # Queries
+        counts_df = pd.read_sql_query('SELECT doc_id, word_id, count FROM WordCounts;', conn)
+        documents_df = pd.read_sql_query('SELECT doc_id, doc_title, author, year, genre FROM Documents ORDER BY doc_id;', conn)
+        words_df = pd.read_sql_query('SELECT word_id, word FROM Words WHERE word_id IN (SELECT DISTINCT word_id FROM WordCounts);', conn)
+
+        return counts_df, documents_df, words_df
+
+    except sqlite3.Error as e:
+        print(ui_helpers.RED + f'The following SQLite3 error occurred while querying the database: {e}' + ui_helpers.RESET)
+        return None, None, None
+
+    except Exception as e:
+        print(ui_helpers.RED + f'The following Exception occurred while querying the database: {e}' + ui_helpers.RESET)
+        return None, None, None
+
+    # Close connection if it exists
+    finally:
+        if 'conn' in locals():
+            release_connection(conn)
+
+# Lists the documents of a database
+def query_documents(database_name):
+    """
+    Queries selected SQLite database for the metadata of all of its documents, i.e., so that the user can choose a subset of documents.
+
+    Parameters:
+    database_name - the name of the database to query.
+
+    Returns:
+    documents_df - a DataFrame with columns doc_id, doc_title, author, year, genre.
+
+    Raises:
+    sqlite3.Error - for SQLite3 errors.
+    Exception - for all other errors encountered during function execution.
+    """
+    # Moves to Databases folder
+    ui_helpers.move_to_databases()
+
+    # Brings databases created by earlier versions up to the current schema (indexes)
+    migrate_database(database_name)
+
+    try:
+        conn = get_connection(database_name, read_only=True)
+        documents_df = pd.read_sql_query('SELECT doc_id, doc_title, author, year, genre FROM Documents ORDER BY doc_id;', conn)
+        return documents_df
+
+    except sqlite3.Error as e:
+        print(ui_helpers.RED + f'The following SQLite3 error occurred while querying the database: {e}' + ui_helpers.RESET)
+
+    except Exception as e:
+        print(ui_helpers.RED + f'The following Exception occurred while querying the database: {e}' + ui_helpers.RESET)
+
+    finally:
+        if 'conn' in locals():
+            release_connection(conn)
+
+# Finds whether a database holds word or phrase counts
+def query_ngram_size(database_name):
+    """
+    Queries the number of words per entry (the ngram_size column of Documents) of a database's documents, i.e., so that phrase counts are not exported to a database of word counts. Databases which do not exist yet are not created.
+
+    Parameters:
+    database_name - the name of the database to query.
+
+    Returns:
+    ngram_size - 1 for single words, 2 or more for phrases, or None if the database does not exist or has no documents.
+
+    Raises:
+    sqlite3.Error - for SQLite3 errors.
+    """
+    # Moves to Databases folder
+    ui_helpers.move_to_databases()
+
+    if not os.path.exists(database_name):
+        return None
+
+    # Brings databases created by earlier versions up to the current schema (adds ngram_size)
+    migrate_database(database_name)
+
+    try:
+        conn = get_connection(database_name, read_only=True)
+        cur = conn.cursor()
+        if not cur.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Documents');").fetchone()[0]:
+            return None
+        row = cur.execute('SELECT ngram_size FROM Documents LIMIT 1;').fetchone()
+        return row[0] if row else None
+
+    except sqlite3.Error as e:
+        print(ui_helpers.RED + f'The following SQLite3 error occurred while querying the database: {e}' + ui_helpers.RESET)
+        return None
+
+    finally:
+        if 'conn' in locals():
+            release_connection(conn)
+
+# Queries the word counts of selected documents joined with the stored document frequencies
+def query_word_counts_with_document_frequency(database_name, doc_ids=None):
+    """
+    Queries the (doc_id, word_id, count) rows of the selected documents and joins each word with its stored DocumentFrequency, so that TF-IDF for any subset of documents can use corpus-wide IDF weights (see analysis.tf_idf_with_stored_idf) without reading the rest of the corpus.
+
+    Parameters:
+    database_name - the name of the database to query.
+    doc_ids - a list of doc_ids to include. Default None includes all documents.
+
+    Returns:
+    counts_df - a DataFrame with columns doc_id, word_id, count.
+    documents_df - a DataFrame with columns doc_id, doc_title, author, year, genre (selected documents only).
+    words_df - a DataFrame with columns word_id, word, doc_count (words used by the selected documents only).
+    total_documents - the number of distinct document titles with word counts in the whole database (N).
+
+    Raises:
+    sqlite3.Error - for SQLite3 errors.
+    Exception - for all other errors encountered during function execution.
+    """
+    # Moves to Databases folder
+    ui_helpers.move_to_databases()
+
+    # Brings databases created by earlier versions up to the current schema (adds and fills DocumentFrequency)
+    migrate_database(database_name)
+
+    try:
+        conn = get_connection(database_name, read_only=True)
+        cur = conn.cursor()
+
+        # Stages the selected doc_ids in a temporary table (kept by the pooled connection, so emptied first)
+        cur.execute('CREATE TEMP TABLE IF NOT EXISTS SelectedDocuments (doc_id INTEGER PRIMARY KEY);')
+        cur.execute('DELETE FROM SelectedDocuments;')
+        if doc_ids is None:
+            cur.execute('INSERT INTO SelectedDocuments (doc_id) SELECT doc_id FROM Documents;')
+        else:
+            cur.executemany('INSERT OR IGNORE INTO SelectedDocuments (doc_id) VALUES (?);', [(int(doc_id),) for doc_id in doc_ids])
+
+        counts_df = pd.read_sql_query('''
+        SELECT wc.doc_id, wc.word_id, wc.count
+        FROM WordCounts wc
+        JOIN SelectedDocuments s ON s.doc_id = wc.doc_id;
+        ''', conn)
+
+        documents_df = pd.read_sql_query('''
+        SELECT d.doc_id, d.doc_title, d.author, d.year, d.genre
         FROM Documents d
-        JOIN WordCounts wc ON d.doc_id = wc.doc_id
-        JOIN Words as w ON w.word_id = wc.word_id;
+        JOIN SelectedDocuments s ON s.doc_id = d.doc_id
+        ORDER BY d.doc_id;
+        ''', conn)
+
+        words_df = pd.read_sql_query('''
+        SELECT w.word_id, w.word, df.doc_count
+        FROM Words w
+        JOIN DocumentFrequency df ON df.word_id = w.word_id
+        WHERE w.word_id IN (SELECT wc.word_id FROM WordCounts wc JOIN SelectedDocuments s ON s.doc_id = wc.doc_id);
+        ''', conn)
+
+        total_documents = cur.execute(f'SELECT {DOCUMENT_COUNT};').fetchone()[0]
+
+        return counts_df, documents_df, words_df, total_documents
+
+    except sqlite3.Error as e:
+        print(ui_helpers.RED + f'The following SQLite3 error occurred while querying the database: {e}' + ui_helpers.RESET)
+        return None, None, None, None
+
+    except Exception as e:
+        print(ui_helpers.RED + f'The following Exception occurred while querying the database: {e}' + ui_helpers.RESET)
+        return None, None, None, None
+
+    finally:
+        if 'conn' in locals():
+            release_connection(conn)
+
+# Provides ln() and sqrt() if this SQLite build lacks its math functions
+def _register_math_functions(conn):
+    try:
+        conn.execute('SELECT ln(1), sqrt(1);')
+    except sqlite3.OperationalError:
+        conn.create_function('ln', 1, math.log, deterministic=True)
+        conn.create_function('sqrt', 1, math.sqrt, deterministic=True)
+
+# Computes TF-IDF inside SQLite and returns the Top N words of each document
+def query_tf_idf_top_n(database_name, top_n=20, threshold=None):
+    """
+    Computes TF-IDF scores inside SQLite, so that only the Top N words of each document (and/or the words scoring above a threshold) are transferred to Python, rather than every (doc, word, count) row of the database.
+
+    IDF weights come from the materialized InverseDocumentFrequency table, which documents_to_database keeps up to date; if it is empty (i.e., after an interrupted ingest or a schema migration), the weights are computed from DocumentFrequency within the query, so the database is never written to. As in the pandas TF-IDF analyses, documents which share a title are one document: their word counts are summed by title first. Window functions then compute each title's L2 norm (SUM() OVER (PARTITION BY title_id), the first doc_id of the title) and rank its words (ROW_NUMBER()), giving the same scores as analysis.sql_tf_idf_from_ids and analysis.tf_idf_with_stored_idf: count * idf / norm, with the smooth IDF used by TfidfTransformer.
+
+    Parameters:
+    database_name - the database to be queried.
+    top_n - the number of words to return per document. 20 by default; None returns every word above the threshold.
+    threshold - if given, only words scoring above this value are returned.
+
+    Returns:
+    df - a Pandas DataFrame with columns doc_title, author, year, genre, word, count, tf_idf, rank. Author, year and genre are those of the first document with the title.
+
+    Raises:
+    sqlite3.Error - for SQLite3 errors.
+    Exception - for all other errors encountered during function execution.
+    """
+    # Moves to Databases folder
+    ui_helpers.move_to_databases()
+
+    # Brings databases created by earlier versions up to the current schema (adds and fills DocumentFrequency)
+    migrate_database(database_name)
+
+    try:
+        conn = get_connection(database_name, read_only=True)
+        _register_math_functions(conn)
+
+        # Uses the materialized IDF table, or computes the same weights from DocumentFrequency if it is empty
+        # Counts are summed by title, keyed by the first document with counts of each title (title_id), which supplies the metadata and order
+        query = f"""
+        WITH Idf AS (
+            SELECT word_id, idf FROM InverseDocumentFrequency
+            UNION ALL
+            SELECT word_id, {IDF_EXPRESSION} FROM DocumentFrequency
+            WHERE NOT EXISTS (SELECT 1 FROM InverseDocumentFrequency)
+        ),
+
+        Titles AS (
+            SELECT doc_title, MIN(doc_id) AS title_id
+            FROM Documents AS d
+            WHERE EXISTS (SELECT 1 FROM WordCounts AS wc WHERE wc.doc_id = d.doc_id)
+            GROUP BY doc_title
+        ),
+
+        DocumentTitles AS (
+            SELECT d.doc_id, t.title_id
+            FROM Documents AS d
+            JOIN Titles AS t ON t.doc_title = d.doc_title
+        ),
+
+        TitleCounts AS (
+            SELECT dt.title_id, wc.word_id, SUM(wc.count) AS count
+            FROM WordCounts AS wc
+            JOIN DocumentTitles AS dt ON dt.doc_id = wc.doc_id
+            WHERE wc.count > 0
+            GROUP BY dt.title_id, wc.word_id
+        ),
+
+        Weighted AS (
+            SELECT tc.title_id, tc.word_id, tc.count, tc.count * idf.idf AS weight
+            FROM TitleCounts AS tc
+            JOIN Idf AS idf ON idf.word_id = tc.word_id
+        ),
+
+        Scored AS (
+            SELECT title_id, word_id, count,
+                weight / sqrt(SUM(weight * weight) OVER (PARTITION BY title_id)) AS tf_idf
+            FROM Weighted
+        ),
+
+        Ranked AS (
+            SELECT title_id, word_id, count, tf_idf,
+                ROW_NUMBER() OVER (PARTITION BY title_id ORDER BY tf_idf DESC, word_id) AS rank
+            FROM Scored
+            WHERE tf_idf > ?
+        )
+        SELECT d.doc_title, d.author, d.year, d.genre, w.word, r.count, r.tf_idf, r.rank
+        FROM Ranked AS r
+        JOIN Documents AS d ON d.doc_id = r.title_id
+        JOIN Words AS w ON w.word_id = r.word_id
+        WHERE ? IS NULL OR r.rank <= ?
+        ORDER BY r.title_id, r.rank;
         """
 
-        # Execute query and return as Pandas DF
-        df = pd.read_sql_query(query, conn)
+        # Execute the query and return results as DataFrame
+        df = pd.read_sql_query(query, conn, params=(threshold if threshold is not None else 0, top_n, top_n))
         return df
-    
+
     except sqlite3.Error as e:
         print(ui_helpers.RED + f'The following SQLite3 error occurred while querying the database: {e}' + ui_helpers.RESET)
 
     except Exception as e:
         print(ui_helpers.RED + f'The following Exception occurred while querying the database: {e}' + ui_helpers.RESET)
 
-    # Close connection if it exists
-    finally:    
+    finally:
         if 'conn' in locals():
-            conn.close()
-    
+            release_connection(conn)
+
+# Times each query function before and after the schema migration
+def benchmark_queries(database_name, repeat=3):
+    """
+    Measures how much the index migration (the covering indexes and planner statistics of schema version 2) speeds up each query function. Two temporary copies of the database are made with the SQLite backup API: on the 'before' copy the indexes are dropped and the statistics cleared (the tables of later versions, which the queries read, are kept) and on the 'after' copy the migrations are applied. Each query function is then run repeat times on both copies with its default arguments (the word lookups use the five most common words of the database) and the fastest run is kept. Query output is suppressed while timing. The copies are removed afterwards; the selected database is not changed.
+
+    Parameters:
+    database_name - the database to benchmark (in the current directory, i.e., Databases).
+    repeat - the number of runs per query; the fastest is reported. Default is 3.
+
+    Returns:
+    df - a Pandas DataFrame with columns query, before_seconds, after_seconds, and speedup, or None if the benchmark could not be run.
+
+    Raises:
+    sqlite3.Error - for SQLite3 errors.
+    Exception - for all other errors encountered during function execution.
+    """
+    before_name = f'benchmark_before_{database_name}'
+    after_name = f'benchmark_after_{database_name}'
+
+    try:
+        # Copies the database twice
+        source = get_connection(database_name, read_only=True)
+        for copy_name in (before_name, after_name):
+            destination = sqlite3.connect(copy_name)
+            source.backup(destination)
+            destination.close()
+
+        # Finds words for the word lookup queries
+        word_list = [row[0] for row in source.execute('''
+            SELECT Words.word FROM WordCounts JOIN Words ON Words.word_id = WordCounts.word_id
+            GROUP BY WordCounts.word_id ORDER BY SUM(WordCounts.count) DESC LIMIT 5;
+            ''')]
+        release_connection(source)
+
+        # Brings the 'before' copy up to date, then undoes the index migration (its recorded version stays current, so the queries do not migrate it again)
+        migrate_database(before_name)
+        conn = get_connection(before_name)
+        for statement in SCHEMA_MIGRATIONS[2]:
+            if statement.startswith('CREATE INDEX IF NOT EXISTS '):
+                index_name = statement.split()[5]
+                conn.execute(f'DROP INDEX IF EXISTS {index_name};')
+        if conn.execute("SELECT EXISTS (SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1');").fetchone()[0]:
+            conn.execute('DELETE FROM sqlite_stat1;')
+        conn.commit()
+        release_connection(conn)
+
+        # Applies the migrations to the 'after' copy
+        migrate_database(after_name)
+
+        queries = [
+            ('summarize_database', lambda name: summarize_database(name)),
+            ('query_most_used_words', lambda name: query_most_used_words(name)),
+            ('query_most_used_words_by_author', lambda name: query_most_used_words_by_author(name)),
+            ('query_most_used_words_by_genre', lambda name: query_most_used_words_by_genre(name)),
+            ('publications_over_time_by_author', lambda name: publications_over_time_by_author(name)),
+            ('words_lookup_over_time', lambda name: words_lookup_over_time(name, word_list=word_list)),
+            ('query_most_used_words_by_author_no_time', lambda name: query_most_used_words_by_author_no_time(name)),
+            ('query_most_used_words_by_genre_no_time', lambda name: query_most_used_words_by_genre_no_time(name)),
+            ('query_word_count_by_pub', lambda name: query_word_count_by_pub(name)),
+            ('publications_by_genre_no_time', lambda name: publications_by_genre_no_time(name)),
+            ('words_lookup_publication_with_author', lambda name: words_lookup_publication_with_author(name, word_list=word_list)),
+            ('query_sql_word_counts', lambda name: query_sql_word_counts(name)),
+            ('query_documents', lambda name: query_documents(name)),
+            ('query_word_counts_with_document_frequency', lambda name: query_word_counts_with_document_frequency(name)),
+            ('query_tf_idf_top_n', lambda name: query_tf_idf_top_n(name))
+        ]
+
+        results = []
+        for query_name, query in queries:
+            timings = []
+            for copy_name in (before_name, after_name):
+                fastest = None
+                for _ in range(max(1, repeat)):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        start_time = time.perf_counter()
+                        query(copy_name)
+                        elapsed = time.perf_counter() - start_time
+                    fastest = elapsed if fastest is None else min(fastest, elapsed)
+                timings.append(fastest)
+            results.append((query_name, timings[0], timings[1], timings[0] / max(timings[1], 1e-9)))
+
+        return pd.DataFrame(results, columns=['query', 'before_seconds', 'after_seconds', 'speedup'])
+
+    except sqlite3.Error as e:
+        print(ui_helpers.RED + f'The following SQLite3 error occurred while benchmarking the database: {e}' + ui_helpers.RESET)
+        return None
+
+    except Exception as e:
+        print(ui_helpers.RED + f'The following Exception occurred while benchmarking the database: {e}' + ui_helpers.RESET)
+        return None
+
+    finally:
+        # Read-only connections cannot checkpoint the WAL, so the -wal and -shm files of a copy which was only read are removed too
+        for copy_name in (before_name, after_name):
+            close_connections(copy_name)
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(copy_name + suffix):
+                    os.remove(copy_name + suffix)
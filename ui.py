@@ -106,6 +106,7 @@ def option_1():
         print(ui_helpers.RESET + '2. Load into DataFrame with URL(s)')
         print(ui_helpers.RESET + '3. Quick Display Using Local File(s)')
         print(ui_helpers.RESET + '4. Quick Display Using URL')
+        print(ui_helpers.RESET + '5. Load Phrase (N-gram) Counts into DataFrame with Local File(s)')
         print(ui_helpers.RESET + '\n(H)elp for this page')
         print(ui_helpers.RESET + 'Press Enter without selection to return')
         
@@ -118,6 +119,8 @@ def option_1():
             option_1_3()
         elif choice == '4':
             option_1_4()
+        elif choice == '5':
+            option_1_5()
 
         # Help screen    
         elif choice.lower() == 'h':
@@ -125,6 +128,8 @@ def option_1():
             ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
             print(ui_helpers.RESET + 'Main Menu > ' + ui_helpers.CYAN + 'Word Count Analysis Menu\n')
             print(ui_helpers.RESET + 'These menu options will count the number of instances of each word located in a .txt file or set of .txt files, stored locally in the "Textfiles" subdirectory or using web URL(s). \n\nFrom there, results will either be displayed within the program or loaded into a Pandas DataFrame, enabling user options such as word lookups, .csv report generation, and visualization output (i.e., barcharts).')
+            print('\nQuick Display offers an approximate mode for enormous files or URLs. It keeps only a fixed number of counters in memory and shows each count with its maximum error (the true count is between the count shown and the count plus the error).')
+            print('\nPhrase (N-gram) Counts count runs of consecutive words (i.e., bigrams such as "jean valjean") instead of single words. Phrases never span a word from commonwords.txt or the end of a sentence. Very large files are counted within a fixed memory budget; in that case only the most frequent phrases are kept and their counts are close estimates.')
             print('\nPlease note that only .txt files in UTF-8 format are supported. While HTML may work, expect to see undesired results such as HTML code within the Word Counts. If desired, users can manually eliminate these from word counts by adding them to the filter in the commonwords.txt from the Main Menu, or by manually eliminating undesired words from the DataFrame.')
             input(ui_helpers.YELLOW + '\nPress Enter to return to Word Count Analysis Menu: ' + ui_helpers.RESET)
             option_1()
@@ -155,17 +160,13 @@ def option_1_1():
     # Loads commonwords.txt as a filter
     common_words = analysis.load_common_words()
 
-    # Creates dictionary for all word counts by docs
-    word_counts_all_docs = {}
+    # Tallies the user .txt files in parallel, one worker process per file
+    corpus_counts = analysis.tally_corpus(files_to_process, common_words)
 
-    # Loads the user .txt files and displays confirmation
-    for filename in files_to_process:
-        text_file_data = analysis.load_textfile(filename)
-        wordtally_dict = analysis.tally_words(text_file_data, common_words)
-        filename = filename[0:-4]
-
-        # Creates a nested dictionary {filename:{word:counts}} structure
-        word_counts_all_docs[filename] = wordtally_dict
+    # Creates a nested dictionary {filename:{word:counts}} structure
+    word_counts_all_docs = {}
+    for filename, wordtally_dict in corpus_counts.items():
+        word_counts_all_docs[filename[0:-4]] = wordtally_dict
     
     # Convert nested dictionary to DataFrame
     word_counts_df = analysis.word_counts_to_df(word_counts_all_docs)
@@ -262,14 +263,23 @@ def option_1_3():
     # Requests user input for number of words to display
     number_to_list = ui_helpers.get_top_n()
 
+    # Exact or approximate (fixed memory) mode
+    approximate = ui_helpers.get_approximate_mode()
+
     # Loads commonwords.txt as a filter
     common_words = analysis.load_common_words()
 
-    # Loads the user .txt files and displays confirmation
-    for filename in files_to_process:
-        text_file_data = analysis.load_textfile(filename)
-        wordtally_dict = analysis.tally_words(text_file_data, common_words)
-        visuals.display_word_frequency(filename, wordtally_dict, number_to_list)
+    # Streams each file through a fixed number of counters and displays estimates with error bounds
+    if approximate:
+        for filename in files_to_process:
+            top_words = analysis.tally_top_k_file(filename, common_words, number_to_list)
+            visuals.display_top_k_estimates(filename, top_words)
+
+    # Tallies the user .txt files in parallel and displays the results
+    else:
+        corpus_counts = analysis.tally_corpus(files_to_process, common_words)
+        for filename, wordtally_dict in corpus_counts.items():
+            visuals.display_word_frequency(filename, wordtally_dict, number_to_list)
     
     # Return Prompt
     input(ui_helpers.YELLOW + '\nPress Enter for to return...' + ui_helpers.RESET)
@@ -309,12 +319,22 @@ def option_1_4():
     # Requests user input for number of words to display
     top_n = ui_helpers.get_top_n()
 
-    # Opens the URL and returns a string
-    filename, text_file_data = analysis.url_text_file_open(user_url)
+    # Exact or approximate (fixed memory) mode
+    approximate = ui_helpers.get_approximate_mode()
+
+    # Streams the URL through a fixed number of counters and displays estimates with error bounds
+    if approximate:
+        wordtally_dict = None
+        filename, top_words = analysis.tally_top_k_url(user_url, common_words, top_n)
+        visuals.display_top_k_estimates(filename, top_words)
 
-    # Completes the Word Count
-    wordtally_dict = analysis.tally_words(text_file_data, common_words)
-    visuals.display_word_frequency(filename, wordtally_dict, top_n)
+    else:
+        # Opens the URL and returns a string
+        filename, text_file_data = analysis.url_text_file_open(user_url)
+
+        # Completes the Word Count
+        wordtally_dict = analysis.tally_words(text_file_data, common_words)
+        visuals.display_word_frequency(filename, wordtally_dict, top_n)
     
     # Returns to Analysis menu
     input('\nPress Enter to return to the ' + ui_helpers.CYAN + 'Analysis '  + ui_helpers.RESET + 'menu.')
@@ -323,6 +343,55 @@ def option_1_4():
 
     return wordtally_dict
 
+# Option 1_5 - Local Text File Phrase (N-gram) Count with DataFrame
+def option_1_5():
+    """
+    Enables the user to select local text file(s) and count phrases of N words (bigrams, trigrams, etc.) within a fixed memory budget. Once complete, the DataFrame Transformation Menu is entered for further processing.
+
+    Globals:
+    word_counts_df - this is updated with the desired phrase counts once complete.
+    """
+
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Page title and instructions
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > Word Count Analysis Menu > ' + ui_helpers.CYAN + 'Load Phrase (N-gram) Counts into DataFrame with Local File(s)' + ui_helpers.RESET)
+
+    # Lists available text files and gets user selection
+    files_to_process = ui_helpers.list_select_textfile(option_1)
+
+    # Requests the number of words per phrase
+    n = ui_helpers.get_ngram_size()
+
+    # Loads commonwords.txt as a filter
+    common_words = analysis.load_common_words()
+
+    # Creates a nested dictionary {filename:{phrase:counts}} structure
+    word_counts_all_docs = {}
+    for filename in files_to_process:
+        ngram_tally_dict, error_bound = analysis.tally_ngrams_file(filename, common_words, n)
+        if ngram_tally_dict is None:
+            continue
+        if error_bound:
+            print(ui_helpers.YELLOW + 'Memory cap reached for ' + ui_helpers.RESET + f'{filename}' +
+                  ui_helpers.YELLOW + f'; showing the most frequent phrases with counts accurate to within +{error_bound}.' + ui_helpers.RESET)
+        word_counts_all_docs[filename[0:-4]] = ngram_tally_dict
+
+    # Returns to previous menu if nothing was counted
+    if len(word_counts_all_docs) < 1:
+        input(ui_helpers.YELLOW + '\nNo phrases were counted. Press Enter to return...' + ui_helpers.RESET)
+        option_1()
+
+    # Convert nested dictionary to DataFrame
+    word_counts_df = analysis.word_counts_to_df(word_counts_all_docs)
+
+    # Data Transformation prompt
+    input(ui_helpers.YELLOW + '\nPress Enter for DataFrame Transformation options.' + ui_helpers.RESET)
+    word_count_df_transformation_menu(word_counts_df)
+    option_1()
+
 # Option 2 - SQL Database Menu
 def option_2():
     """
@@ -338,6 +407,7 @@ def option_2():
         print(ui_helpers.RESET + 'Main Menu > ' + ui_helpers.CYAN + 'SQLite Database Menu\n' + ui_helpers.RESET)
         print(ui_helpers.RESET + '1. Export Word Count Analysis to SQLite Database')
         print(ui_helpers.RESET + '2. SQLite Database Queries')
+        print(ui_helpers.RESET + '3. Update Database with Appended Text (Incremental)')
         print(ui_helpers.RESET + '\n(H)elp for this page')
         print(ui_helpers.RESET + 'Press Enter without selection to return')
 
@@ -348,6 +418,8 @@ def option_2():
             option_2_1()
         elif choice == '2':
             option_2_2()
+        elif choice == '3':
+            option_2_3()
 
         # Help screen
         elif choice.lower() == 'h':
@@ -357,6 +429,8 @@ def option_2():
             print('These menu options allow users to perform a Word Count Analysis on as many .txt files from the "Textfiles" subdirectory as desired and to export the results to a .sqlite database file in the "Databases" subdirectory.')
             print('\nWords that are included in the commonwords.txt file will be excluded from Word Count Analysis.')
             print('\nEntering the file metadata is not required, but is recommended for future analysis as it will enable proper results for SQL queries.')
+            print('\nA database holds either single words or phrases of one length (i.e., bigrams), never a mix, so that its queries and TF-IDF weights stay meaningful.')
+            print('\nUpdate Database with Appended Text is meant for files which only ever grow (i.e., transcripts and logs). The first update exports the whole file; later updates only count the text added since the previous update and add the difference to the same document.')
             print('\nThe SQL Database Queries submenu allows users to perform numerous queries and to export these as .csv reports as desired. Users may also examine Database file information and perform Word Lookups.')
             input(ui_helpers.YELLOW + '\nPress Enter to return to SQL Database Menu: ' + ui_helpers.RESET)
             option_2()
@@ -395,25 +469,104 @@ def option_2_1():
     if not database_name.endswith('sqlite'):
         database_name += '.sqlite'
 
-    # Loads, analyzes the .txt files
-    for filename in files_to_process:
-        text_file_data = analysis.load_textfile(filename)
-        wordtally_results = analysis.tally_words(text_file_data, common_words)
+    # Single words (1) or phrases (2 or more words) are stored in the WordCounts table
+    n = ui_helpers.get_ngram_size(default=1)
+
+    # Words and phrases are never mixed in one database
+    database_ngram_size = sql_manager.query_ngram_size(database_name)
+    if database_ngram_size is not None and database_ngram_size != n:
+        input(ui_helpers.RED + f'\n{database_name} holds counts of {database_ngram_size} word(s) per entry and cannot store counts of {n} word(s) per entry. ' + ui_helpers.RESET + 'Press Enter to return...')
+        option_2()
 
-        # User prompts for file metadata
+    # Loads, analyzes the .txt files in parallel (phrases are counted per file in bounded memory)
+    if n == 1:
+        corpus_counts = analysis.tally_corpus(files_to_process, common_words)
+    else:
+        corpus_counts = {filename: analysis.tally_ngrams_file(filename, common_words, n)[0] for filename in files_to_process}
+
+    # Files which could not be analyzed are reported and left out of the export
+    for filename, wordtally_results in corpus_counts.items():
+        if wordtally_results is None:
+            print(ui_helpers.RED + 'Could not analyze ' + ui_helpers.RESET + f'{filename}' + ui_helpers.RED + '; it will not be added.' + ui_helpers.RESET)
+    files_to_export = [filename for filename, wordtally_results in corpus_counts.items() if wordtally_results is not None]
+
+    # User prompts for file metadata
+    documents = []
+    for filename in files_to_export:
         doc_title, author, year, genre = ui_helpers.input_file_metadata(filename)
+        documents.append((corpus_counts[filename], doc_title, author, year, genre))
 
-        # Builds the database and exports results to it
-        sql_manager.database_build(database_name)
-        sql_manager.wordtally_to_database(wordtally_results, database_name, doc_title, author, year, genre)
+    # Builds the database once and exports all results to it in bulk
+    sql_manager.database_build(database_name)
+    doc_ids = sql_manager.documents_to_database(documents, database_name, report=True, ngram_size=n)
 
-        # Confirmation prompt
-        print(ui_helpers.YELLOW + 'Added ' + 
-              ui_helpers.RESET + f'{filename}' + 
-              ui_helpers.YELLOW + ' to ' + 
-              ui_helpers.RESET + f'{database_name}' + 
-              ui_helpers.YELLOW + '.' + 
-              ui_helpers.RESET)
+    # Confirmation prompt (files of a batch which failed are not in the database)
+    for filename, doc_id in zip(files_to_export, doc_ids):
+        if doc_id is not None:
+            print(ui_helpers.YELLOW + 'Added ' + 
+                  ui_helpers.RESET + f'{filename}' + 
+                  ui_helpers.YELLOW + ' to ' + 
+                  ui_helpers.RESET + f'{database_name}' + 
+                  ui_helpers.YELLOW + '.' + 
+                  ui_helpers.RESET)
+    for filename in files_to_export[len(doc_ids):]:
+        print(ui_helpers.RED + 'Could not add ' + ui_helpers.RESET + f'{filename}' + ui_helpers.RED + f' to {database_name}.' + ui_helpers.RESET)
+
+    # User prompt to return or continue
+    input(ui_helpers.YELLOW + '\nOperation complete! Press Enter to return to ' + ui_helpers.CYAN + 'SQL Database Menu'  + ui_helpers.RESET + '.')
+    ui_helpers.clear_screen()
+    option_2()
+
+# Option 2_3 - Incrementally update a SQL DB with text appended to files
+def option_2_3():
+    """
+    Updates a SQL database with the text appended to append-only .txt files (i.e., transcripts and logs) since their last update. Files seen for the first time are exported in full with user-entered metadata; afterwards only the change in word counts is sent to the database.
+    """
+
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Header and user instructions
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > SQLite Database Menu > ' + ui_helpers.CYAN + 'Update Database with Appended Text (Incremental)' + ui_helpers.RESET)
+
+    # Lists Textfiles contents and requests user file selection
+    files_to_process = ui_helpers.list_select_textfile(option_2)
+
+    # Lists Databases contents and requests user selection
+    print(ui_helpers.YELLOW + '\nAvailable databases:\n' + ui_helpers.RESET)
+    database_name = ui_helpers.list_select_database(option_2)
+
+    # Builds the database tables if needed
+    sql_manager.database_build(database_name)
+
+    # Loads commonwords.txt as a filter
+    common_words = analysis.load_common_words()
+
+    for filename in files_to_process:
+        incremental_tally = analysis.IncrementalTally(filename, common_words, database_name)
+        delta_dict = incremental_tally.update()
+
+        # Exports the whole file the first time, then only the changes
+        if incremental_tally.doc_id is None:
+            doc_title, author, year, genre = ui_helpers.input_file_metadata(filename)
+            doc_id = sql_manager.wordtally_to_database(incremental_tally.counts(), database_name, doc_title, author, year, genre)
+        elif delta_dict:
+            doc_id = sql_manager.wordtally_to_database(delta_dict, database_name, None, None, None, None, doc_id=incremental_tally.doc_id)
+        else:
+            print(ui_helpers.YELLOW + 'No new text in ' + ui_helpers.RESET + f'{filename}' + ui_helpers.YELLOW + '.' + ui_helpers.RESET)
+            continue
+
+        # Saves the new state only once the database has been updated
+        if doc_id is not None:
+            incremental_tally.doc_id = doc_id
+            incremental_tally.save()
+            print(ui_helpers.YELLOW + 'Updated ' +
+                  ui_helpers.RESET + f'{filename}' +
+                  ui_helpers.YELLOW + ' in ' +
+                  ui_helpers.RESET + f'{database_name}' +
+                  ui_helpers.YELLOW + f' ({len(delta_dict)} words changed).' +
+                  ui_helpers.RESET)
 
     # User prompt to return or continue
     input(ui_helpers.YELLOW + '\nOperation complete! Press Enter to return to ' + ui_helpers.CYAN + 'SQL Database Menu'  + ui_helpers.RESET + '.')
@@ -436,6 +589,7 @@ def option_2_2():
         print(ui_helpers.RESET + '2. Word Counts Over Time Queries')
         print(ui_helpers.RESET + '3. Word Frequency by Other Queries')
         print(ui_helpers.RESET + '4. Delete SQLite Database')
+        print(ui_helpers.RESET + '5. Benchmark Queries (Index Migration)')
         print(ui_helpers.RESET + '\nPress Enter without selection to return')
         
         choice = input('\nEnter your selection: ')
@@ -447,6 +601,8 @@ def option_2_2():
             option_2_2_3()
         elif choice == '4':
             option_2_2_4()
+        elif choice == '5':
+            option_2_2_5()
         else:
             ui_helpers.clear_screen()
             option_2()
@@ -531,6 +687,7 @@ def option_2_2_3():
         print('3. Word Counts by Document')
         print('4. Documents by Genre with Author')
         print('5. Word(s) Lookup by Document')
+        print('6. Top TF-IDF Words by Document (computed in SQLite)')
         print(ui_helpers.YELLOW + '\n\nPress Enter to return to' + 
               ui_helpers.CYAN + ' Database Queries ' + 
               ui_helpers.YELLOW + 'menu.' + ui_helpers.RESET)
@@ -547,10 +704,65 @@ def option_2_2_3():
             option_2_2_3_4()
         elif choice == '5':
             option_2_2_3_5()
+        elif choice == '6':
+            option_2_2_3_6()
         else:
             ui_helpers.clear_screen()
             option_2_2()
 
+# Option 2_2_3_6 - Top TF-IDF Words by Document
+def option_2_2_3_6():
+    """
+    Allows user to view the Top N TF-IDF words of each document in a database, computed inside SQLite (see sql_manager.query_tf_idf_top_n) so that only the requested rows are returned. Users may then save the report to a .csv file.
+    """
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Screen title and instructions
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > SQLite Database Menu > SQLite Database Queries > Word Count Trends by Other > ' + ui_helpers.CYAN + 'Top TF-IDF Words by Document' + ui_helpers.RESET)
+    print('\nDisplay the words with the highest TF-IDF scores in each document of a database.\n\nPress Enter to return.')
+    print(ui_helpers.YELLOW + '\nAvailable files in Databases directory:\n' + ui_helpers.RESET)
+
+    # Displays contents of Databases, prompts user for selection
+    database_name = ui_helpers.list_select_database(option_2_2_3)
+
+    # Displays Database Summary
+    sql_manager.summarize_database(database_name)
+
+    # Requests user parameters using ui_helpers functions
+    print(ui_helpers.RESET + 'Enter the number of words to return per Document.\n' + ui_helpers.RESET)
+    top_n = ui_helpers.get_top_n()
+
+    while True:
+        threshold = input(ui_helpers.YELLOW + 'Enter a minimum TF-IDF score, or press Enter for none: ' + ui_helpers.RESET)
+        try:
+            threshold = float(threshold) if threshold else None
+            break
+        except ValueError:
+            print(ui_helpers.RED + 'Invalid input! Please enter a number.' + ui_helpers.RESET)
+
+    # Output SQL query to Pandas DF
+    df = sql_manager.query_tf_idf_top_n(database_name, top_n, threshold)
+    print(df)
+
+    # Prompts user to save DF as .csv file
+    save_prompt = input(ui_helpers.YELLOW + '\nQuery complete!' + 
+                        ui_helpers.RESET + ' Save as .csv? (Y/N) ')
+    
+    if save_prompt.lower() == 'y':
+        # Sets default name if user provides none
+        default_name = f'{database_name}_top_tf_idf_by_docs.csv'
+        
+        # Saves DF in the SQL Queries subdir
+        ui_helpers.move_to_reports_sql_queries()
+        ui_helpers.save_df_as_csv(df, default_name)
+        print(ui_helpers.RESET + 'Report may be found in Reports > SQL Queries subdirectory.')
+
+    # User prompt to return to SQL Queries menu
+    input(ui_helpers.YELLOW + '\nPress Enter to return to ' + ui_helpers.CYAN + 'Word Frequency by Other' + ui_helpers.YELLOW + ' menu.' + ui_helpers.RESET)
+    option_2_2_3()
+
 # Option 2_2_4 - Delete Database(s)
 def option_2_2_4():
     """
@@ -578,12 +790,41 @@ def option_2_2_4():
         input(ui_helpers.RESET + f'{database_name} ' + ui_helpers.YELLOW + 'NOT deleted!' + ui_helpers.RESET)
         option_2_2_4()
     
-    # Deletes the database
+    # Deletes the database (closing its pooled connections first)
     else:
+        sql_manager.close_connections(database_name)
         os.remove(database_name)
         input(ui_helpers.RESET + f'{database_name} ' + ui_helpers.YELLOW + 'deleted!' + ui_helpers.RESET)
         option_2_2_4()
 
+# Option 2_2_5 - Benchmark Queries
+def option_2_2_5():
+    """
+    Times each query function on a user-selected database with and without the covering indexes added by the schema migration, using temporary copies so the database itself is unchanged.
+    """
+
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Screen header and instructions
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > SQLite Database Menu > SQLite Database Queries > ' + ui_helpers.CYAN + 'Benchmark Queries' + ui_helpers.RESET)
+    print('\nCompare query times before and after the index migration. Large databases may take several minutes.\n\nPress Enter to return.')
+    print(ui_helpers.YELLOW + '\nAvailable files in Databases directory:\n' + ui_helpers.RESET)
+
+    # Displays contents of Databases, prompts user for selection
+    database_name = ui_helpers.list_select_database(option_2_2)
+
+    print(ui_helpers.YELLOW + '\nBenchmarking ' + ui_helpers.RESET + f'{database_name}' + ui_helpers.YELLOW + '...' + ui_helpers.RESET)
+    benchmark_df = sql_manager.benchmark_queries(database_name)
+
+    if benchmark_df is not None:
+        print(benchmark_df.to_string(index=False, float_format=lambda value: f'{value:.4f}'))
+
+    input(ui_helpers.YELLOW + '\nBenchmark complete! Press Enter to return to' + 
+          ui_helpers.CYAN + ' Database Queries ' + 
+          ui_helpers.YELLOW + 'menu.' + ui_helpers.RESET)
+
 
 # Option 2_2_2_1 - Word Counts Over Time (All Authors)
 def option_2_2_2_1():
@@ -1093,6 +1334,9 @@ def option_3():
     print(ui_helpers.RESET + '1. Query SQL Database for TF-IDF Analysis')
     print(ui_helpers.RESET + '2. Perform TF-IDF Analysis on Multiple Text Files')
     print(ui_helpers.RESET + '3. Perform TF-IDF Analysis using Multiple URLs')
+    print(ui_helpers.RESET + '4. TF-IDF for Selected Documents in SQL Database (Stored IDF)')
+    print(ui_helpers.RESET + '5. Score New Text Files against a Saved TF-IDF Model')
+    print(ui_helpers.RESET + '6. Out-of-Core TF-IDF Analysis of Very Large Text Files (Feature Hashing)')
     print(ui_helpers.RESET + '\n(H)elp for this page')
     print(ui_helpers.RESET + 'Press Enter without selection to return')
     
@@ -1105,6 +1349,12 @@ def option_3():
         option_3_2()
     elif choice == '3':
         option_3_3()
+    elif choice == '4':
+        option_3_4()
+    elif choice == '5':
+        option_3_5()
+    elif choice == '6':
+        option_3_6()
     elif choice.lower() == 'h':
         ui_helpers.clear_screen()
         ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
@@ -1112,6 +1362,9 @@ def option_3():
         print(ui_helpers.RESET + "TF-IDF (Term Frequency-Inverse Document Frequency) is a statistical measure used in text analysis to evaluate the importance of a word in a document relative to a collection of documents (corpus). It combines two metrics: " + ui_helpers.YELLOW + "term frequency (TF)" + ui_helpers.RESET + ", which counts how often a word appears in a document, and "  + ui_helpers.YELLOW + "inverse document frequency (IDF)" + ui_helpers.RESET + ", which measures the word's rarity across all documents. \n\nThe formula is TF multiplied by IDF. This approach helps highlight words that are significant in a specific document but not common across the entire corpus, making it useful for tasks like information retrieval and text mining.\n"
         )
         print('To perform a TF-IDF analysis, you must analyze at least two different files. These may come from two or more local files, two or more URLs, or a SQL database containing the information of at least two files may be queried.')
+        print('\nOption 4 scores only the documents you select from a SQL database. Their IDF weights come from the document frequencies stored for the whole database, so each document scores the same as it would in a TF-IDF analysis of the entire database.')
+        print('\nAny TF-IDF analysis can be saved as a model (its vocabulary and IDF weights) from the DataFrame Transformation menu. Option 5 scores new text files against a saved model without repeating the original analysis, so even a single file may be scored.')
+        print('\nOption 6 is for text files too large to analyze in memory. Files are read a piece at a time and words are hashed into a fixed number of columns, so memory does not grow with the size of the corpus. The most frequent words are shown by name; other columns are shown by number (i.e., #1234), and words which share a column are joined with "/".')
         input(ui_helpers.YELLOW + '\nPress enter to return to TF-IDF Analysis Menu: ' + ui_helpers.RESET)
         option_3()
 
@@ -1135,9 +1388,9 @@ def option_3_1():
     # Displays available databases and prompts user for selection
     database_name = ui_helpers.list_select_database(option_3)
 
-    # Queries selected database, returns Pandas DF
-    df = sql_manager.query_sql_for_tf_idf(database_name)
-    tfidf_df, final_metadata = analysis.sql_tf_idf_analysis(df)
+    # Queries the (doc_id, word_id, count) rows of the selected database and computes TF-IDF from them directly
+    counts_df, documents_df, words_df = sql_manager.query_sql_word_counts(database_name)
+    tfidf_df, final_metadata = analysis.sql_tf_idf_from_ids(counts_df, documents_df, words_df)
 
     # Success confirmation and header print
     ui_helpers.clear_screen()
@@ -1210,6 +1463,150 @@ def option_3_3():
     tf_idf_df_transformation_menu(tfidf_df)
     option_3()
 
+# Option 3_4 - TF-IDF for Selected Documents using the stored document frequencies
+def option_3_4():
+    """
+    Allows user to select a SQLite database and any subset of its documents to perform a TF-IDF analysis. IDF weights come from the DocumentFrequency table of the database, so the rest of the corpus is never read. Takes user to the TF-IDF Transformation Menu after analysis is complete.
+    """
+
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Screen title and menu tree
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > TF-IDF Analysis Menu > ' + ui_helpers.CYAN + 'TF-IDF for Selected Documents in SQL Database\n' + ui_helpers.RESET)
+
+    # Displays available databases and prompts user for selection
+    database_name = ui_helpers.list_select_database(option_3)
+
+    # Lists the documents of the database
+    documents_df = sql_manager.query_documents(database_name)
+    if documents_df is None or documents_df.empty:
+        print(ui_helpers.RED + 'No documents were found in this database!' + ui_helpers.RESET)
+        input(ui_helpers.YELLOW + '\nPress Enter to return to the TF-IDF Analysis Menu.' + ui_helpers.RESET)
+        option_3()
+        return
+
+    print(ui_helpers.YELLOW + '\nDocuments in database:\n' + ui_helpers.RESET)
+    for number, row in enumerate(documents_df.itertuples(index=False), start=1):
+        print(f'{number}. {row.doc_title} ({row.author}, {row.year}, {row.genre})')
+
+    # Prompts user for the documents to analyze
+    while True:
+        selection = input(ui_helpers.YELLOW + '\nEnter document numbers separated by commas, "all", or press Enter to return: ' + ui_helpers.RESET).strip()
+        if not selection:
+            option_3()
+            return
+        if selection.lower() == 'all':
+            doc_ids = documents_df['doc_id'].tolist()
+            break
+        try:
+            numbers = [int(number) for number in selection.split(',')]
+            if not all(1 <= number <= len(documents_df) for number in numbers):
+                raise ValueError
+            doc_ids = [int(documents_df['doc_id'].iloc[number - 1]) for number in numbers]
+            break
+        except ValueError:
+            print(ui_helpers.RED + 'Invalid selection! ' + ui_helpers.RESET + 'Please enter numbers from the list above.')
+
+    # Joins the selected word counts with the stored document frequencies and computes TF-IDF
+    counts_df, documents_df, words_df, total_documents = sql_manager.query_word_counts_with_document_frequency(database_name, doc_ids)
+    if counts_df is None:
+        input(ui_helpers.YELLOW + '\nPress Enter to return to the TF-IDF Analysis Menu.' + ui_helpers.RESET)
+        option_3()
+        return
+    tfidf_df, final_metadata = analysis.tf_idf_with_stored_idf(counts_df, documents_df, words_df, total_documents)
+
+    # Success confirmation and header print
+    ui_helpers.clear_screen()
+    print(ui_helpers.CYAN + 'TF-IDF for Selected Documents in SQL Database' + ui_helpers.RESET)
+    print(ui_helpers.YELLOW + '\nOperation success!\n\n' + 
+          ui_helpers.RESET + 'Pandas DataFrame Header:') 
+    print(tfidf_df.head())
+
+    # Data Transformation prompt
+    input(ui_helpers.YELLOW + '\nPress Enter for DataFrame Transformation options.' + ui_helpers.RESET)
+    tf_idf_df_transformation_menu(tfidf_df)
+    option_3()
+
+# Option 3_5 - Score new text files against a saved TF-IDF model
+def option_3_5():
+    """
+    Allows user to select a saved TF-IDF model and one or more files from the Textfiles subdirectory, which are scored with the model's vocabulary and IDF weights. Takes user to the TF-IDF Transformation Menu after scoring is complete.
+    """
+
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Screen title and menu tree
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > TF-IDF Analysis Menu > ' + ui_helpers.CYAN + 'Score New Text Files against a Saved TF-IDF Model\n' + ui_helpers.RESET)
+
+    # Lists saved models and prompts user for selection
+    model_name = ui_helpers.list_select_model(option_3)
+
+    # Lists files in Textfiles and prompts for user input
+    files_to_process = ui_helpers.list_select_textfile(option_3)
+
+    # Scores the files against the saved model
+    scored_df, scored_metadata = analysis.score_text_files_with_model(files_to_process, model_name)
+    if scored_df is None:
+        input(ui_helpers.YELLOW + '\nPress Enter to return to the TF-IDF Analysis Menu.' + ui_helpers.RESET)
+        option_3()
+        return
+    tfidf_df, final_metadata = scored_df, scored_metadata
+
+    # Success confirmation and header print
+    ui_helpers.clear_screen()
+    print(ui_helpers.CYAN + 'Score New Text Files against a Saved TF-IDF Model' + ui_helpers.RESET)
+    print(ui_helpers.YELLOW + '\nOperation success!\n\n' + 
+          ui_helpers.RESET + 'Pandas DataFrame Header:') 
+    print(tfidf_df.head())
+
+    # Data Transformation prompt
+    input(ui_helpers.YELLOW + '\nPress Enter for DataFrame Transformation options.' + ui_helpers.RESET)
+    tf_idf_df_transformation_menu(tfidf_df)
+    option_3()
+
+# Option 3_6 - Out-of-core TF-IDF Analysis using feature hashing
+def option_3_6():
+    """
+    Allows user to select multiple files from the Textfiles subdirectory to perform an out-of-core TF-IDF analysis (see analysis.hashing_tf_idf_analysis), for files too large to analyze in memory. Takes user to the TF-IDF Transformation Menu after analysis is complete.
+    """
+
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Screen title and menu tree
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > TF-IDF Analysis Menu > ' + ui_helpers.CYAN + 'Out-of-Core TF-IDF Analysis (Feature Hashing)' + ui_helpers.RESET)
+
+    # Lists files in Textfiles and prompts for user input
+    files_to_process = ui_helpers.list_select_textfile(option_3)
+
+    # Prompts for the number of hash columns
+    n_features = ui_helpers.get_hash_features(analysis.HASHING_N_FEATURES)
+
+    # Performs analysis
+    hashed_df, hashed_metadata = analysis.hashing_tf_idf_analysis(files_to_process, option_3, n_features=n_features)
+    if hashed_df is None:
+        input(ui_helpers.YELLOW + '\nPress Enter to return to the TF-IDF Analysis Menu.' + ui_helpers.RESET)
+        option_3()
+        return
+    tfidf_df, final_metadata = hashed_df, hashed_metadata
+
+    # Success confirmation and header print
+    ui_helpers.clear_screen()
+    print(ui_helpers.CYAN + 'Out-of-Core TF-IDF Analysis (Feature Hashing)' + ui_helpers.RESET)
+    print(ui_helpers.YELLOW + '\nOperation success!\n\n' + 
+          ui_helpers.RESET + 'Pandas DataFrame Header:') 
+    print(tfidf_df.head())
+
+    # Data Transformation prompt
+    input(ui_helpers.YELLOW + '\nPress Enter for DataFrame Transformation options.' + ui_helpers.RESET)
+    tf_idf_df_transformation_menu(tfidf_df)
+    option_3()
+
 # Option 4 - Visualizations menu
 def option_4():
     """
@@ -1669,11 +2066,15 @@ def option_7():
     ui_helpers.clear_screen()
     ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
     print(ui_helpers.RESET + 'Main Menu > ' + ui_helpers.CYAN + 'Filter Settings Menu\n' + ui_helpers.RESET)
+    profile_names, active_profile = analysis.list_filter_profiles()
+    print(ui_helpers.YELLOW + 'Active filter profile: ' + ui_helpers.RESET + f'{active_profile}\n')
     print('1. Filter Contents')
     print('2. Add words to filter')
     print('3. Remove words from the filter')
     print('4. Reset filter to default')
     print('5. Remove all word filters')
+    print('6. Switch or create filter profile')
+    print('7. Delete a filter profile')
     print('\n(H)elp for this page')
     print('Press Enter without selection to return')
 
@@ -1705,6 +2106,11 @@ def option_7():
         else:
             option_7()
 
+    elif choice == '6':
+        option_7_4()
+    elif choice == '7':
+        option_7_5()
+
     # Help screen
     elif choice.lower() == 'h':
         ui_helpers.clear_screen()
@@ -1713,6 +2119,7 @@ def option_7():
         print('This filter applies only to Word Count Analyses. Words contained within the commonwords.txt file will not be added to the the Word Count results.\n\nThis is useful for removing common words ("and," "the", "if," etc.) or any other words the user wishes to remove.')
         print('\nIf words are not filtered prior to Word Count Analyses, they may be removed manually from the DataFrame Transformation Menu later.')
         print('\nThe menu options on this page allow users to view the current filter, add/remove words from it, erase the contents, and restore it to a default set of words.')
+        print('\nFilter profiles let users keep several named filters (for example, one per language or project) and switch between them instantly. The active profile is always the one in commonwords.txt; all profiles are saved together in filterprofiles.dat.')
         print('\nThe filter words can also be manually edited outside the program simply by editing the commonwords.txt file located in the same directory as the script. Because this filter list pulls from this file directly, the filter will not change from session-to-session provided this file has not been altered.')
 
         input(ui_helpers.YELLOW + '\nPress Enter to return to Filter Settings Menu: ' + ui_helpers.RESET)
@@ -1806,6 +2213,80 @@ def option_7_3():
     else:
         option_7()
 
+# Option 7_4 - Switches to (or creates) a named filter profile
+def option_7_4():
+    """
+    Lists the saved filter profiles and prompts the user for a profile to switch to. Entering a new name creates a profile as a copy of the current filter.
+    """
+
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Screen header and instructions
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > Filter Settings Menu > ' + ui_helpers.CYAN + 'Switch or Create Filter Profile' + ui_helpers.RESET)
+
+    # Lists the profiles
+    profile_names, active_profile = analysis.list_filter_profiles()
+    print(ui_helpers.YELLOW + '\nSaved filter profiles:\n' + ui_helpers.RESET)
+    for index, profile_name in enumerate(profile_names, start=1):
+        marker = ui_helpers.CYAN + ' (active)' + ui_helpers.RESET if profile_name == active_profile else ''
+        print(f'{index}) {profile_name}' + marker)
+
+    # User prompt for the profile number or a new profile name
+    user_selection = input(ui_helpers.YELLOW + '\nEnter the number of a profile, or a new name to create one ' + ui_helpers.RESET + '(Press Enter to return to Settings menu): ').strip()
+    if user_selection == '':
+        option_7()
+
+    if user_selection.isdigit() and 1 <= int(user_selection) <= len(profile_names):
+        profile_name = profile_names[int(user_selection) - 1]
+    else:
+        profile_name = user_selection
+
+    # Switches profiles and confirms
+    stopwords = analysis.switch_filter_profile(profile_name)
+    if stopwords is not None:
+        print(ui_helpers.YELLOW + '\nActive filter profile is now ' + ui_helpers.RESET + f'{profile_name}' + ui_helpers.YELLOW + f' ({len(stopwords)} words).' + ui_helpers.RESET)
+    input('\nPress Enter to continue...')
+    option_7()
+
+# Option 7_5 - Deletes a named filter profile
+def option_7_5():
+    """
+    Lists the saved filter profiles and prompts the user for a profile to delete. The active profile cannot be deleted.
+    """
+
+    global tfidf_df, final_metadata, word_counts_df
+
+    # Screen header and instructions
+    ui_helpers.clear_screen()
+    ui_helpers.header(tfidf_df, final_metadata, word_counts_df)
+    print(ui_helpers.RESET + 'Main Menu > Filter Settings Menu > ' + ui_helpers.CYAN + 'Delete a Filter Profile' + ui_helpers.RESET)
+
+    # Lists the profiles
+    profile_names, active_profile = analysis.list_filter_profiles()
+    print(ui_helpers.YELLOW + '\nSaved filter profiles:\n' + ui_helpers.RESET)
+    for index, profile_name in enumerate(profile_names, start=1):
+        marker = ui_helpers.CYAN + ' (active)' + ui_helpers.RESET if profile_name == active_profile else ''
+        print(f'{index}) {profile_name}' + marker)
+
+    # User prompt for the profile to delete
+    user_selection = input(ui_helpers.YELLOW + '\nEnter the number of the profile to delete ' + ui_helpers.RESET + '(Press Enter to return to Settings menu): ').strip()
+    if user_selection == '':
+        option_7()
+
+    if user_selection.isdigit() and 1 <= int(user_selection) <= len(profile_names):
+        profile_name = profile_names[int(user_selection) - 1]
+        conf_prompt = input(ui_helpers.YELLOW + f'Really delete the "{profile_name}" filter profile? (Enter "Y" for "Yes"): ' + ui_helpers.RESET)
+        if conf_prompt.lower() == 'y' and analysis.delete_filter_profile(profile_name):
+            print(ui_helpers.YELLOW + '\nDeleted ' + ui_helpers.RESET + f'{profile_name}' + ui_helpers.YELLOW + '.' + ui_helpers.RESET)
+
+    else:
+        print(ui_helpers.RED + 'Invalid selection! Please try again.' + ui_helpers.RESET)
+
+    input('\nPress Enter to continue...')
+    option_7()
+
 # Readme - Provides instructions, notes, and help for users
 def readme():
     """
@@ -1849,6 +2330,7 @@ def tf_idf_df_transformation_menu(tfidf_df):
         6. Output to a .txt file
         7. Initialize a Dashboard for visualization using Dash
         8. Save Bar Chart with "Top N" Words')
+        9. Save the TF-IDF model (vocabulary and IDF weights) for scoring new documents
 
     The menu is continuously displayed until the user inputs 'd' for Done.
     
@@ -1873,6 +2355,8 @@ def tf_idf_df_transformation_menu(tfidf_df):
         print(ui_helpers.RESET + '7. Output DataFrame to .txt file')
         print(ui_helpers.RESET + '8. Initialize Dashboard')
         print(ui_helpers.RESET + '9. Save Bar Chart with "Top N" Words')
+        print(ui_helpers.RESET + '10. Save TF-IDF Model (vocabulary and IDF weights)')
+        print(ui_helpers.RESET + '11. Find Most Similar Documents')
         print(ui_helpers.RESET + '\nEnter "D" when done to return to menu')
 
         choice = input(ui_helpers.RESET + '\nEnter your selection: ' + ui_helpers.RESET)
@@ -1934,8 +2418,7 @@ def tf_idf_df_transformation_menu(tfidf_df):
             top_n = ui_helpers.get_top_n()
             
             # Applies the 'top n words' to the DF based on user preference
-            tfidf_df = tfidf_df.apply(lambda row: row.nlargest(top_n), axis=1)
-            tfidf_df = tfidf_df.fillna(0)  # Replace NaN with 0
+            tfidf_df = analysis.keep_top_n(tfidf_df, top_n)
 
             # User confirmation prompt
             ui_helpers.clear_screen()
@@ -1948,8 +2431,7 @@ def tf_idf_df_transformation_menu(tfidf_df):
             bottom_n = ui_helpers.get_top_n()
 
             # Applies the 'bottom n words' to the DF based on user preference
-            tfidf_df = tfidf_df.apply(lambda row: row.nsmallest(bottom_n), axis=1)
-            tfidf_df = tfidf_df.fillna(0)
+            tfidf_df = analysis.keep_bottom_n(tfidf_df, bottom_n)
 
             # User confirmation prompt
             ui_helpers.clear_screen()
@@ -1997,6 +2479,39 @@ def tf_idf_df_transformation_menu(tfidf_df):
 
             # Creates the bar chart, saves to 'Visuals' subdirectory
             visuals.create_tf_idf_barchart(tfidf_df, top_n)
+
+        # Saves the vocabulary and IDF weights for scoring new documents later
+        elif choice == '10':
+            filename = input(ui_helpers.YELLOW + 'Enter name for the TF-IDF model: ' + ui_helpers.RESET)
+            if len(filename) < 1:
+                filename = 'TF_IDF_Model'
+                print(ui_helpers.YELLOW + 'No name entered! Model will be saved as ' + 
+                      ui_helpers.RESET + f'{filename}')
+
+            filename = analysis.save_tfidf_model(tfidf_df, filename)
+            if filename:
+                print(ui_helpers.RESET + filename + ui_helpers.YELLOW + ' has been saved to the Models folder.' + ui_helpers.RESET)
+            input(ui_helpers.YELLOW + '\nPress Enter to continue...' + ui_helpers.RESET)
+
+        # Lists the most similar documents of each document (cosine similarity)
+        elif choice == '11':
+            print(ui_helpers.YELLOW + 'Specify number of similar documents to list per document.' + 
+                  ui_helpers.RESET)
+            top_k = ui_helpers.get_top_n()
+
+            similarity_df = analysis.document_similarity(tfidf_df, top_k)
+            if similarity_df is not None:
+                ui_helpers.clear_screen()
+                print(ui_helpers.CYAN + 'Most Similar Documents' + ui_helpers.RESET + ' (cosine similarity of TF-IDF scores)\n')
+                print(similarity_df.to_string(index=False))
+
+                # Prompts user to save the results as .csv file
+                save_prompt = input(ui_helpers.YELLOW + '\nSave as .csv? (Y/N) ' + ui_helpers.RESET)
+                if save_prompt.lower() == 'y':
+                    ui_helpers.move_to_reports_tfidf()
+                    ui_helpers.save_df_as_csv(similarity_df, 'Document_Similarity')
+                    print(ui_helpers.RESET + 'Report may be found in Reports > TF-IDF subdirectory.')
+            input(ui_helpers.YELLOW + '\nPress Enter to continue...' + ui_helpers.RESET)
             
         elif choice.lower() == 'd':
             ui_helpers.clear_screen()
@@ -2103,8 +2618,7 @@ def word_count_df_transformation_menu(word_counts_df):
             top_n = ui_helpers.get_top_n()
             
             # Applies the 'top n words' to the DF based on user preference
-            word_counts_df = word_counts_df.apply(lambda row: row.nlargest(top_n), axis=1)
-            word_counts_df = word_counts_df.fillna(0)  # Replace NaN with 0
+            word_counts_df = analysis.keep_top_n(word_counts_df, top_n)
 
             # User confirmation prompt
             ui_helpers.clear_screen()
@@ -2117,8 +2631,7 @@ def word_count_df_transformation_menu(word_counts_df):
             bottom_n = ui_helpers.get_top_n()
 
             # Applies the 'bottom n words' to the DF based on user preference
-            word_counts_df = word_counts_df.apply(lambda row: row.nsmallest(bottom_n), axis=1)
-            word_counts_df = word_counts_df.fillna(0)
+            word_counts_df = analysis.keep_bottom_n(word_counts_df, bottom_n)
 
             # User confirmation prompt
             ui_helpers.clear_screen()
@@ -110,6 +110,38 @@ def move_to_databases():
     # Moves to Databases
     os.chdir(databases_path)
 
+# Moves to TallyCache subdirectory to access cached Word Count results
+def move_to_tally_cache():
+    """
+    Changes to 'TallyCache' directory when needed to read or write cached tally results.
+    """
+    # Moves to script directory and defines TallyCache subdirectory location
+    os.chdir(script_dir)
+    tally_cache_path = os.path.join(script_dir, 'TallyCache')
+
+    # Creates directory if it does not exist
+    if not os.path.exists(tally_cache_path):
+        os.makedirs(tally_cache_path)
+
+    # Moves to TallyCache
+    os.chdir(tally_cache_path)
+
+# Moves to Models subdirectory to access saved TF-IDF models
+def move_to_models():
+    """
+    Changes to 'Models' directory when needed to save or load TF-IDF models.
+    """
+    # Moves to script directory and defines Models subdirectory location
+    os.chdir(script_dir)
+    models_path = os.path.join(script_dir, 'Models')
+
+    # Creates directory if it does not exist
+    if not os.path.exists(models_path):
+        os.makedirs(models_path)
+
+    # Moves to Models
+    os.chdir(models_path)
+
 # Lists Textfiles subdirectory contents and requests user selection
 def list_select_textfile(menu_return):
     """
@@ -212,6 +244,51 @@ def list_select_database(menu_return):
         except IndexError:
             print(RED + 'File number is out of range. Please check and try again.' + RESET)
 
+# Lists saved TF-IDF models and requests user selection
+def list_select_model(menu_return):
+    """
+    Lists the TF-IDF models (.npz files) saved in the Models subdirectory. Prompts user to select a model, returning to previous menu if they press only "Enter".
+
+    Parameters:
+    menu_return - the menu function to call if no model is selected by the user.
+
+    Returns:
+    model_name - the name of the selected model, to be used by other functions as needed.
+
+    Raises:
+    ValueError - if the user enters a non-number.
+    """
+
+    # Moves to Models directory
+    move_to_models()
+
+    # Displays saved models, prompts user for selection
+    model_files = sorted(filename for filename in os.listdir() if filename.endswith('.npz'))
+    if not model_files:
+        input(RED + 'No saved TF-IDF models were found!' + RESET + ' Save one from the TF-IDF DataFrame Transformation menu first. Press Enter.')
+        menu_return()
+        return None
+
+    for index, filename in enumerate(model_files, start=1):
+        print(f'{index}) {filename}')
+
+    while True:
+        user_selection = input(YELLOW + '\nSelect model using its index number: ' + RESET)
+
+        # Returns user to desired menu if "Enter" is pressed
+        if user_selection == '':
+            menu_return()
+            return None
+
+        try:
+            selection_index = int(user_selection)
+            if 1 <= selection_index <= len(model_files):
+                return model_files[selection_index - 1]
+            print(RED + 'Selection out of range. Please try again.' + RESET)
+
+        except ValueError:
+            print(RED + 'Invalid input. Please enter the index number only.' + RESET)
+
 # Input File Metadata
 def input_file_metadata(filename):
     """
@@ -464,6 +541,75 @@ def get_top_n():
         except ValueError:
             print(RED + 'Value must be a number only.' + RESET)
 
+# Ask whether to use approximate (bounded-memory) Quick Display
+def get_approximate_mode():
+    """
+    Prompts the user to choose between an exact Quick Display and an approximate one which keeps memory fixed (recommended for enormous files or URLs).
+
+    Returns:
+    approximate - True if the user entered 'y', otherwise False.
+    """
+    choice = input(YELLOW + 'Use approximate mode with fixed memory for very large files? (y/N): ' + RESET)
+    return choice.strip().lower() == 'y'
+
+# Get n-gram size (number of words per phrase) for phrase counts
+def get_ngram_size(default=2):
+    """
+    Prompts the number of words per phrase (n-gram) to count, i.e., 2 for bigrams or 3 for trigrams. A value of 1 counts single words.
+
+    Parameters:
+    default - the value used if the user enters nothing.
+
+    Returns:
+    n - must be a number of 1 or greater.
+
+    Raises:
+    ValueError - if input is not a number.
+    """
+    # Requests user parameters
+    while True:
+        try:
+            n = input(YELLOW + f'Enter the number of words per phrase (2 for bigrams, 3 for trigrams, Enter for {default}): ' + RESET)
+            if n == '':
+                n = default
+            n = int(n)
+            if n < 1:
+                raise ValueError
+
+            return n
+
+        except ValueError:
+            print(RED + 'Value must be a number of 1 or greater.' + RESET)
+
+# Get the number of hash columns for out-of-core TF-IDF
+def get_hash_features(default):
+    """
+    Prompts the number of hash columns used by the out-of-core (feature hashing) TF-IDF analysis. More columns mean fewer words share a column, at the cost of memory.
+
+    Parameters:
+    default - the value used if the user enters nothing.
+
+    Returns:
+    n_features - must be a number of 1 or greater.
+
+    Raises:
+    ValueError - if input is not a number.
+    """
+    # Requests user parameters
+    while True:
+        try:
+            n_features = input(YELLOW + f'Enter the number of hash columns (Enter for {default:,}): ' + RESET)
+            if n_features == '':
+                n_features = default
+            n_features = int(n_features)
+            if n_features < 1:
+                raise ValueError
+
+            return n_features
+
+        except ValueError:
+            print(RED + 'Value must be a number of 1 or greater.' + RESET)
+
 # Get start/end year
 def get_start_end_years():
     """
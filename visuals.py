@@ -1,9 +1,10 @@
 # Import standard libraries
+import heapq
 from dash import Dash, html, dcc, Input, Output
 import plotly.express as px
-import pandas as pd
 
 # Import local libraries
+import analysis
 import ui_helpers
   
 # Display word count
@@ -18,7 +19,7 @@ def display_word_frequency(filename, wordtally_dict, number_to_list):
 
     Returns:
     wordtally_dict - the original wordtally dictionary (to be used by other functions)
-    sorted_list - the list which displays the results of the tallying in order from greatest to smallest as of v.30.
+    sorted_list - the list which displays the results of the tallying in order from greatest to smallest as of v.30 (only the Top N items when number_to_list is given).
 
     Raises:
     Exception for unexpected errors.
@@ -30,15 +31,12 @@ def display_word_frequency(filename, wordtally_dict, number_to_list):
         return
     
     try:
-        # Preparing a list from the wordtally_dict dictionary
-        tallied_list = list(wordtally_dict.items())
-        sorted_list = sorted(tallied_list, key=lambda item:item[1], reverse=True)
-
-        # Displays user-defined number of words (or all words)
+        # Displays user-defined number of words (or all words); only the Top N are sorted when a number is given
         if number_to_list == '':
-            top_count_words = sorted_list
+            sorted_list = sorted(wordtally_dict.items(), key=lambda item:item[1], reverse=True)
         else:
-            top_count_words = sorted_list[:number_to_list]
+            sorted_list = heapq.nlargest(number_to_list, wordtally_dict.items(), key=lambda item:item[1])
+        top_count_words = sorted_list
 
         # Prints the 'Top N Words' list
         print(ui_helpers.CYAN + '\n\nFILE: ' + ui_helpers.RESET + f'{filename}')
@@ -55,6 +53,39 @@ def display_word_frequency(filename, wordtally_dict, number_to_list):
     except Exception as e:
         print(ui_helpers.RED + f'An error occurred while trying to display the word count: {e}' + ui_helpers.RESET)
 
+# Display approximate Top N word counts with their error bounds
+def display_top_k_estimates(filename, top_words):
+    """
+    Displays the approximate 'Top N Words' found by analysis.tally_top_k_file or analysis.tally_top_k_url. Each count is shown with its error bound: the true count lies between the count shown and the count plus the error.
+
+    Parameters:
+    filename - the name of the file processed.
+    top_words - a list of (word, count, error) tuples sorted from greatest to smallest count.
+
+    Returns:
+    top_words - the original list (to be used by other functions)
+
+    Raises:
+    Exception for unexpected errors.
+    """
+
+    # Checks if top_words contains data
+    if top_words is None:
+        print(ui_helpers.RED + 'Error: expected a list but got None' + ui_helpers.RESET)
+        return
+
+    try:
+        # Prints the approximate 'Top N Words' list
+        print(ui_helpers.CYAN + '\n\nFILE: ' + ui_helpers.RESET + f'{filename}' + ui_helpers.GRAY + ' (approximate)' + ui_helpers.RESET)
+        print(ui_helpers.CYAN + '\nRank ) Word - Count (+ max error)\n' + '_'*32 + '\n' + ui_helpers.RESET)
+        for index, (word, count, error) in enumerate(top_words, start=1):
+            print(f'{index}' + ') ' f'{word[0].upper()}{word[1:]} - {count}' + ui_helpers.GRAY + f' (+{error})' + ui_helpers.RESET)
+
+        return top_words
+
+    except Exception as e:
+        print(ui_helpers.RED + f'An error occurred while trying to display the word count: {e}' + ui_helpers.RESET)
+
 # Create a dashboard for a TF-IDF DataFrame using Dash
 def create_tf_idf_dash(tfidf_df, final_metadata, top_n=5):
     """
@@ -127,21 +158,8 @@ def create_counts_barchart(word_counts_df, top_n=5):
     # Moves to Visuals subdirectory
     ui_helpers.move_to_visuals()
 
-    # List to store DataFrames for Top N words per Document (row)
-    top_n_words_dfs = []
-
-    # Iterate through each row to find Top N words per document
-    for row_index, row in word_counts_df.iterrows():
-        # Get Top N words for current document
-        top_n_words = row.nlargest(top_n)
-        # Add the document identifier
-        top_n_words_df = pd.DataFrame(top_n_words).reset_index()
-        top_n_words_df.columns = ['Word', 'Counts']
-        top_n_words_df['Document'] = row_index
-        top_n_words_dfs.append(top_n_words_df)
-
-    # Combines the DataFrames for all documents
-    combined_df = pd.concat(top_n_words_dfs)
+    # Finds the Top N words of every document (row) at once
+    combined_df = analysis.top_n_per_document(word_counts_df, top_n).rename(columns={'Value': 'Counts'})
 
     # Create column for sorting words by document (much better bar plot grouping this way)
     combined_df['Words by Document'] = combined_df['Word']
@@ -187,21 +205,8 @@ def create_tf_idf_barchart(tfidf_df, top_n=5):
     # Moves to Visuals subdirectory
     ui_helpers.move_to_visuals()
 
-    # List to store DataFrames for Top N words per Document (row)
-    top_n_words_dfs = []
-
-    # Iterate through each row to find Top N words per document
-    for row_index, row in tfidf_df.iterrows():
-        # Get Top N words for current document
-        top_n_words = row.nlargest(top_n)
-        # Add the document identifier
-        top_n_words_df = pd.DataFrame(top_n_words).reset_index()
-        top_n_words_df.columns = ['Word', 'TF-IDF Score']
-        top_n_words_df['Document'] = row_index
-        top_n_words_dfs.append(top_n_words_df)
-
-    # Combines the DataFrames for all documents
-    combined_df = pd.concat(top_n_words_dfs)
+    # Finds the Top N words of every document (row) at once
+    combined_df = analysis.top_n_per_document(tfidf_df, top_n).rename(columns={'Value': 'TF-IDF Score'})
 
     # Create column for sorting words by document (much better bar plot grouping this way)
     combined_df['Words by Document'] = combined_df['Word']